@@ -1,6 +1,13 @@
 import os
+from typing import Any, Callable, TypeVar
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Connection, make_url
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from starlette.concurrency import run_in_threadpool
+
+
+T = TypeVar("T")
 
 
 def _database_url() -> str:
@@ -10,10 +17,83 @@ def _database_url() -> str:
     )
 
 
+def _async_database_url() -> str:
+    url = os.getenv("ASYNC_DATABASE_URL")
+    if url:
+        return url
+    return make_url(_database_url()).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+
+
+def db_mode() -> str:
+    """``sync`` (psycopg2 + threadpool, the default) or ``async`` (asyncpg)."""
+    mode = os.getenv("DB_MODE", "sync").strip().lower()
+    if mode not in {"sync", "async"}:
+        raise ValueError(f"DB_MODE must be 'sync' or 'async', got {mode!r}")
+    return mode
+
+
+def _pool_options() -> dict[str, Any]:
+    return {
+        "pool_pre_ping": True,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    }
+
+
 class Base(DeclarativeBase):
     pass
 
 
-engine = create_engine(_database_url(), pool_pre_ping=True)
+engine = create_engine(_database_url(), **_pool_options())
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
+async_engine = None
+AsyncSessionLocal = None
+if db_mode() == "async":
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    _async_url = make_url(_async_database_url())
+    if _async_url.drivername.endswith("+asyncpg"):
+        _async_url = _async_url.update_query_dict(
+            {"prepared_statement_cache_size": os.getenv("DB_STATEMENT_CACHE_SIZE", "100")}
+        )
+        _connect_args: dict[str, Any] = {}
+    else:
+        # psycopg 3: statements are prepared after this many executions.
+        _connect_args = {"prepare_threshold": int(os.getenv("DB_PREPARE_THRESHOLD", "5"))}
+    async_engine = create_async_engine(_async_url, connect_args=_connect_args, **_pool_options())
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autocommit=False, autoflush=False)
+
+
+async def run_db(fn: Callable[..., T], *args: Any) -> T:
+    """Run ``fn(session, *args)`` against the configured database layer.
+
+    Handlers are written once against a sync ``Session``. In async mode they
+    run on an ``AsyncSession`` via ``run_sync`` (asyncpg, no threads); in
+    sync mode they run in Starlette's threadpool on a psycopg2 session,
+    exactly as sync ``def`` routes would.
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            return await session.run_sync(fn, *args)
+
+    def _call() -> T:
+        with SessionLocal() as session:
+            return fn(session, *args)
+
+    return await run_in_threadpool(_call)
+
+
+async def run_ddl(fn: Callable[[Connection], Any]) -> None:
+    """Run ``fn(connection)`` inside one transaction on the active engine."""
+    if async_engine is not None:
+        async with async_engine.begin() as conn:
+            await conn.run_sync(fn)
+        return
+
+    def _call() -> None:
+        with engine.begin() as conn:
+            fn(conn)
+
+    await run_in_threadpool(_call)
@@ -0,0 +1,63 @@
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from engine.evidence_store import REF_PREFIX, EvidenceStore, is_ref
+
+
+def evidence_store_path() -> Path:
+    default = Path(__file__).resolve().parents[2] / "evidence-store"
+    return Path(os.getenv("EVIDENCE_STORE_DIR", str(default)))
+
+
+@lru_cache(maxsize=4)
+def _store(path: str) -> EvidenceStore:
+    return EvidenceStore(Path(path))
+
+
+def evidence_store() -> EvidenceStore:
+    return _store(str(evidence_store_path()))
+
+
+def max_upload_bytes() -> int:
+    return int(os.getenv("EVIDENCE_MAX_BYTES", str(1 << 30)))
+
+
+def unresolved_refs(refs: Iterable[str]) -> List[str]:
+    """``sha256:`` refs that are malformed or not in the store.
+
+    Refs without that prefix are free-form (URLs, ticket ids) and are left
+    alone.
+    """
+    store = evidence_store()
+    return [r for r in refs if r.startswith(REF_PREFIX) and not (is_ref(r) and store.has(r))]
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """``[start, end)`` for a single ``bytes=`` range, or None to send the whole blob.
+
+    Multi-range, non-byte and invalid requests (``bytes=5-3``) are answered
+    with the whole blob, as RFC 9110 allows. Raises ValueError when a valid
+    range cannot be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, sep, last = header[len("bytes="):].strip().partition("-")
+    if not sep:
+        return None
+    if not (first or last) or any(part and not part.isdigit() for part in (first, last)):
+        return None
+    if not first:
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise ValueError(header)
+        return max(0, size - suffix), size
+    start = int(first)
+    if last and int(last) < start:
+        # An invalid range spec, not an unsatisfiable one: ignore it.
+        return None
+    end = int(last) + 1 if last else size
+    if start >= size:
+        raise ValueError(header)
+    return start, min(end, size)
@@ -0,0 +1,134 @@
+"""Bulk import of engine findings documents into assessment items.
+
+POST /assessments/{id}/findings:import takes the same findings document
+``engine.assess`` scores (JSON, or JSONL with the header on the first line)
+and validates it with the engine's own ``FindingsAccumulator`` against the
+assessment's registry version: score range from the registry's scoring
+scale, duplicate and unknown control ids. Accepted findings are loaded with
+COPY into a temporary staging table (kept per connection, emptied at every
+commit) and merged into assessment_items by one UPDATE ... FROM in the
+handler.
+"""
+
+import csv
+import io
+import json
+import os
+import threading
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from sqlalchemy import Integer, String, Text, column, insert, table, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+
+from engine.assess import FindingsAccumulator, read_findings
+from engine.scoring import ScoringModel, compile_model
+
+from .registry import current_registry
+from .registry_store import controls_for_hash, header_for_hash
+
+
+JSONL_MEDIA_TYPES = frozenset({"application/x-ndjson", "application/jsonl", "application/x-jsonlines"})
+
+STAGING = table(
+    "findings_import",
+    column("control_id", String),
+    column("score", Integer),
+    column("finding_text", Text),
+    column("evidence_refs", JSONB),
+)
+_STAGING_COLUMNS = ("control_id", "score", "finding_text", "evidence_refs")
+
+# (control_id, score, finding text, evidence refs)
+FindingRow = Tuple[str, int, str, List[str]]
+
+_models: Dict[str, ScoringModel] = {}
+_lock = threading.Lock()
+
+
+def max_import_bytes() -> int:
+    return int(os.getenv("FINDINGS_IMPORT_MAX_BYTES", str(64 << 20)))
+
+
+def is_jsonl(content_type: Optional[str]) -> bool:
+    return (content_type or "").split(";")[0].strip().lower() in JSONL_MEDIA_TYPES
+
+
+def scoring_model_for(session: Session, reg_hash: str) -> Optional[ScoringModel]:
+    """Scoring model of a stored or archived registry version; None if unknown."""
+    registry = current_registry()
+    if reg_hash == registry.registry_hash:
+        return registry.scoring
+    # Versions are immutable, so a compiled model never goes stale.
+    model = _models.get(reg_hash)
+    if model is not None:
+        return model
+    controls = controls_for_hash(session, reg_hash)
+    if not controls:
+        return None
+    header = header_for_hash(session, reg_hash) or {}
+    model = compile_model(
+        {
+            "scoring": header.get("scoring", {}),
+            "build": {"registry_hash": reg_hash},
+            "controls": list(controls.values()),
+        }
+    )
+    with _lock:
+        if len(_models) >= 8:
+            _models.clear()
+        _models[reg_hash] = model
+    return model
+
+
+def parse_findings(body: BinaryIO, model: ScoringModel, jsonl: bool) -> Tuple[Dict[str, Any], List[FindingRow]]:
+    """Header and validated finding rows (control_id order); raises ValueError."""
+    acc = FindingsAccumulator(model)
+    header = read_findings(body, acc, jsonl=jsonl)
+    acc.finish()
+    if "registry_hash" not in header:
+        raise ValueError("findings.json missing registry_hash")
+    rows = [
+        (model.control_ids[i], acc.scores[i], finding, refs)
+        for i, (finding, refs) in sorted(acc.findings.items())
+    ]
+    return header, rows
+
+
+def stage_findings(session: Session, rows: List[FindingRow]) -> None:
+    """COPY ``rows`` into the staging table, creating it on first use by this connection."""
+    session.execute(
+        text(
+            "CREATE TEMP TABLE IF NOT EXISTS findings_import ("
+            "control_id varchar PRIMARY KEY, score integer NOT NULL, "
+            "finding_text text NOT NULL, evidence_refs jsonb NOT NULL) ON COMMIT DELETE ROWS"
+        )
+    )
+    if not rows:
+        return
+    raw = session.connection().connection
+    driver = raw.driver_connection
+    if hasattr(driver, "copy_records_to_table"):
+        # asyncpg, reached from run_sync through SQLAlchemy's adapter.
+        records = [(cid, score, finding, json.dumps(refs)) for cid, score, finding, refs in rows]
+        raw.dbapi_connection.run_async(
+            lambda conn: conn.copy_records_to_table("findings_import", records=records, columns=_STAGING_COLUMNS)
+        )
+    elif hasattr(driver, "get_dsn_parameters"):
+        # psycopg2
+        buf = io.StringIO()
+        # Quoting every field keeps empty finding text from reading back as NULL.
+        writer = csv.writer(buf, quoting=csv.QUOTE_ALL)
+        for cid, score, finding, refs in rows:
+            writer.writerow((cid, score, finding, json.dumps(refs)))
+        buf.seek(0)
+        with raw.cursor() as cur:
+            cur.copy_expert(
+                f"COPY findings_import ({', '.join(_STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                buf,
+            )
+    else:
+        session.execute(
+            insert(STAGING),
+            [dict(zip(_STAGING_COLUMNS, row)) for row in rows],
+        )
@@ -1,23 +1,46 @@
+import base64
+import json
+import tempfile
+import uuid
 from datetime import datetime, timezone
 from typing import Any
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 import os
-from sqlalchemy import select
-
-from .db import SessionLocal, engine, Base
-from .models import Assessment, AssessmentItem
+from sqlalchemy import Boolean, Integer, String, Text, case, cast, column, insert, select, tuple_, update, values
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from .db import run_db, run_ddl
+from .evidence import evidence_store, max_upload_bytes, parse_range, unresolved_refs
+from .findings_import import STAGING, is_jsonl, max_import_bytes, parse_findings, scoring_model_for, stage_findings
+from .models import Assessment, AssessmentItem, AssessmentReport
 from .schemas import (
+    AssessmentBatchCreate,
     AssessmentCreate,
+    AssessmentItemBatchUpdate,
     AssessmentItemOut,
     AssessmentItemUpdate,
     AssessmentListOut,
     AssessmentOut,
+    AssessmentPartialOut,
+    EvidenceOut,
+    FindingsImportOut,
+    RegistryDiffOut,
+    RegistryMigrationCreate,
+    RegistryMigrationOut,
+    RegistryVersionOut,
     ReportOut,
 )
-from .registry import load_registry, registry_hash
-from .reporting import build_report
+from . import migrations
+from .registry import CompiledRegistry, current_registry, start_registry_watcher, stop_registry_watcher
+from .registry_migrate import migrate_assessments, registry_diff
+from .registry_store import controls_for_hash, ensure_registry_version, header_for_hash, list_versions
+from .report_cache import apply_item_change, apply_item_changes, initial_row, load_for_update, refresh_risks, render
+from .responses import JSONBytes
 
 
 app = FastAPI(title="IAM Assessment Engine")
@@ -32,12 +55,23 @@ app.add_middleware(
     allow_credentials=allow_credentials,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Accept-Ranges", "Content-Range", "Content-Length"],
 )
 
 
 @app.on_event("startup")
-def _startup() -> None:
-    Base.metadata.create_all(bind=engine)
+async def _startup() -> None:
+    if os.getenv("DB_AUTO_MIGRATE", "1") != "0":
+        await run_ddl(migrations.apply)
+    # 0 disables the watcher; requests then stat dist/ on every registry read.
+    watch_interval = float(os.getenv("REGISTRY_WATCH_INTERVAL", "1.0"))
+    if watch_interval > 0:
+        start_registry_watcher(watch_interval)
+
+
+@app.on_event("shutdown")
+async def _shutdown() -> None:
+    stop_registry_watcher()
 
 
 @app.get("/health")
@@ -45,141 +79,645 @@ def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+REGISTRY_CACHE_CONTROL = os.getenv("REGISTRY_CACHE_CONTROL", "public, max-age=86400")
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def _accepted_encodings(header: str) -> dict[str, float]:
+    """Accept-Encoding codings with their q-values (1.0 when absent, 0 when malformed)."""
+    accepted: dict[str, float] = {}
+    for token in header.split(","):
+        name, *params = token.split(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value.strip())
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    return accepted
+
+
 @app.get("/registry")
-def get_registry() -> dict[str, Any]:
-    return load_registry()
+def get_registry(request: Request) -> Response:
+    registry = current_registry()
+    etag = f'"{registry.registry_hash}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": REGISTRY_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+    candidates = [("gzip", registry.gzip_bytes)]
+    if registry.br_bytes is not None:
+        candidates.insert(0, ("br", registry.br_bytes))
+    # Highest q wins, br on a tie; q=0 means "not acceptable".
+    weighted = [(accepted.get(name, accepted.get("*", 0.0)), name, data) for name, data in candidates]
+    q, name, data = max(weighted, key=lambda w: w[0])
+    body = registry.json_bytes
+    if q > 0:
+        body = data
+        headers["Content-Encoding"] = name
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _encode_cursor(created_at: datetime, assessment_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), assessment_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, assessment_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), str(assessment_id)
+    except (ValueError, TypeError) as exc:
+        raise HTTPException(status_code=400, detail="invalid cursor") from exc
+
+
+def _scope_filter(scope: list[str]) -> dict[str, str]:
+    filters: dict[str, str] = {}
+    for entry in scope:
+        key, sep, value = entry.partition(":")
+        if not sep or not key:
+            raise HTTPException(status_code=400, detail=f"scope filter must be key:value, got '{entry}'")
+        filters[key] = value
+    return filters
 
 
 @app.get("/assessments", response_model=list[AssessmentListOut])
-def list_assessments() -> list[AssessmentListOut]:
-    with SessionLocal() as session:
-        rows = session.execute(select(Assessment).order_by(Assessment.created_at.desc())).scalars().all()
-        return [
-            AssessmentListOut(
-                id=row.id,
-                name=row.name,
-                created_at=row.created_at,
-                registry_hash=row.registry_hash,
-            )
-            for row in rows
-        ]
+async def list_assessments(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = None,
+    name_prefix: str | None = None,
+    registry_hash: str | None = None,
+    scope: list[str] = Query([]),
+) -> Response:
+    """Newest-first assessment list with keyset pagination.
+
+    When more rows exist, ``X-Next-Cursor`` carries the cursor for the next
+    page. ``scope`` filters are ``key:value`` pairs matched by JSONB
+    containment.
+    """
+    after = _decode_cursor(cursor) if cursor else None
+    rows = await run_db(
+        _list_assessments, limit, after, name_prefix, registry_hash, _scope_filter(scope)
+    )
+    headers = {}
+    if len(rows) > limit:
+        del rows[limit:]
+        headers["X-Next-Cursor"] = _encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return JSONBytes(rows, headers=headers)
+
+
+def _list_assessments(
+    session: Session,
+    limit: int,
+    after: tuple[datetime, str] | None,
+    name_prefix: str | None,
+    reg_hash: str | None,
+    scope: dict[str, str],
+) -> list[dict[str, Any]]:
+    stmt = select(
+        Assessment.id,
+        Assessment.name,
+        Assessment.created_at,
+        Assessment.registry_hash,
+    )
+    if after is not None:
+        stmt = stmt.where(tuple_(Assessment.created_at, Assessment.id) < tuple_(*after))
+    if name_prefix:
+        stmt = stmt.where(Assessment.name.startswith(name_prefix, autoescape=True))
+    if reg_hash:
+        stmt = stmt.where(Assessment.registry_hash == reg_hash)
+    if scope:
+        stmt = stmt.where(Assessment.scope.contains(scope))
+    stmt = stmt.order_by(Assessment.created_at.desc(), Assessment.id.desc()).limit(limit + 1)
+
+    return [dict(row) for row in session.execute(stmt).mappings()]
 
 
 @app.post("/assessments", response_model=AssessmentOut)
-def create_assessment(payload: AssessmentCreate) -> AssessmentOut:
-    registry = load_registry()
-    reg_hash = registry_hash(registry)
-
-    with SessionLocal() as session:
-        assessment = Assessment(
-            name=payload.name,
-            registry_hash=reg_hash,
-            scope=payload.scope,
+async def create_assessment(payload: AssessmentCreate) -> Response:
+    registry = current_registry()
+    (assessment,) = await run_db(_create_assessments, registry, [payload])
+
+    items = [
+        {
+            "control_id": control["id"],
+            "domain": control["domain"],
+            "weight": control["weight"],
+            "status": "not_assessed",
+            "score": None,
+            "finding_text": "",
+            "evidence_refs": [],
+            "assessor_notes": "",
+            "control": control,
+        }
+        for control in registry.controls
+    ]
+    return JSONBytes(
+        {
+            "id": assessment["id"],
+            "name": assessment["name"],
+            "created_at": assessment["created_at"],
+            "assessed_at": None,
+            "registry_hash": assessment["registry_hash"],
+            "scope": assessment["scope"],
+            "items": items,
+        }
+    )
+
+
+@app.post("/assessments/batch", response_model=list[AssessmentListOut])
+async def create_assessments_batch(payload: AssessmentBatchCreate) -> list[AssessmentListOut]:
+    registry = current_registry()
+    assessments = await run_db(_create_assessments, registry, payload.assessments)
+
+    return [
+        AssessmentListOut(
+            id=a["id"],
+            name=a["name"],
+            created_at=a["created_at"],
+            registry_hash=a["registry_hash"],
         )
-        session.add(assessment)
-        session.flush()
-
-        items: list[AssessmentItem] = []
-        for control in sorted(registry.get("controls", []), key=lambda x: x["id"]):
-            items.append(
-                AssessmentItem(
-                    assessment_id=assessment.id,
-                    control_id=control["id"],
-                    domain=control["domain"],
-                    weight=control["weight"],
-                    status="not_assessed",
-                    score=None,
-                    finding_text="",
-                    evidence_refs=[],
-                    assessor_notes="",
-                    control_raw=control,
-                )
-            )
-        session.add_all(items)
-        session.commit()
+        for a in assessments
+    ]
+
+
+def _create_assessments(
+    session: Session,
+    registry: CompiledRegistry,
+    payloads: list[AssessmentCreate],
+) -> list[dict[str, Any]]:
+    ensure_registry_version(session, registry)
+    assessments = _insert_assessments(session, registry, payloads)
+    session.commit()
+    return assessments
+
+
+def _insert_assessments(
+    session: Session,
+    registry: CompiledRegistry,
+    payloads: list[AssessmentCreate],
+) -> list[dict[str, Any]]:
+    """Insert assessments and their items with two Core statements.
+
+    Rows are built as plain dicts and sent through executemany, which
+    SQLAlchemy batches into multi-row INSERT ... VALUES statements; no ORM
+    objects or unit-of-work state are created.
+    """
+    if not payloads:
+        return []
+
+    created_at = datetime.now(timezone.utc)
+    assessments = [
+        {
+            "id": str(uuid.uuid4()),
+            "name": p.name,
+            "created_at": created_at,
+            "registry_hash": registry.registry_hash,
+            "scope": p.scope,
+        }
+        for p in payloads
+    ]
+    items = [
+        {
+            "id": str(uuid.uuid4()),
+            "assessment_id": a["id"],
+            "control_id": control["id"],
+            "domain": control["domain"],
+            "weight": control["weight"],
+            "status": "not_assessed",
+            "score": None,
+            "finding_text": "",
+            "evidence_refs": [],
+            "assessor_notes": "",
+        }
+        for a in assessments
+        for control in registry.controls
+    ]
 
-        return _assessment_out(session, assessment.id)
+    session.execute(insert(Assessment), assessments)
+    if items:
+        session.execute(insert(AssessmentItem), items)
+    session.execute(insert(AssessmentReport), [initial_row(a["id"], registry) for a in assessments])
+    return assessments
 
 
-@app.get("/assessments/{assessment_id}", response_model=AssessmentOut)
-def get_assessment(assessment_id: str) -> AssessmentOut:
-    with SessionLocal() as session:
-        return _assessment_out(session, assessment_id)
+@app.get(
+    "/assessments/{assessment_id}",
+    response_model=AssessmentPartialOut,
+    response_model_exclude_unset=True,
+)
+async def get_assessment(
+    assessment_id: str,
+    domain: list[str] = Query([]),
+    status: list[str] = Query([]),
+    fields: str | None = None,
+    after: str | None = None,
+    limit: int | None = Query(None, ge=1, le=1000),
+) -> Response:
+    """Assessment detail; items can be filtered, paginated and projected.
+
+    ``fields`` is a comma-separated subset of item fields (control_id is
+    always included). Items are ordered by control_id. When ``limit`` cuts
+    the list short, ``X-Next-Cursor`` holds the control_id to pass as
+    ``after`` for the next page.
+    """
+    out = await run_db(
+        _assessment_out,
+        assessment_id,
+        _parse_fields(fields),
+        tuple(domain),
+        tuple(status),
+        after,
+        limit,
+    )
+    headers = {}
+    if limit is not None and len(out["items"]) > limit:
+        del out["items"][limit:]
+        headers["X-Next-Cursor"] = out["items"][-1]["control_id"]
+    return JSONBytes(out, headers=headers)
 
 
 @app.patch("/assessments/{assessment_id}/items/{control_id}", response_model=AssessmentItemOut)
-def update_item(assessment_id: str, control_id: str, payload: AssessmentItemUpdate) -> AssessmentItemOut:
-    with SessionLocal() as session:
-        item = session.execute(
-            select(AssessmentItem)
-            .where(AssessmentItem.assessment_id == assessment_id)
-            .where(AssessmentItem.control_id == control_id)
-        ).scalar_one_or_none()
-        if not item:
-            raise HTTPException(status_code=404, detail="assessment item not found")
-
-        updates = payload.model_dump(exclude_unset=True)
-        if "status" in updates:
-            item.status = updates["status"]
-        if "score" in updates:
-            item.score = updates["score"]
-        if "finding_text" in updates:
-            item.finding_text = updates["finding_text"]
-        if "evidence_refs" in updates:
-            item.evidence_refs = updates["evidence_refs"]
-        if "assessor_notes" in updates:
-            item.assessor_notes = updates["assessor_notes"]
-
-        if item.status == "assessed":
-            item_updated = datetime.now(timezone.utc)
-            assessment = session.get(Assessment, assessment_id)
-            if assessment:
-                assessment.assessed_at = item_updated
+async def update_item(assessment_id: str, control_id: str, payload: AssessmentItemUpdate) -> AssessmentItemOut:
+    return await run_db(_update_item, assessment_id, control_id, payload)
+
+
+def _update_item(
+    session: Session, assessment_id: str, control_id: str, payload: AssessmentItemUpdate
+) -> AssessmentItemOut:
+    _check_evidence_refs(payload.evidence_refs or [])
+
+    report = load_for_update(session, assessment_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="assessment item not found")
+    item = session.execute(
+        select(AssessmentItem)
+        .where(AssessmentItem.assessment_id == assessment_id)
+        .where(AssessmentItem.control_id == control_id)
+    ).scalar_one_or_none()
+    if not item:
+        raise HTTPException(status_code=404, detail="assessment item not found")
+    old = _item_state(item)
+
+    updates = payload.model_dump(exclude_unset=True)
+    if "status" in updates:
+        item.status = updates["status"]
+    if "score" in updates:
+        item.score = updates["score"]
+    if "finding_text" in updates:
+        item.finding_text = updates["finding_text"]
+    if "evidence_refs" in updates:
+        item.evidence_refs = updates["evidence_refs"]
+    if "assessor_notes" in updates:
+        item.assessor_notes = updates["assessor_notes"]
+
+    if item.status == "assessed":
+        item_updated = datetime.now(timezone.utc)
+        assessment = session.get(Assessment, assessment_id)
+        if assessment:
+            assessment.assessed_at = item_updated
+
+    control = controls_for_hash(session, report.registry_hash).get(item.control_id, {})
+    apply_item_change(report, old, _item_state(item), control.get("title", ""))
+    session.commit()
+
+    return _item_out(item, control)
+
+
+def _check_evidence_refs(refs: list[str]) -> None:
+    unresolved = unresolved_refs(refs)
+    if unresolved:
+        raise HTTPException(status_code=400, detail=f"unknown evidence ref(s): {', '.join(unresolved)}")
 
-        session.commit()
 
-        return _item_out(item)
+def _item_state(item: Any) -> dict[str, Any]:
+    return {
+        "control_id": item.control_id,
+        "domain": item.domain,
+        "weight": item.weight,
+        "status": item.status,
+        "score": item.score,
+        "finding_text": item.finding_text,
+    }
+
+
+def _item_state_columns(items: Any) -> tuple[Any, ...]:
+    return tuple(items.c[name] for name in ("control_id", "domain", "weight", "status", "score", "finding_text"))
+
+
+_BATCH_FIELDS = (
+    ("status", String),
+    ("score", Integer),
+    ("finding_text", Text),
+    ("evidence_refs", JSONB),
+    ("assessor_notes", Text),
+)
+
+
+@app.patch("/assessments/{assessment_id}/items", response_model=list[AssessmentItemOut])
+async def update_items(assessment_id: str, payload: list[AssessmentItemBatchUpdate]) -> list[AssessmentItemOut]:
+    return await run_db(_update_items, assessment_id, payload)
+
+
+def _update_items(
+    session: Session, assessment_id: str, payload: list[AssessmentItemBatchUpdate]
+) -> list[AssessmentItemOut]:
+    """Apply many item updates with a single UPDATE ... FROM (VALUES ...).
+
+    Each VALUES row carries a set_<field> flag per updatable field so rows
+    may touch different subsets of fields (and explicitly null a score)
+    within the same statement.
+    """
+    if not payload:
+        return []
+    if len(payload) > 5000:
+        raise HTTPException(status_code=413, detail="at most 5000 item updates per request")
+
+    rows: list[tuple[Any, ...]] = []
+    seen: set[str] = set()
+    for entry in payload:
+        if entry.control_id in seen:
+            raise HTTPException(status_code=400, detail=f"duplicate control_id '{entry.control_id}'")
+        seen.add(entry.control_id)
+        _check_evidence_refs(entry.evidence_refs or [])
+        updates = entry.model_dump(exclude_unset=True)
+        row: list[Any] = [entry.control_id]
+        for name, _ in _BATCH_FIELDS:
+            row.append(name in updates)
+            row.append(updates.get(name))
+        rows.append(tuple(row))
+
+    value_columns = [column("control_id", String)]
+    for name, type_ in _BATCH_FIELDS:
+        value_columns.append(column(f"set_{name}", Boolean))
+        value_columns.append(column(name, type_))
+    v = values(*value_columns, name="v").data(rows)
+
+    items = AssessmentItem.__table__
+    # Self-join so RETURNING can report the pre-update status/score that the
+    # report cache needs for its deltas.
+    prior = items.alias("prior")
+    stmt = (
+        update(items)
+        .where(items.c.assessment_id == assessment_id)
+        .where(items.c.control_id == v.c.control_id)
+        .where(prior.c.id == items.c.id)
+        .values(
+            {
+                name: case((v.c[f"set_{name}"], cast(v.c[name], type_)), else_=items.c[name])
+                for name, type_ in _BATCH_FIELDS
+            }
+        )
+        .returning(*items.c, prior.c.status.label("old_status"), prior.c.score.label("old_score"))
+    )
+
+    report = load_for_update(session, assessment_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="assessment not found")
+
+    updated = session.execute(stmt).all()
+    missing = seen.difference(row.control_id for row in updated)
+    if missing:
+        session.rollback()
+        raise HTTPException(
+            status_code=404,
+            detail=f"assessment item(s) not found: {', '.join(sorted(missing))}",
+        )
+
+    if any(row.status == "assessed" for row in updated):
+        session.execute(
+            update(Assessment)
+            .where(Assessment.id == assessment_id)
+            .values(assessed_at=datetime.now(timezone.utc))
+        )
+
+    controls = controls_for_hash(session, report.registry_hash)
+    for row in updated:
+        old = dict(_item_state(row), status=row.old_status, score=row.old_score)
+        apply_item_change(report, old, _item_state(row), controls.get(row.control_id, {}).get("title", ""))
+    session.commit()
+
+    return [
+        _item_out(row, controls.get(row.control_id, {}))
+        for row in sorted(updated, key=lambda r: r.control_id)
+    ]
+
+
+@app.post("/assessments/{assessment_id}/findings:import", response_model=FindingsImportOut)
+async def import_findings(assessment_id: str, request: Request) -> FindingsImportOut:
+    """Assess items from an engine findings document (or JSONL with an ndjson Content-Type).
+
+    The body is spooled to a temporary file as it arrives and validated with
+    the engine's rules; nothing is written unless every finding is valid.
+    Items without a finding are left as they are.
+    """
+    limit = max_import_bytes()
+    body = tempfile.SpooledTemporaryFile(max_size=1 << 20)
+    try:
+        received = 0
+        async for piece in request.stream():
+            received += len(piece)
+            if received > limit:
+                raise HTTPException(status_code=413, detail=f"findings document larger than {limit} bytes")
+            body.write(piece)
+        body.seek(0)
+        return await run_db(_import_findings, assessment_id, body, is_jsonl(request.headers.get("content-type")))
+    finally:
+        body.close()
+
+
+def _import_findings(session: Session, assessment_id: str, body: Any, jsonl: bool) -> FindingsImportOut:
+    """Stage validated findings with COPY, then merge them in one UPDATE ... FROM."""
+    reg_hash = session.execute(
+        select(Assessment.registry_hash).where(Assessment.id == assessment_id)
+    ).scalar_one_or_none()
+    if reg_hash is None:
+        raise HTTPException(status_code=404, detail="assessment not found")
+    model = scoring_model_for(session, reg_hash)
+    if model is None:
+        raise HTTPException(status_code=404, detail=f"unknown registry_hash {reg_hash}")
+    try:
+        header, rows = parse_findings(body, model, jsonl)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if header["registry_hash"] != reg_hash:
+        raise HTTPException(
+            status_code=409,
+            detail=f"findings are for registry {header['registry_hash']}, assessment is on {reg_hash}",
+        )
+    _check_evidence_refs([ref for row in rows for ref in row[3]])
+    assessed_at = datetime.now(timezone.utc)
+    if header.get("assessed_at"):
+        try:
+            assessed_at = datetime.fromisoformat(str(header["assessed_at"]).replace("Z", "+00:00"))
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail="findings assessed_at must be an ISO timestamp") from exc
+
+    report = load_for_update(session, assessment_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="assessment not found")
+    stage_findings(session, rows)
+
+    items = AssessmentItem.__table__
+    prior = items.alias("prior")
+    updated = session.execute(
+        update(items)
+        .where(items.c.assessment_id == assessment_id)
+        .where(items.c.control_id == STAGING.c.control_id)
+        .where(prior.c.id == items.c.id)
+        .values(
+            status="assessed",
+            score=STAGING.c.score,
+            finding_text=STAGING.c.finding_text,
+            evidence_refs=STAGING.c.evidence_refs,
+        )
+        .returning(*_item_state_columns(items), prior.c.status.label("old_status"), prior.c.score.label("old_score"))
+    ).all()
+    missing = {row[0] for row in rows}.difference(row.control_id for row in updated)
+    if missing:
+        session.rollback()
+        raise HTTPException(
+            status_code=404,
+            detail=f"assessment item(s) not found: {', '.join(sorted(missing))}",
+        )
+
+    if updated:
+        session.execute(update(Assessment).where(Assessment.id == assessment_id).values(assessed_at=assessed_at))
+    controls = controls_for_hash(session, report.registry_hash)
+    changes = []
+    for row in updated:
+        new = _item_state(row)
+        old = dict(new, status=row.old_status, score=row.old_score)
+        changes.append((old, new, controls.get(row.control_id, {}).get("title", "")))
+    apply_item_changes(report, changes)
+    # Built before commit, which would expire ``report`` and reload it.
+    out = FindingsImportOut(
+        assessment_id=assessment_id,
+        registry_hash=reg_hash,
+        imported=len(updated),
+        controls_assessed=report.controls_assessed,
+        controls_total=report.controls_total,
+    )
+    session.commit()
+    return out
 
 
 @app.get("/assessments/{assessment_id}/report", response_model=ReportOut)
-def get_report(assessment_id: str) -> ReportOut:
-    registry = load_registry()
-    reg_hash = registry_hash(registry)
+async def get_report(assessment_id: str) -> Response:
+    return JSONBytes(await run_db(_get_report, assessment_id))
 
-    with SessionLocal() as session:
-        assessment = session.get(Assessment, assessment_id)
-        if not assessment:
+
+def _get_report(session: Session, assessment_id: str) -> dict[str, Any]:
+    registry = current_registry()
+
+    row = session.execute(
+        select(AssessmentReport, Assessment.assessed_at)
+        .join(Assessment, Assessment.id == AssessmentReport.assessment_id)
+        .where(AssessmentReport.assessment_id == assessment_id)
+    ).one_or_none()
+    if row is None or row[0].risks_stale:
+        report = load_for_update(session, assessment_id)
+        if report is None:
             raise HTTPException(status_code=404, detail="assessment not found")
-        if assessment.registry_hash != reg_hash:
-            raise HTTPException(
-                status_code=400,
-                detail="registry_hash mismatch between assessment and current controls.json",
-            )
-
-        items = (
-            session.execute(
-                select(AssessmentItem)
-                .where(AssessmentItem.assessment_id == assessment_id)
-                .order_by(AssessmentItem.control_id)
-            )
-            .scalars()
-            .all()
-        )
+        if report.risks_stale:
+            refresh_risks(session, report)
+        session.commit()
+        assessed_at = session.execute(
+            select(Assessment.assessed_at).where(Assessment.id == assessment_id)
+        ).scalar_one()
+    else:
+        report, assessed_at = row
+
+    # An assessment on an older registry is rendered against its own
+    # version; POST /assessments/{id}/migrate moves it to the current one.
+    if report.registry_hash == registry.registry_hash:
+        domain_meta = registry.domains
+    else:
+        header = header_for_hash(session, report.registry_hash) or {}
+        domain_meta = {d["id"]: d for d in header.get("domains", [])}
+    return render(report, domain_meta, assessed_at)
+
+
+@app.get("/registry/versions", response_model=list[RegistryVersionOut])
+async def get_registry_versions() -> list[RegistryVersionOut]:
+    return await run_db(_get_registry_versions)
 
-        assessment_payload = {
-            "id": assessment.id,
-            "name": assessment.name,
-            "created_at": assessment.created_at,
-            "assessed_at": assessment.assessed_at,
-            "registry_hash": assessment.registry_hash,
-            "scope": assessment.scope,
-            "items": [_item_out(item).model_dump() for item in items],
-        }
 
-        return build_report(registry, assessment_payload)
+def _get_registry_versions(session: Session) -> list[RegistryVersionOut]:
+    ensure_registry_version(session, current_registry())
+    versions = [RegistryVersionOut(**v) for v in list_versions(session)]
+    session.commit()
+    return versions
 
 
-def _item_out(item: AssessmentItem) -> AssessmentItemOut:
+@app.get("/registry/diff", response_model=RegistryDiffOut)
+async def get_registry_diff(
+    from_hash: str = Query(alias="from"),
+    to_hash: str | None = Query(default=None, alias="to"),
+) -> RegistryDiffOut:
+    return await run_db(_get_registry_diff, from_hash, to_hash)
+
+
+def _get_registry_diff(session: Session, from_hash: str, to_hash: str | None) -> RegistryDiffOut:
+    diff = registry_diff(session, from_hash, to_hash or current_registry().registry_hash)
+    if diff is None:
+        raise HTTPException(status_code=404, detail="unknown registry_hash")
+    return RegistryDiffOut(**diff)
+
+
+@app.post("/assessments/migrate", response_model=RegistryMigrationOut)
+async def migrate_registry(payload: RegistryMigrationCreate) -> RegistryMigrationOut:
+    return await run_db(_migrate, payload.from_hash, payload.assessment_ids)
+
+
+@app.post("/assessments/{assessment_id}/migrate", response_model=RegistryMigrationOut)
+async def migrate_assessment(assessment_id: str) -> RegistryMigrationOut:
+    return await run_db(_migrate_one, assessment_id)
+
+
+def _migrate(session: Session, from_hash: str, assessment_ids: list[str] | None) -> RegistryMigrationOut:
+    try:
+        result = migrate_assessments(session, from_hash, current_registry(), assessment_ids)
+    except LookupError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    return RegistryMigrationOut(**result)
+
+
+def _migrate_one(session: Session, assessment_id: str) -> RegistryMigrationOut:
+    reg_hash = session.execute(
+        select(Assessment.registry_hash).where(Assessment.id == assessment_id)
+    ).scalar_one_or_none()
+    if reg_hash is None:
+        raise HTTPException(status_code=404, detail="assessment not found")
+    return _migrate(session, reg_hash, [assessment_id])
+
+
+def _item_out(item: AssessmentItem, control: dict[str, Any]) -> AssessmentItemOut:
     return AssessmentItemOut(
         control_id=item.control_id,
         domain=item.domain,
@@ -189,30 +727,158 @@ def _item_out(item: AssessmentItem) -> AssessmentItemOut:
         finding_text=item.finding_text or "",
         evidence_refs=item.evidence_refs or [],
         assessor_notes=item.assessor_notes or "",
-        control=item.control_raw or {},
+        control=control,
     )
 
 
-def _assessment_out(session: Any, assessment_id: str) -> AssessmentOut:
-    assessment = session.get(Assessment, assessment_id)
+# Item fields that map to assessment_items columns; "control" comes from
+# the registry and only needs control_id.
+_ITEM_COLUMN_FIELDS = (
+    "control_id",
+    "domain",
+    "weight",
+    "status",
+    "score",
+    "finding_text",
+    "evidence_refs",
+    "assessor_notes",
+)
+_ITEM_FIELDS = _ITEM_COLUMN_FIELDS + ("control",)
+_ITEM_DEFAULTS: dict[str, Any] = {"finding_text": "", "evidence_refs": [], "assessor_notes": ""}
+
+
+def _parse_fields(fields: str | None) -> tuple[str, ...]:
+    if not fields:
+        return _ITEM_FIELDS
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested.difference(_ITEM_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"unknown item field(s): {', '.join(sorted(unknown))}")
+    requested.add("control_id")
+    return tuple(f for f in _ITEM_FIELDS if f in requested)
+
+
+def _assessment_out(
+    session: Session,
+    assessment_id: str,
+    fields: tuple[str, ...] = _ITEM_FIELDS,
+    domains: tuple[str, ...] = (),
+    statuses: tuple[str, ...] = (),
+    after: str | None = None,
+    limit: int | None = None,
+) -> dict[str, Any]:
+    """Assessment with a filtered, paginated projection of its items.
+
+    Only the columns backing ``fields`` are selected. Items are ordered by
+    control_id, so ``after`` is a keyset cursor. One extra row is fetched
+    to tell the caller whether another page exists; the result is trimmed
+    to ``limit`` by the handler. Returned as a dict in the shape of
+    AssessmentPartialOut, with fields left out of the projection absent.
+    """
+    assessment = session.execute(
+        select(
+            Assessment.id,
+            Assessment.name,
+            Assessment.created_at,
+            Assessment.assessed_at,
+            Assessment.registry_hash,
+            Assessment.scope,
+        ).where(Assessment.id == assessment_id)
+    ).one_or_none()
     if not assessment:
         raise HTTPException(status_code=404, detail="assessment not found")
 
-    items = (
-        session.execute(
-            select(AssessmentItem)
-            .where(AssessmentItem.assessment_id == assessment_id)
-            .order_by(AssessmentItem.control_id)
-        )
-        .scalars()
-        .all()
+    items = AssessmentItem.__table__
+    stmt = select(*(items.c[f] for f in fields if f in _ITEM_COLUMN_FIELDS)).where(
+        items.c.assessment_id == assessment_id
+    )
+    if domains:
+        stmt = stmt.where(items.c.domain.in_(domains))
+    if statuses:
+        stmt = stmt.where(items.c.status.in_(statuses))
+    if after is not None:
+        stmt = stmt.where(items.c.control_id > after)
+    stmt = stmt.order_by(items.c.control_id)
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+
+    controls = controls_for_hash(session, assessment.registry_hash) if "control" in fields else {}
+    out_items: list[dict[str, Any]] = []
+    for row in session.execute(stmt).mappings():
+        values_ = {f: (row[f] if row[f] is not None else _ITEM_DEFAULTS.get(f)) for f in row.keys()}
+        if "control" in fields:
+            values_["control"] = controls.get(row["control_id"], {})
+        out_items.append(values_)
+
+    return {
+        "id": assessment.id,
+        "name": assessment.name,
+        "created_at": assessment.created_at,
+        "assessed_at": assessment.assessed_at,
+        "registry_hash": assessment.registry_hash,
+        "scope": assessment.scope,
+        "items": out_items,
+    }
+
+
+@app.post("/evidence", response_model=EvidenceOut)
+async def upload_evidence(request: Request) -> EvidenceOut:
+    """Store the raw request body; the returned ref can be used in evidence_refs."""
+    store = evidence_store()
+    writer = store.writer(request.headers.get("content-type", "application/octet-stream"))
+    limit = max_upload_bytes()
+    received = 0
+    pending = bytearray()
+    async for piece in request.stream():
+        received += len(piece)
+        if received > limit:
+            raise HTTPException(status_code=413, detail=f"evidence larger than {limit} bytes")
+        pending += piece
+        if len(pending) >= store.chunk_size:
+            await run_in_threadpool(writer.write, bytes(pending))
+            pending.clear()
+    if pending:
+        await run_in_threadpool(writer.write, bytes(pending))
+    info = await run_in_threadpool(writer.finish)
+    return EvidenceOut(
+        ref=info.ref,
+        size=info.size,
+        media_type=info.media_type,
+        chunks=len(info.chunks),
+        stored_bytes=info.stored,
     )
-    return AssessmentOut(
-        id=assessment.id,
-        name=assessment.name,
-        created_at=assessment.created_at,
-        assessed_at=assessment.assessed_at,
-        registry_hash=assessment.registry_hash,
-        scope=assessment.scope,
-        items=[_item_out(item) for item in items],
+
+
+@app.get("/evidence/{ref}")
+async def get_evidence(ref: str, request: Request) -> Response:
+    """Stream a stored artifact, honouring a single ``Range: bytes=`` request."""
+    store = evidence_store()
+    try:
+        info = await run_in_threadpool(store.stat, ref)
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=404, detail="evidence not found")
+
+    etag = f'"{ref.split(":", 1)[1]}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        # Content-addressed: a ref's bytes never change.
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    try:
+        span = parse_range(request.headers.get("range"), info.size)
+    except ValueError:
+        return Response(status_code=416, headers=dict(headers, **{"Content-Range": f"bytes */{info.size}"}))
+
+    start, end = span or (0, info.size)
+    headers["Content-Length"] = str(end - start)
+    if span is not None:
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{info.size}"
+    return StreamingResponse(
+        store.read_range(ref, start, end),
+        status_code=206 if span is not None else 200,
+        media_type=info.media_type,
+        headers=headers,
     )
@@ -0,0 +1,141 @@
+"""Ordered, idempotent schema migrations.
+
+Applied versions are recorded in ``schema_migrations``. Run on startup, or by
+hand with ``python -m app.migrations``. Migration 0 creates any table that
+does not exist yet from the models; every later migration must therefore
+tolerate finding its change already in place on a fresh database.
+"""
+
+from typing import Callable, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+
+def _column_exists(conn: Connection, table: str, column: str) -> bool:
+    return (
+        conn.execute(
+            text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = :table AND column_name = :column"
+            ),
+            {"table": table, "column": column},
+        ).first()
+        is not None
+    )
+
+
+def _constraint_exists(conn: Connection, name: str) -> bool:
+    return conn.execute(text("SELECT 1 FROM pg_constraint WHERE conname = :name"), {"name": name}).first() is not None
+
+
+def _0000_baseline(conn: Connection) -> None:
+    from .db import Base
+    from . import models  # noqa: F401  (registers tables on Base.metadata)
+
+    Base.metadata.create_all(bind=conn)
+
+
+def _0001_registry_versions(conn: Connection) -> None:
+    # Every hash referenced by an assessment gets a version row, then the
+    # first copy of each control_raw becomes that version's registry_controls
+    # row. Afterwards the per-item copies are dropped.
+    conn.execute(
+        text(
+            "INSERT INTO registry_versions (registry_hash, header, created_at) "
+            "SELECT DISTINCT registry_hash, '{}'::jsonb, now() FROM assessments "
+            "ON CONFLICT (registry_hash) DO NOTHING"
+        )
+    )
+    if _column_exists(conn, "assessment_items", "control_raw"):
+        conn.execute(
+            text(
+                "INSERT INTO registry_controls (registry_hash, control_id, domain, weight, control) "
+                "SELECT DISTINCT ON (a.registry_hash, i.control_id) "
+                "a.registry_hash, i.control_id, i.domain, i.weight, i.control_raw "
+                "FROM assessment_items i JOIN assessments a ON a.id = i.assessment_id "
+                "WHERE i.control_raw IS NOT NULL AND i.control_raw <> '{}'::jsonb "
+                "ORDER BY a.registry_hash, i.control_id "
+                "ON CONFLICT (registry_hash, control_id) DO NOTHING"
+            )
+        )
+        conn.execute(text("ALTER TABLE assessment_items DROP COLUMN control_raw"))
+    if not _constraint_exists(conn, "assessments_registry_hash_fkey"):
+        conn.execute(
+            text(
+                "ALTER TABLE assessments ADD CONSTRAINT assessments_registry_hash_fkey "
+                "FOREIGN KEY (registry_hash) REFERENCES registry_versions (registry_hash)"
+            )
+        )
+
+
+def _0002_assessment_list_indexes(conn: Connection) -> None:
+    conn.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_assessments_created_at_id ON assessments (created_at DESC, id DESC)")
+    )
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_assessments_registry_hash_created_at_id "
+            "ON assessments (registry_hash, created_at DESC, id DESC)"
+        )
+    )
+    conn.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_assessments_scope ON assessments USING gin (scope jsonb_path_ops)")
+    )
+
+
+def _0003_item_lookup_indexes(conn: Connection) -> None:
+    # (assessment_id, control_id) is the key for every item read and write;
+    # it replaces the unused standalone domain index.
+    conn.execute(
+        text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_assessment_items_assessment_control "
+            "ON assessment_items (assessment_id, control_id)"
+        )
+    )
+    conn.execute(text("DROP INDEX IF EXISTS ix_assessment_items_domain"))
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (0, "baseline", _0000_baseline),
+    (1, "registry_versions", _0001_registry_versions),
+    (2, "assessment_list_indexes", _0002_assessment_list_indexes),
+    (3, "item_lookup_indexes", _0003_item_lookup_indexes),
+]
+
+
+def apply(conn: Connection) -> List[int]:
+    """Apply pending migrations in order on ``conn``; returns the versions applied."""
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version integer PRIMARY KEY, name text NOT NULL, "
+            "applied_at timestamptz NOT NULL DEFAULT now())"
+        )
+    )
+    # Serialise concurrent workers starting at the same time.
+    conn.execute(text("LOCK TABLE schema_migrations IN EXCLUSIVE MODE"))
+    done = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+    applied: List[int] = []
+    for version, name, fn in MIGRATIONS:
+        if version in done:
+            continue
+        fn(conn)
+        conn.execute(
+            text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+            {"version": version, "name": name},
+        )
+        applied.append(version)
+    return applied
+
+
+def upgrade(engine: Engine) -> List[int]:
+    with engine.begin() as conn:
+        return apply(conn)
+
+
+if __name__ == "__main__":
+    from .db import engine
+
+    versions = upgrade(engine)
+    print(f"Applied migrations: {versions}" if versions else "Schema is up to date.")
@@ -1,12 +1,42 @@
 import uuid
 from datetime import datetime, timezone
-from sqlalchemy import String, Integer, DateTime, ForeignKey, Text
+from sqlalchemy import Boolean, String, Integer, DateTime, ForeignKey, Index, Text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .db import Base
 
 
+class RegistryVersion(Base):
+    __tablename__ = "registry_versions"
+
+    registry_hash: Mapped[str] = mapped_column(String, primary_key=True)
+    # controls.json without the controls list: meta, scoring, domains, counts, build.
+    header: Mapped[dict] = mapped_column(JSONB, default=dict)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+    )
+
+    controls: Mapped[list["RegistryControl"]] = relationship(
+        "RegistryControl",
+        back_populates="version",
+        cascade="all, delete-orphan",
+    )
+
+
+class RegistryControl(Base):
+    __tablename__ = "registry_controls"
+
+    registry_hash: Mapped[str] = mapped_column(ForeignKey("registry_versions.registry_hash"), primary_key=True)
+    control_id: Mapped[str] = mapped_column(String, primary_key=True)
+    domain: Mapped[str] = mapped_column(String)
+    weight: Mapped[int] = mapped_column(Integer)
+    control: Mapped[dict] = mapped_column(JSONB)
+
+    version: Mapped[RegistryVersion] = relationship("RegistryVersion", back_populates="controls")
+
+
 class Assessment(Base):
     __tablename__ = "assessments"
 
@@ -17,7 +47,7 @@ class Assessment(Base):
         default=lambda: datetime.now(timezone.utc),
     )
     assessed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
-    registry_hash: Mapped[str] = mapped_column(String)
+    registry_hash: Mapped[str] = mapped_column(ForeignKey("registry_versions.registry_hash"))
     scope: Mapped[dict] = mapped_column(JSONB, default=dict)
 
     items: Mapped[list["AssessmentItem"]] = relationship(
@@ -26,6 +56,13 @@ class Assessment(Base):
         cascade="all, delete-orphan",
     )
 
+    # Keyset pagination for GET /assessments walks (created_at, id) descending.
+    __table_args__ = (
+        Index("ix_assessments_created_at_id", created_at.desc(), id.desc()),
+        Index("ix_assessments_registry_hash_created_at_id", registry_hash, created_at.desc(), id.desc()),
+        Index("ix_assessments_scope", scope, postgresql_using="gin", postgresql_ops={"scope": "jsonb_path_ops"}),
+    )
+
 
 class AssessmentItem(Base):
     __tablename__ = "assessment_items"
@@ -33,7 +70,7 @@ class AssessmentItem(Base):
     id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     assessment_id: Mapped[str] = mapped_column(ForeignKey("assessments.id"))
     control_id: Mapped[str] = mapped_column(String, index=True)
-    domain: Mapped[str] = mapped_column(String, index=True)
+    domain: Mapped[str] = mapped_column(String)
     weight: Mapped[int] = mapped_column(Integer)
 
     status: Mapped[str] = mapped_column(String, default="not_assessed")
@@ -42,7 +79,31 @@ class AssessmentItem(Base):
     evidence_refs: Mapped[list[str]] = mapped_column(JSONB, default=list)
     assessor_notes: Mapped[str] = mapped_column(Text, default="")
 
-    control_raw: Mapped[dict] = mapped_column(JSONB, default=dict)
-
     assessment: Mapped[Assessment] = relationship("Assessment", back_populates="items")
 
+    # Every item query is scoped to one assessment; the unique index also
+    # serves as the assessment_id foreign-key index.
+    __table_args__ = (
+        Index("uq_assessment_items_assessment_control", "assessment_id", "control_id", unique=True),
+    )
+
+
+class AssessmentReport(Base):
+    """Materialised report aggregates, adjusted on every item update."""
+
+    __tablename__ = "assessment_reports"
+
+    assessment_id: Mapped[str] = mapped_column(ForeignKey("assessments.id", ondelete="CASCADE"), primary_key=True)
+    registry_hash: Mapped[str] = mapped_column(String)
+    max_score: Mapped[int] = mapped_column(Integer)
+    controls_total: Mapped[int] = mapped_column(Integer, default=0)
+    controls_assessed: Mapped[int] = mapped_column(Integer, default=0)
+    # {domain_id: {"weighted", "total", "assessed", "controls_total", "weight"}}
+    domains: Mapped[dict] = mapped_column(JSONB, default=dict)
+    # Best-first risk entries, at most report_cache.RISK_BUFFER long.
+    risks: Mapped[list] = mapped_column(JSONB, default=list)
+    risks_stale: Mapped[bool] = mapped_column(Boolean, default=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+    )
@@ -1,20 +1,235 @@
+import gzip
 import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from engine.registry import RegistryIndex, index_path, load_registry_index
+from engine.scoring import ScoringModel, compile_model
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
 
 
 def registry_path() -> Path:
     return Path(__file__).resolve().parents[2] / "dist" / "controls.json"
 
 
-def load_registry() -> Dict[str, Any]:
-    path = registry_path()
-    data = json.loads(path.read_text(encoding="utf-8"))
+def registry_sha_path() -> Path:
+    return registry_path().with_name("controls.sha256")
+
+
+def archived_registry(reg_hash: str) -> Optional[Dict[str, Any]]:
+    """A past registry from dist/archive/<registry_hash>.json, if the compiler kept it."""
+    if not reg_hash.isalnum():
+        return None
+    path = registry_path().with_name("archive") / f"{reg_hash}.json"
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    if data.get("build", {}).get("registry_hash") != reg_hash:
+        return None
+    return data
+
+
+def registry_index_path() -> Path:
+    return index_path(registry_path())
+
+
+def open_registry_index(path: Optional[Path] = None) -> RegistryIndex:
+    """Memory-map dist/controls.idx for lazy per-control lookups.
+
+    The index must carry the registry_hash recorded in controls.sha256;
+    ``RegistryIndex.verify`` re-hashes every record when stronger proof is
+    needed. Callers close the index when done.
+    """
+    index = load_registry_index(path or registry_index_path())
+    recorded = registry_sha_path().read_text(encoding="utf-8").split()[0]
+    if index.registry_hash != recorded:
+        index.close()
+        raise ValueError(f"controls.idx has registry_hash {index.registry_hash}, controls.sha256 records {recorded}")
+    return index
+
+
+@dataclass(frozen=True)
+class CompiledRegistry:
+    """Parsed controls.json plus the lookups every request path needs.
+
+    Instances are shared between worker threads and must be treated as
+    read-only, including the control dicts they hold.
+    """
+
+    raw: Dict[str, Any]
+    registry_hash: str
+    controls: Tuple[Dict[str, Any], ...]
+    controls_by_id: Mapping[str, Dict[str, Any]]
+    controls_by_domain: Mapping[str, Tuple[Dict[str, Any], ...]]
+    domains: Mapping[str, Dict[str, Any]]
+    min_score: int
+    max_score: int
+    scoring: ScoringModel
+    # Pre-encoded GET /registry bodies; identical bytes to FastAPI's own encoder.
+    json_bytes: bytes
+    gzip_bytes: bytes
+    br_bytes: Optional[bytes]
+
+
+def encode_registry(data: Dict[str, Any]) -> bytes:
+    return json.dumps(
+        data,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def compile_registry(data: Dict[str, Any]) -> CompiledRegistry:
     if "build" not in data or "registry_hash" not in data["build"]:
         raise ValueError("controls.json missing build.registry_hash")
-    return data
+
+    controls = tuple(sorted(data.get("controls", []), key=lambda x: x["id"]))
+    by_domain: Dict[str, list] = {}
+    for c in controls:
+        by_domain.setdefault(c["domain"], []).append(c)
+
+    scale = data.get("scoring", {}).get("scale", {})
+    body = encode_registry(data)
+    return CompiledRegistry(
+        raw=data,
+        registry_hash=data["build"]["registry_hash"],
+        controls=controls,
+        controls_by_id=MappingProxyType({c["id"]: c for c in controls}),
+        controls_by_domain=MappingProxyType({d: tuple(cs) for d, cs in sorted(by_domain.items())}),
+        domains=MappingProxyType({d["id"]: d for d in data.get("domains", [])}),
+        min_score=int(scale.get("min", 0)),
+        max_score=int(scale.get("max", 2)),
+        scoring=compile_model(data),
+        json_bytes=body,
+        gzip_bytes=gzip.compress(body, compresslevel=9, mtime=0),
+        br_bytes=brotli.compress(body) if brotli is not None else None,
+    )
+
+
+def _fingerprint(*paths: Path) -> Tuple[Tuple[int, int], ...]:
+    stamps = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+        except FileNotFoundError:
+            stamps.append((-1, -1))
+            continue
+        stamps.append((st.st_mtime_ns, st.st_size))
+    return tuple(stamps)
+
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_cached: Optional[CompiledRegistry] = None
+_cached_fingerprint: Optional[Tuple[Tuple[int, int], ...]] = None
+_watcher: Optional[threading.Thread] = None
+_watcher_stop = threading.Event()
+
+
+def _reload(fingerprint: Tuple[Tuple[int, int], ...]) -> CompiledRegistry:
+    global _cached, _cached_fingerprint
+
+    with _lock:
+        if _cached is not None and fingerprint == _cached_fingerprint:
+            return _cached
+        data = json.loads(registry_path().read_text(encoding="utf-8"))
+        compiled = compile_registry(data)
+        # Keep the existing object when the content hash is unchanged (e.g. a
+        # recompile that only touched build.compiled_at) so identity-keyed
+        # caches downstream stay warm.
+        if _cached is not None and _cached.registry_hash == compiled.registry_hash:
+            compiled = _cached
+        _cached = compiled
+        _cached_fingerprint = fingerprint
+        return compiled
+
+
+def current_registry() -> CompiledRegistry:
+    """Return the compiled registry, re-parsing only when dist/ changed.
+
+    While the watcher thread runs (see ``start_registry_watcher``) this is a
+    plain read of the swapped-in object. Without it, the mtime/size of
+    controls.json and controls.sha256 are checked on every call and the JSON
+    is only read when one of them differs from the cached snapshot.
+    """
+    current = _cached
+    if current is not None and _watcher is not None:
+        return current
+
+    fingerprint = _fingerprint(registry_path(), registry_sha_path())
+    if current is not None and fingerprint == _cached_fingerprint:
+        return current
+    return _reload(fingerprint)
+
+
+def _watch(interval: float) -> None:
+    while not _watcher_stop.wait(interval):
+        try:
+            fingerprint = _fingerprint(registry_path(), registry_sha_path())
+            if fingerprint == _cached_fingerprint:
+                continue
+            previous = _cached
+            compiled = _reload(fingerprint)
+        except Exception:
+            # Any failure (a malformed registry can raise TypeError as well as
+            # ValueError) must not end the thread: current_registry skips its
+            # own stat check while the watcher is registered. Keep serving the
+            # previous registry; a later tick retries.
+            logger.exception("registry reload failed")
+            continue
+        if compiled is not previous:
+            logger.info("registry swapped to %s", compiled.registry_hash)
+
+
+def start_registry_watcher(interval: float) -> None:
+    """Poll dist/ every ``interval`` seconds and swap the registry in place.
+
+    tools/compile_controls.py replaces controls.json atomically, so a changed
+    fingerprint always points at a complete file.
+    """
+    global _watcher
+
+    if _watcher is not None:
+        return
+    current_registry()
+    _watcher_stop.clear()
+    _watcher = threading.Thread(target=_watch, args=(interval,), name="registry-watcher", daemon=True)
+    _watcher.start()
+
+
+def stop_registry_watcher() -> None:
+    global _watcher
+
+    if _watcher is None:
+        return
+    _watcher_stop.set()
+    _watcher.join()
+    _watcher = None
+
+
+def clear_registry_cache() -> None:
+    global _cached, _cached_fingerprint
+    with _lock:
+        _cached = None
+        _cached_fingerprint = None
+
+
+def load_registry() -> Dict[str, Any]:
+    return current_registry().raw
 
 
 def registry_hash(registry: Dict[str, Any]) -> str:
     return registry["build"]["registry_hash"]
-
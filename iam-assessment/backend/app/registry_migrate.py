@@ -0,0 +1,190 @@
+"""Move assessments from one registry version to the current one in bulk.
+
+Items for unchanged controls stay exactly as they are. For the whole set of
+assessments at once, set-based statements delete items of removed controls,
+insert not-assessed items for added controls, refresh domain/weight of
+controls whose scoring changed (see engine.registry.SCORING_FIELDS) and flag
+their assessed items ``needs_reassessment`` (score, finding text and
+evidence kept for the assessor to review). Controls that changed only
+outside scoring need nothing: item control details are read from the
+assessment's registry version. The migrated assessments' report rows are
+dropped and rebuilt lazily on their next read.
+
+Run ``python -m app.registry_migrate [FROM_HASH ...]`` to migrate every
+assessment (or those on the given versions) to the current registry.
+"""
+
+import sys
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import Integer, String, cast, column, delete, func, literal, select, true, update, values
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.orm import Session
+
+from engine.registry import diff_controls
+
+from .models import Assessment, AssessmentItem, AssessmentReport
+from .registry import CompiledRegistry
+from .registry_store import controls_for_hash, ensure_registry_version
+
+
+NEEDS_REASSESSMENT = "needs_reassessment"
+
+
+def _control_values(controls: Sequence[Dict[str, Any]]) -> Any:
+    return values(
+        column("control_id", String),
+        column("domain", String),
+        column("weight", Integer),
+        name="v",
+    ).data([(c["id"], c["domain"], c["weight"]) for c in controls])
+
+
+def registry_diff(session: Session, from_hash: str, to_hash: str) -> Optional[Dict[str, Any]]:
+    """diff_controls between two stored or archived versions; None if either is unknown."""
+    old = controls_for_hash(session, from_hash)
+    new = controls_for_hash(session, to_hash)
+    if not old or not new:
+        return None
+    return dict(diff_controls(old, new), from_hash=from_hash, to_hash=to_hash)
+
+
+def migrate_assessments(
+    session: Session,
+    from_hash: str,
+    registry: CompiledRegistry,
+    assessment_ids: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """Migrate assessments on ``from_hash`` to ``registry`` and commit.
+
+    Raises LookupError when ``from_hash`` is not a known registry version.
+    """
+    old = controls_for_hash(session, from_hash)
+    if not old:
+        raise LookupError(f"unknown registry_hash '{from_hash}'")
+    diff = diff_controls(old, registry.controls_by_id)
+    changed_ids = [c["control_id"] for c in diff["changed"]]
+    result: Dict[str, Any] = {
+        "from_hash": from_hash,
+        "to_hash": registry.registry_hash,
+        "assessments_migrated": 0,
+        "added": diff["added"],
+        "removed": diff["removed"],
+        "changed": changed_ids,
+        "text_changed": [c["control_id"] for c in diff["text_changed"]],
+        "items_needing_reassessment": 0,
+    }
+    if from_hash == registry.registry_hash:
+        return result
+    ensure_registry_version(session, registry)
+
+    in_scope = [Assessment.registry_hash == from_hash]
+    if assessment_ids is not None:
+        in_scope.append(Assessment.id.in_(assessment_ids))
+    scope = select(Assessment.id).where(*in_scope)
+    # Lock the assessments first; item writers then wait on their report rows.
+    migrated = session.execute(scope.order_by(Assessment.id).with_for_update()).scalars().all()
+    if not migrated:
+        return result
+
+    items = AssessmentItem.__table__
+    session.execute(delete(AssessmentReport).where(AssessmentReport.assessment_id.in_(scope)))
+
+    if diff["removed"]:
+        session.execute(
+            delete(items).where(items.c.assessment_id.in_(scope)).where(items.c.control_id.in_(diff["removed"]))
+        )
+
+    if changed_ids:
+        v = _control_values([registry.controls_by_id[cid] for cid in changed_ids])
+        session.execute(
+            update(items)
+            .where(items.c.assessment_id.in_(scope))
+            .where(items.c.control_id == v.c.control_id)
+            .values(domain=v.c.domain, weight=v.c.weight)
+        )
+        reset = session.execute(
+            update(items)
+            .where(items.c.assessment_id.in_(scope))
+            .where(items.c.control_id.in_(changed_ids))
+            .where(items.c.status == "assessed")
+            .values(status=NEEDS_REASSESSMENT)
+        )
+        result["items_needing_reassessment"] = reset.rowcount
+
+    if diff["added"]:
+        v = _control_values([registry.controls_by_id[cid] for cid in diff["added"]])
+        assessments = Assessment.__table__
+        session.execute(
+            insert(items)
+            .from_select(
+                [
+                    "id",
+                    "assessment_id",
+                    "control_id",
+                    "domain",
+                    "weight",
+                    "status",
+                    "score",
+                    "finding_text",
+                    "evidence_refs",
+                    "assessor_notes",
+                ],
+                select(
+                    cast(func.gen_random_uuid(), String),
+                    assessments.c.id,
+                    v.c.control_id,
+                    v.c.domain,
+                    v.c.weight,
+                    literal("not_assessed"),
+                    literal(None, Integer),
+                    literal(""),
+                    cast(literal("[]"), JSONB),
+                    literal(""),
+                )
+                .select_from(assessments.join(v, true()))
+                .where(*in_scope),
+            )
+            .on_conflict_do_nothing(index_elements=["assessment_id", "control_id"])
+        )
+
+    session.execute(update(Assessment).where(*in_scope).values(registry_hash=registry.registry_hash))
+    session.commit()
+    result["assessments_migrated"] = len(migrated)
+    return result
+
+
+def main(argv: List[str]) -> int:
+    from .db import SessionLocal
+    from .registry import current_registry
+
+    registry = current_registry()
+    with SessionLocal() as session:
+        hashes = argv or list(
+            session.execute(
+                select(Assessment.registry_hash)
+                .where(Assessment.registry_hash != registry.registry_hash)
+                .distinct()
+            ).scalars()
+        )
+        if not hashes:
+            print("Every assessment is on the current registry.")
+            return 0
+        for from_hash in hashes:
+            try:
+                result = migrate_assessments(session, from_hash, registry)
+            except LookupError as exc:
+                print(exc, file=sys.stderr)
+                return 1
+            print(
+                f"{from_hash[:12]} -> {registry.registry_hash[:12]}: "
+                f"{result['assessments_migrated']} assessment(s), {len(result['added'])} added, "
+                f"{len(result['removed'])} removed, {len(result['changed'])} changed and "
+                f"{len(result['text_changed'])} otherwise changed control(s), "
+                f"{result['items_needing_reassessment']} item(s) need re-assessment."
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,149 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Mapping, Optional
+
+from sqlalchemy import event, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from .models import RegistryControl, RegistryVersion
+from .registry import CompiledRegistry, archived_registry, current_registry
+
+
+# Registry versions are immutable once written, so anything keyed by hash can
+# be cached for the life of the process.
+_known_hashes: set[str] = set()
+_controls_cache: "OrderedDict[str, Mapping[str, Dict[str, Any]]]" = OrderedDict()
+_controls_cache_size = 8
+_headers: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+# Session.info key for hashes inserted by a transaction that has not committed yet.
+_PENDING_KEY = "registry_store.pending_hashes"
+
+
+def ensure_registry_version(session: Session, registry: CompiledRegistry) -> None:
+    """Persist the registry's controls once, keyed by registry_hash.
+
+    The rows are written in the caller's transaction and only flushed; the
+    caller commits. The in-process "already stored" marker is set once that
+    transaction commits, so it can never outlive a rolled-back insert.
+    """
+    if registry.registry_hash in _known_hashes:
+        return
+
+    header = {k: v for k, v in registry.raw.items() if k != "controls"}
+    session.execute(
+        insert(RegistryVersion)
+        .values(registry_hash=registry.registry_hash, header=header)
+        .on_conflict_do_nothing(index_elements=["registry_hash"])
+    )
+    if registry.controls:
+        session.execute(
+            insert(RegistryControl)
+            .values(
+                [
+                    {
+                        "registry_hash": registry.registry_hash,
+                        "control_id": c["id"],
+                        "domain": c["domain"],
+                        "weight": c["weight"],
+                        "control": c,
+                    }
+                    for c in registry.controls
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=["registry_hash", "control_id"])
+        )
+    session.flush()
+    session.info.setdefault(_PENDING_KEY, set()).add(registry.registry_hash)
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_committed(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        with _lock:
+            _known_hashes.update(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def controls_for_hash(session: Session, reg_hash: str) -> Mapping[str, Dict[str, Any]]:
+    """Control dicts by id for a registry version.
+
+    The current registry is served from memory; older versions are read from
+    registry_controls once and then kept in a small LRU.
+    """
+    registry = current_registry()
+    if reg_hash == registry.registry_hash:
+        return registry.controls_by_id
+
+    with _lock:
+        cached = _controls_cache.get(reg_hash)
+        if cached is not None:
+            _controls_cache.move_to_end(reg_hash)
+            return cached
+
+    rows = session.execute(
+        select(RegistryControl.control_id, RegistryControl.control).where(
+            RegistryControl.registry_hash == reg_hash
+        )
+    ).all()
+    controls = {row.control_id: row.control for row in rows}
+    if not controls:
+        archived = archived_registry(reg_hash)
+        if archived is None:
+            return controls
+        controls = {c["id"]: c for c in archived.get("controls", [])}
+
+    with _lock:
+        _controls_cache[reg_hash] = controls
+        while len(_controls_cache) > _controls_cache_size:
+            _controls_cache.popitem(last=False)
+    return controls
+
+
+def header_for_hash(session: Session, reg_hash: str) -> Optional[Dict[str, Any]]:
+    """Registry metadata (everything but controls) for a version, or None if unknown.
+
+    Versions backfilled from item copies have an empty stored header; the
+    compiler's archive fills it in when available.
+    """
+    registry = current_registry()
+    if reg_hash == registry.registry_hash:
+        return {k: v for k, v in registry.raw.items() if k != "controls"}
+
+    with _lock:
+        cached = _headers.get(reg_hash)
+    if cached is not None:
+        return cached
+
+    header = session.execute(
+        select(RegistryVersion.header).where(RegistryVersion.registry_hash == reg_hash)
+    ).scalar_one_or_none()
+    if not header:
+        archived = archived_registry(reg_hash)
+        if archived is not None:
+            header = {k: v for k, v in archived.items() if k != "controls"}
+    if header is None:
+        return None
+    with _lock:
+        _headers[reg_hash] = header
+    return header
+
+
+def list_versions(session: Session) -> List[Dict[str, Any]]:
+    """Stored registry versions, newest first, with their control counts."""
+    rows = session.execute(
+        select(RegistryVersion.registry_hash, RegistryVersion.created_at, func.count(RegistryControl.control_id))
+        .outerjoin(RegistryControl, RegistryControl.registry_hash == RegistryVersion.registry_hash)
+        .group_by(RegistryVersion.registry_hash, RegistryVersion.created_at)
+        .order_by(RegistryVersion.created_at.desc(), RegistryVersion.registry_hash)
+    ).all()
+    return [
+        {"registry_hash": reg_hash, "created_at": created_at, "controls": count}
+        for reg_hash, created_at, count in rows
+    ]
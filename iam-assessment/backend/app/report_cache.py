@@ -0,0 +1,405 @@
+"""Materialised per-assessment report aggregates.
+
+Each assessment has one ``assessment_reports`` row holding per-domain
+weighted sums, assessed counts and a bounded best-first list of risk
+entries. Item updates adjust the row by the item's delta instead of
+re-reading every item, so GET /report is a single-row read.
+
+The risk list keeps the top ``RISK_BUFFER`` entries. When an entry that was
+in a full buffer drops to its tail (or out of it), an item outside the buffer
+may now outrank it; the row is then flagged ``risks_stale`` and the buffer is
+refilled from assessment_items on the next report read.
+
+Run ``python -m app.report_cache check`` to compare every cached report with
+a full recomputation, or ``rebuild`` to recompute them.
+"""
+
+import heapq
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from engine.scoring import ScoringModel, compile_model, score, weighted_score
+
+from .findings_import import scoring_model_for
+from .models import Assessment, AssessmentItem, AssessmentReport
+from .registry import CompiledRegistry
+from .registry_store import controls_for_hash
+
+
+TOP_RISKS = 5
+RISK_BUFFER = 20
+
+
+def _risk_key(entry: Mapping[str, Any]) -> Tuple[int, int, str]:
+    return (-entry["risk_score"], -entry["weight"], entry["control_id"])
+
+
+def _is_scored(item: Mapping[str, Any]) -> bool:
+    return item["status"] == "assessed" and item["score"] is not None
+
+
+def _risk_entry(item: Mapping[str, Any], max_score: int, title: str) -> Dict[str, Any]:
+    return {
+        "control_id": item["control_id"],
+        "domain": item["domain"],
+        "weight": item["weight"],
+        "score": item["score"],
+        "risk_score": (max_score - item["score"]) * item["weight"],
+        "title": title,
+        "finding": item["finding_text"] or "",
+    }
+
+
+def _empty_domains(controls: Iterable[Mapping[str, Any]]) -> Dict[str, Dict[str, int]]:
+    domains: Dict[str, Dict[str, int]] = {}
+    for c in controls:
+        d = domains.setdefault(
+            c["domain"],
+            {"weighted": 0, "total": 0, "assessed": 0, "controls_total": 0, "weight": 0},
+        )
+        d["controls_total"] += 1
+        d["weight"] += c["weight"]
+    return domains
+
+
+def initial_row(assessment_id: str, registry: CompiledRegistry) -> Dict[str, Any]:
+    """Row for a freshly created assessment (every item not_assessed)."""
+    return {
+        "assessment_id": assessment_id,
+        "registry_hash": registry.registry_hash,
+        "max_score": registry.max_score,
+        "controls_total": len(registry.controls),
+        "controls_assessed": 0,
+        "domains": _empty_domains(registry.controls),
+        "risks": [],
+        "risks_stale": False,
+        "updated_at": datetime.now(timezone.utc),
+    }
+
+
+def row_from_items(
+    assessment_id: str,
+    model: ScoringModel,
+    items: Iterable[Mapping[str, Any]],
+    controls: Mapping[str, Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Full recomputation, used for rebuilds and rows that do not exist yet.
+
+    Scored with ``engine.scoring.score`` on ``model``, the scoring model of
+    the assessment's own registry version (which may differ from the current
+    registry); ``controls`` is that version's controls, for risk titles.
+    """
+    max_score = model.max_score
+    scores = model.new_scores()
+    by_id: Dict[str, Mapping[str, Any]] = {}
+    controls_total = 0
+    for item in items:
+        controls_total += 1
+        index = model.index.get(item["control_id"])
+        if index is not None and _is_scored(item):
+            scores[index] = item["score"]
+            by_id[item["control_id"]] = item
+    summary = score(model, scores, top_k=RISK_BUFFER)
+
+    domains = {
+        domain_id: {
+            "weighted": summary.domain_weighted[d],
+            "total": summary.domain_assessed_weight[d] * max_score,
+            "assessed": summary.domain_assessed[d],
+            "controls_total": model.domain_controls_total[d],
+            "weight": model.domain_weight[d],
+        }
+        for d, domain_id in enumerate(model.domain_ids)
+    }
+    risks = []
+    for i in summary.top_risks:
+        control_id = model.control_ids[i]
+        risks.append(_risk_entry(by_id[control_id], max_score, controls.get(control_id, {}).get("title", "")))
+    return {
+        "assessment_id": assessment_id,
+        "registry_hash": model.registry_hash,
+        "max_score": max_score,
+        "controls_total": controls_total,
+        "controls_assessed": summary.controls_assessed,
+        "domains": domains,
+        "risks": risks,
+        "risks_stale": False,
+        "updated_at": datetime.now(timezone.utc),
+    }
+
+
+def apply_item_change(
+    report: AssessmentReport,
+    old: Mapping[str, Any],
+    new: Mapping[str, Any],
+    title: str,
+) -> None:
+    """Adjust ``report`` for one item going from ``old`` to ``new`` state."""
+    max_score = report.max_score
+    domains = {k: dict(v) for k, v in report.domains.items()}
+    d = domains.get(new["domain"])
+
+    if _is_scored(old):
+        report.controls_assessed -= 1
+        if d is not None:
+            d["weighted"] -= old["weight"] * old["score"]
+            d["total"] -= old["weight"] * max_score
+            d["assessed"] -= 1
+    if _is_scored(new):
+        report.controls_assessed += 1
+        if d is not None:
+            d["weighted"] += new["weight"] * new["score"]
+            d["total"] += new["weight"] * max_score
+            d["assessed"] += 1
+    report.domains = domains
+
+    risks = list(report.risks)
+    was_full = len(risks) >= RISK_BUFFER
+    position = next((i for i, r in enumerate(risks) if r["control_id"] == new["control_id"]), None)
+    if position is not None:
+        del risks[position]
+
+    entry = _risk_entry(new, max_score, title) if _is_scored(new) else None
+    if entry is not None:
+        key = _risk_key(entry)
+        index = next((i for i, r in enumerate(risks) if _risk_key(r) > key), len(risks))
+        risks.insert(index, entry)
+        at_tail = index == len(risks) - 1
+    else:
+        at_tail = True
+
+    if position is not None and was_full and at_tail:
+        # The entry left or sank to the end of a full buffer; something
+        # outside the buffer may rank above it now.
+        report.risks_stale = True
+    report.risks = risks[:RISK_BUFFER]
+    report.updated_at = datetime.now(timezone.utc)
+
+
+def apply_item_changes(
+    report: AssessmentReport,
+    changes: Iterable[Tuple[Mapping[str, Any], Mapping[str, Any], str]],
+) -> None:
+    """``apply_item_change`` for many ``(old, new, title)`` changes at once.
+
+    Domain sums are adjusted in one pass and the risk buffer is rebuilt once.
+    The buffer is flagged stale only when its new last entry ranks below the
+    old one's, since only then can an item outside the buffer outrank it.
+    """
+    max_score = report.max_score
+    domains = {k: dict(v) for k, v in report.domains.items()}
+    assessed = report.controls_assessed
+    entries: Dict[str, Optional[Dict[str, Any]]] = {}
+    for old, new, title in changes:
+        d = domains.get(new["domain"])
+        if _is_scored(old):
+            assessed -= 1
+            if d is not None:
+                d["weighted"] -= old["weight"] * old["score"]
+                d["total"] -= old["weight"] * max_score
+                d["assessed"] -= 1
+        if _is_scored(new):
+            assessed += 1
+            if d is not None:
+                d["weighted"] += new["weight"] * new["score"]
+                d["total"] += new["weight"] * max_score
+                d["assessed"] += 1
+        entries[new["control_id"]] = _risk_entry(new, max_score, title) if _is_scored(new) else None
+    if not entries:
+        return
+    report.controls_assessed = assessed
+    report.domains = domains
+
+    old_risks = report.risks
+    risks = [r for r in old_risks if r["control_id"] not in entries]
+    risks.extend(e for e in entries.values() if e is not None)
+    risks = heapq.nsmallest(RISK_BUFFER, risks, key=_risk_key)
+    if len(old_risks) >= RISK_BUFFER and (
+        len(risks) < RISK_BUFFER or _risk_key(risks[-1]) > _risk_key(old_risks[-1])
+    ):
+        report.risks_stale = True
+    report.risks = risks
+    report.updated_at = datetime.now(timezone.utc)
+
+
+def load_for_update(session: Session, assessment_id: str) -> Optional[AssessmentReport]:
+    """Lock (or lazily build) the report row for ``assessment_id``.
+
+    Every item writer takes this lock before touching items so deltas for the
+    same assessment are applied one transaction at a time.
+    """
+    report = session.execute(
+        select(AssessmentReport).where(AssessmentReport.assessment_id == assessment_id).with_for_update()
+    ).scalar_one_or_none()
+    if report is not None:
+        return report
+
+    assessment = session.execute(
+        select(Assessment).where(Assessment.id == assessment_id).with_for_update()
+    ).scalar_one_or_none()
+    if assessment is None:
+        return None
+    report = session.get(AssessmentReport, assessment_id, with_for_update=True)
+    if report is None:
+        report = AssessmentReport(**_recompute(session, assessment_id, assessment.registry_hash))
+        session.add(report)
+        session.flush()
+    return report
+
+
+def _item_rows(session: Session, assessment_id: str) -> List[Mapping[str, Any]]:
+    items = AssessmentItem.__table__
+    return list(
+        session.execute(
+            select(
+                items.c.control_id,
+                items.c.domain,
+                items.c.weight,
+                items.c.status,
+                items.c.score,
+                items.c.finding_text,
+            )
+            .where(items.c.assessment_id == assessment_id)
+            .order_by(items.c.control_id)
+        ).mappings()
+    )
+
+
+def _recompute(session: Session, assessment_id: str, reg_hash: str) -> Dict[str, Any]:
+    model = scoring_model_for(session, reg_hash) or compile_model({"build": {"registry_hash": reg_hash}})
+    controls = controls_for_hash(session, reg_hash)
+    return row_from_items(assessment_id, model, _item_rows(session, assessment_id), controls)
+
+
+def refresh_risks(session: Session, report: AssessmentReport) -> None:
+    """Refill a stale risk buffer with one indexed query."""
+    items = AssessmentItem.__table__
+    risk = (report.max_score - items.c.score) * items.c.weight
+    rows = session.execute(
+        select(
+            items.c.control_id,
+            items.c.domain,
+            items.c.weight,
+            items.c.status,
+            items.c.score,
+            items.c.finding_text,
+        )
+        .where(items.c.assessment_id == report.assessment_id)
+        .where(items.c.status == "assessed")
+        .where(items.c.score.is_not(None))
+        .order_by(risk.desc(), items.c.weight.desc(), items.c.control_id)
+        .limit(RISK_BUFFER)
+    ).mappings()
+    controls = controls_for_hash(session, report.registry_hash)
+    report.risks = [
+        _risk_entry(row, report.max_score, controls.get(row["control_id"], {}).get("title", ""))
+        for row in rows
+    ]
+    report.risks_stale = False
+
+
+def _score(weighted: int, total: int, assessed: int) -> Optional[float]:
+    return weighted_score(weighted, total) if assessed else None
+
+
+def render(
+    report: AssessmentReport,
+    domain_meta: Mapping[str, Mapping[str, Any]],
+    assessed_at: Optional[datetime],
+) -> Dict[str, Any]:
+    """Report document with the same shape and values as ``build_report``.
+
+    ``domain_meta`` (domain dicts by id) should come from the report's own
+    registry version.
+    """
+    domain_reports: List[Dict[str, Any]] = []
+    weighted = total = 0
+    for domain_id in sorted(report.domains.keys()):
+        d = report.domains[domain_id]
+        weighted += d["weighted"]
+        total += d["total"]
+        meta = domain_meta.get(domain_id, {})
+        domain_reports.append(
+            {
+                "id": domain_id,
+                "name": meta.get("name", ""),
+                "description": meta.get("description", ""),
+                "score": _score(d["weighted"], d["total"], d["assessed"]),
+                "controls_assessed": d["assessed"],
+                "controls_total": d["controls_total"],
+                "weight": d["weight"],
+            }
+        )
+
+    return {
+        "registry_hash": report.registry_hash,
+        "assessed_at": assessed_at,
+        "summary": {
+            "overall_score": _score(weighted, total, report.controls_assessed),
+            "controls_assessed": report.controls_assessed,
+            "controls_total": report.controls_total,
+            "controls_not_assessed": report.controls_total - report.controls_assessed,
+        },
+        "domains": domain_reports,
+        "top_risks": report.risks[:TOP_RISKS],
+    }
+
+
+_STATE_FIELDS = ("controls_total", "controls_assessed", "domains")
+
+
+def check(session: Session, repair: bool = False) -> List[Tuple[str, str]]:
+    """Compare every cached row with a recomputation; optionally repair drift.
+
+    Returns ``(assessment_id, "missing" | "drift")`` pairs. Missing rows are
+    not an error (they are built lazily on first use) but ``rebuild`` creates
+    them up front.
+    """
+    drifted: List[Tuple[str, str]] = []
+    ids = session.execute(select(Assessment.id, Assessment.registry_hash).order_by(Assessment.id)).all()
+    for assessment_id, reg_hash in ids:
+        report = session.get(AssessmentReport, assessment_id, with_for_update=repair)
+        expected = _recompute(session, assessment_id, reg_hash)
+        if report is None:
+            drifted.append((assessment_id, "missing"))
+            if repair:
+                session.add(AssessmentReport(**expected))
+                session.commit()
+            continue
+        # A stale buffer is expected to differ; only the visible top must match.
+        risks_ok = report.risks_stale or report.risks[:TOP_RISKS] == expected["risks"][:TOP_RISKS]
+        same = risks_ok and all(getattr(report, f) == expected[f] for f in _STATE_FIELDS)
+        if not same:
+            drifted.append((assessment_id, "drift"))
+            if repair:
+                for field, value in expected.items():
+                    setattr(report, field, value)
+        if repair:
+            session.commit()
+    return drifted
+
+
+def main(argv: List[str]) -> int:
+    from .db import SessionLocal
+
+    if len(argv) != 1 or argv[0] not in {"check", "rebuild"}:
+        print("usage: python -m app.report_cache check|rebuild", file=sys.stderr)
+        return 2
+
+    rebuild = argv[0] == "rebuild"
+    with SessionLocal() as session:
+        results = check(session, repair=rebuild)
+    for assessment_id, reason in results:
+        print(f"{reason}: {assessment_id}")
+    drifted = sum(1 for _, reason in results if reason == "drift")
+    missing = len(results) - drifted
+    print(f"{drifted} drifted, {missing} missing report row(s){' rebuilt' if rebuild else ''}.")
+    return 1 if drifted and not rebuild else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,52 @@
+"""JSON responses encoded straight from plain dicts.
+
+Routes on the hot read paths build their payloads as dicts and lists in the
+shape of their ``response_model`` and return ``JSONBytes``. FastAPI does not
+validate or re-serialize a returned ``Response``, so the Pydantic round trip
+(models built in the handler, validated again against the response model,
+dumped and then encoded by ``json.dumps``) is skipped; the decorator's
+``response_model`` still documents the route in OpenAPI.
+
+Output is byte-for-byte what the Pydantic path produced: compact UTF-8 JSON
+with UTC datetimes written with a ``Z`` suffix. orjson is used when it is
+installed, the json module otherwise.
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class JSONBytes(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
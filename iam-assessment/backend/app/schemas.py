@@ -8,6 +8,10 @@ class AssessmentCreate(BaseModel):
     scope: dict[str, Any] = Field(default_factory=dict)
 
 
+class AssessmentBatchCreate(BaseModel):
+    assessments: list[AssessmentCreate] = Field(min_length=1, max_length=1000)
+
+
 class AssessmentItemUpdate(BaseModel):
     status: Optional[str] = None
     score: Optional[int] = None
@@ -16,6 +20,10 @@ class AssessmentItemUpdate(BaseModel):
     assessor_notes: Optional[str] = None
 
 
+class AssessmentItemBatchUpdate(AssessmentItemUpdate):
+    control_id: str
+
+
 class AssessmentItemOut(BaseModel):
     control_id: str
     domain: str
@@ -38,6 +46,34 @@ class AssessmentOut(BaseModel):
     items: list[AssessmentItemOut]
 
 
+class AssessmentItemPartialOut(BaseModel):
+    """AssessmentItemOut with every field except control_id optional.
+
+    Returned by GET /assessments/{id} with exclude_unset, so fields left out
+    of a ``fields=`` projection are omitted rather than sent as null.
+    """
+
+    control_id: str
+    domain: Optional[str] = None
+    weight: Optional[int] = None
+    status: Optional[str] = None
+    score: Optional[int] = None
+    finding_text: Optional[str] = None
+    evidence_refs: Optional[list[str]] = None
+    assessor_notes: Optional[str] = None
+    control: Optional[dict[str, Any]] = None
+
+
+class AssessmentPartialOut(BaseModel):
+    id: str
+    name: str
+    created_at: datetime
+    assessed_at: Optional[datetime] = None
+    registry_hash: str
+    scope: dict[str, Any]
+    items: list[AssessmentItemPartialOut]
+
+
 class AssessmentListOut(BaseModel):
     id: str
     name: str
@@ -52,3 +88,56 @@ class ReportOut(BaseModel):
     domains: list[dict[str, Any]]
     top_risks: list[dict[str, Any]]
 
+
+class RegistryVersionOut(BaseModel):
+    registry_hash: str
+    created_at: datetime
+    controls: int
+
+
+class ControlChangeOut(BaseModel):
+    control_id: str
+    fields: list[str]
+
+
+class RegistryDiffOut(BaseModel):
+    from_hash: str
+    to_hash: str
+    added: list[str]
+    removed: list[str]
+    changed: list[ControlChangeOut]
+    text_changed: list[ControlChangeOut]
+    unchanged: int
+
+
+class RegistryMigrationCreate(BaseModel):
+    from_hash: str
+    # Restrict the migration to these assessments; all on from_hash if omitted.
+    assessment_ids: Optional[list[str]] = Field(default=None, max_length=10000)
+
+
+class RegistryMigrationOut(BaseModel):
+    from_hash: str
+    to_hash: str
+    assessments_migrated: int
+    added: list[str]
+    removed: list[str]
+    changed: list[str]
+    text_changed: list[str]
+    items_needing_reassessment: int
+
+
+class EvidenceOut(BaseModel):
+    ref: str
+    size: int
+    media_type: str
+    chunks: int
+    stored_bytes: int
+
+
+class FindingsImportOut(BaseModel):
+    assessment_id: str
+    registry_hash: str
+    imported: int
+    controls_assessed: int
+    controls_total: int
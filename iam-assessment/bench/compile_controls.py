@@ -0,0 +1,107 @@
+"""Compile time for a synthetic control library, serial vs --jobs vs cached.
+
+Writes ``--controls`` copies of the real controls (new ids, same domains and
+config files) into a temporary tree, then runs tools/compile_controls.py
+over it: serially without the cache, with ``--jobs`` without the cache, and
+twice with the cache (cold, then warm). Every run's controls.json and
+controls.sha256 must match the serial run byte for byte, apart from the
+``build.compiled_at`` line.
+
+    python bench/compile_controls.py --controls 5000 --jobs 8
+"""
+
+import argparse
+import os
+import shutil
+import string
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+COMPILER = ROOT / "tools" / "compile_controls.py"
+
+
+def _prefix(n: int) -> str:
+    letters = ""
+    n += 1
+    while n:
+        n, r = divmod(n - 1, 26)
+        letters = string.ascii_uppercase[r] + letters
+    return letters
+
+
+def _build_tree(dest: Path, count: int) -> None:
+    src = ROOT / "controls"
+    for name in ("_meta.yml", "domains.yml", "scoring.yml"):
+        shutil.copy(src / name, dest / name)
+    templates: List[Dict[str, Any]] = [
+        yaml.safe_load(p.read_text(encoding="utf-8")) for p in sorted(src.rglob("IAM-*.yml"))
+    ]
+    for i in range(count):
+        control = dict(templates[i % len(templates)])
+        # Ids must match ^IAM-[A-Z]+-[0-9]{3}$: one letter block per 1000 controls.
+        control["id"] = f"IAM-{control['domain']}{_prefix(i // 1000)}-{i % 1000:03d}"
+        domain_dir = dest / control["domain"]
+        domain_dir.mkdir(exist_ok=True)
+        (domain_dir / f"{control['id']}.yml").write_text(yaml.safe_dump(control, sort_keys=False), encoding="utf-8")
+
+
+def _compile(controls_dir: Path, out_dir: Path, *flags: str) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, str(COMPILER), "--controls-dir", str(controls_dir), "--out-dir", str(out_dir), *flags],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start
+
+
+def _output(out_dir: Path) -> bytes:
+    """controls.json and controls.sha256 bytes, minus the compiled_at line."""
+    lines = (out_dir / "controls.json").read_bytes().splitlines(keepends=True)
+    body = b"".join(line for line in lines if b'"compiled_at":' not in line)
+    return body + (out_dir / "controls.sha256").read_bytes()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--controls", type=int, default=5000)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        controls_dir = Path(tmp) / "controls"
+        controls_dir.mkdir()
+        _build_tree(controls_dir, args.controls)
+        print(f"Synthetic tree: {args.controls} controls, {os.cpu_count()} CPU(s)\n")
+
+        runs = [
+            ("serial, no cache", "serial", ["--no-cache"]),
+            (f"--jobs {args.jobs}, no cache", "parallel", ["--no-cache", "--jobs", str(args.jobs)]),
+            ("cache cold", "cached", []),
+            ("cache warm", "cached", []),
+        ]
+        expected = None
+        print(f"{'run':<24} {'seconds':>8}  registry")
+        for label, out_name, flags in runs:
+            out_dir = Path(tmp) / out_name
+            seconds = _compile(controls_dir, out_dir, *flags)
+            output = _output(out_dir)
+            if expected is None:
+                expected = output
+            registry_hash = (out_dir / "controls.sha256").read_text(encoding="utf-8").split()[0]
+            same = "byte-identical" if output == expected else "DIFFERS"
+            print(f"{label:<24} {seconds:>8.2f}  {registry_hash[:16]}… {same}")
+            if output != expected:
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,89 @@
+"""Dedup ratio and read cost of the content-addressed evidence store.
+
+Builds a sign-in log export from the stand-in generator, stores it once per
+(control, assessment) pair that would cite it, as separate uploads would,
+and reports the logical bytes referenced against the bytes on disk. Then
+times ranged reads of ``--range-kb`` at random offsets against reading the
+whole blob.
+
+    python bench/evidence_store.py --mb 64 --controls 5 --assessments 100
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from engine.evidence_store import EvidenceStore  # noqa: E402
+from tools.evidence_standin import artifact_items  # noqa: E402
+
+
+def sign_in_export(target_bytes: int) -> bytes:
+    parts, size, n = [], 0, 0
+    while size < target_bytes:
+        for item in artifact_items(f"tenant-{n:04d}", "sign_in_logs"):
+            line = json.dumps(item, sort_keys=True).encode("utf-8") + b"\n"
+            parts.append(line)
+            size += len(line)
+        n += 1
+    return b"".join(parts)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=64.0, help="size of the sign-in export")
+    parser.add_argument("--controls", type=int, default=5, help="controls citing the export")
+    parser.add_argument("--assessments", type=int, default=100)
+    parser.add_argument("--range-kb", type=int, default=64)
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args()
+
+    data = sign_in_export(int(args.mb * (1 << 20)))
+    uploads = args.controls * args.assessments
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EvidenceStore(Path(tmp))
+        start = time.perf_counter()
+        first = store.put_bytes(data, "application/x-ndjson")
+        first_s = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(uploads - 1):
+            assert store.put_bytes(data, "application/x-ndjson").ref == first.ref
+        repeat_s = time.perf_counter() - start
+
+        usage = store.usage()
+        logical = len(data) * uploads
+        print(f"export {len(data) / (1 << 20):.1f} MiB in {len(first.chunks)} chunk(s), {first.ref}")
+        print(f"first put {first_s:.2f}s, {uploads - 1} repeat put(s) {repeat_s:.2f}s")
+        print(
+            f"{uploads} upload(s): {logical / (1 << 30):.2f} GiB referenced, "
+            f"{usage['stored_bytes'] / (1 << 20):.1f} MiB stored: {logical / len(data):.0f}x from dedup, "
+            f"{len(data) / usage['stored_bytes']:.1f}x from compression\n"
+        )
+
+        span = args.range_kb << 10
+        rng = random.Random(0)
+        offsets = [rng.randrange(0, max(1, len(data) - span)) for _ in range(args.reads)]
+        start = time.perf_counter()
+        for off in offsets:
+            got = b"".join(store.read_range(first.ref, off, off + span))
+            assert got == data[off : off + span]
+        ranged = (time.perf_counter() - start) / len(offsets)
+        start = time.perf_counter()
+        reads = max(1, min(10, args.reads))
+        for _ in range(reads):
+            assert len(store.read_bytes(first.ref)) == len(data)
+        full = (time.perf_counter() - start) / reads
+        print(f"{'read':>14} {'ms':>9}")
+        print(f"{f'{args.range_kb} KiB range':>14} {ranged * 1000:>9.2f}")
+        print(f"{'whole blob':>14} {full * 1000:>9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,102 @@
+"""Size and write time of the full and compact report formats.
+
+Scores random findings against the registry, then times each output format
+(pretty-printed full report, compact via json and via orjson, with and
+without gzip) over the same reports and prints bytes per report and
+milliseconds per write.
+
+    python bench/report_output.py --reports 200 --coverage 0.8
+"""
+
+import argparse
+import gzip
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from engine import assess  # noqa: E402
+from engine.registry import load_registry  # noqa: E402
+from engine.scoring import compile_model  # noqa: E402
+
+
+def _findings(registry: Dict[str, Any], rng: random.Random, coverage: float) -> Dict[str, Any]:
+    findings = [
+        {
+            "control_id": c["id"],
+            "score": rng.randint(0, 2),
+            "finding": f"Observed state for {c['id']}: " + "lorem ipsum " * rng.randint(2, 20),
+            "evidence_refs": [f"evidence/{c['id']}/{n}.png" for n in range(rng.randint(0, 4))],
+        }
+        for c in registry["controls"]
+        if rng.random() < coverage
+    ]
+    return {
+        "registry_hash": registry["build"]["registry_hash"],
+        "assessed_at": "2024-01-01T00:00:00Z",
+        "findings": findings,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--registry", type=Path, default=ROOT / "dist" / "controls.json")
+    parser.add_argument("--reports", type=int, default=200)
+    parser.add_argument("--coverage", type=float, default=0.8, help="share of controls with a finding")
+    args = parser.parse_args()
+
+    registry = load_registry(args.registry)
+    model = compile_model(registry)
+    rng = random.Random(7)
+    docs = [_findings(registry, rng, args.coverage) for _ in range(args.reports)]
+    full = [assess.build_report(registry, model, d) for d in docs]
+    compact = [assess.build_report(registry, model, d, compact=True) for d in docs]
+
+    def json_compact(report: Dict[str, Any]) -> bytes:
+        return json.dumps(report, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    formats: Dict[str, Callable[[Dict[str, Any], Path], None]] = {
+        "full (indent=2)": lambda r, p: assess.write_report(r, p),
+        "full + gzip": lambda r, p: assess.write_report(r, p, compress=True),
+        "compact json": lambda r, p: p.write_bytes(json_compact(r)),
+        "compact json + gzip": lambda r, p: p.write_bytes(gzip.compress(json_compact(r), 6, mtime=0)),
+    }
+    if assess.orjson is not None:
+        formats["compact orjson"] = lambda r, p: assess.write_report(r, p, compact=True)
+        formats["compact orjson + gzip"] = lambda r, p: assess.write_report(r, p, compact=True, compress=True)
+    else:
+        print("orjson is not installed; compact rows use the json fallback only.")
+
+    print(f"{len(registry['controls'])} controls, {args.reports} reports, coverage {args.coverage:.0%}\n")
+    print(f"{'format':<24} {'bytes/report':>13} {'ms/report':>10} {'size':>7} {'time':>7}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / "report"
+        for label, write in formats.items():
+            reports = full if label.startswith("full") else compact
+            sizes: List[int] = []
+            times: List[float] = []
+            for report in reports:
+                start = time.perf_counter()
+                write(report, out)
+                times.append((time.perf_counter() - start) * 1000.0)
+                sizes.append(out.stat().st_size)
+            size, ms = statistics.fmean(sizes), statistics.median(times)
+            if baseline is None:
+                baseline = (size, ms)
+            print(
+                f"{label:<24} {size:>13,.0f} {ms:>10.3f} "
+                f"{size / baseline[0]:>6.1%} {ms / baseline[1]:>6.1%}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,104 +1,314 @@
+import argparse
+import gzip
+import io
 import json
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
 
-from .registry import load_registry, registry_hash
+try:
+    import ijson  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    ijson = None
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+from .registry import RegistryIndex, open_registry, registry_hash
+from .scoring import ScoringModel, compile_model, domain_reports, score
+
+# controls.json contents, or a lazily read controls.idx.
+Registry = Union[Dict[str, Any], RegistryIndex]
 
 
 def load_findings(path: Path) -> Dict[str, Any]:
-    data = json.loads(path.read_text(encoding="utf-8"))
-    if "registry_hash" not in data:
-        raise ValueError("findings.json missing registry_hash")
-    if "findings" in data and not isinstance(data["findings"], list):
-        raise ValueError("findings.json findings must be a list")
-    return data
+    return check_findings_doc(json.loads(path.read_text(encoding="utf-8")))
+
 
+class FindingsAccumulator:
+    """Validates findings one at a time and keeps only what the report needs.
 
-def _validate_findings(
-    findings: List[Dict[str, Any]],
-    valid_control_ids: set[str],
-    min_score: int,
-    max_score: int,
-) -> Dict[str, Dict[str, Any]]:
-    seen: Dict[str, Dict[str, Any]] = {}
-    errors: List[str] = []
+    Accepted findings are stored per control (score, text, evidence refs), so
+    memory is bounded by the number of controls in the registry rather than
+    by the size of the findings input.
+    """
 
-    for entry in findings:
+    def __init__(self, model: ScoringModel) -> None:
+        self.model = model
+        self.scores = model.new_scores()
+        self.findings: Dict[int, Tuple[str, List[Any]]] = {}
+        self.errors: List[str] = []
+        self._unknown: Set[str] = set()
+
+    def add(self, entry: Any) -> None:
         if not isinstance(entry, dict):
-            errors.append("finding entry must be an object")
-            continue
+            self.errors.append("finding entry must be an object")
+            return
         cid = entry.get("control_id")
         if not isinstance(cid, str) or not cid:
-            errors.append("finding.control_id must be a non-empty string")
-            continue
-        if cid in seen:
-            errors.append(f"duplicate finding for control_id '{cid}'")
-            continue
+            self.errors.append("finding.control_id must be a non-empty string")
+            return
+        i = self.model.index.get(cid)
+        if (i is not None and i in self.findings) or cid in self._unknown:
+            self.errors.append(f"duplicate finding for control_id '{cid}'")
+            return
         score = entry.get("score")
         if not isinstance(score, int):
-            errors.append(f"finding.score must be int for control_id '{cid}'")
-            continue
-        if score < min_score or score > max_score:
-            errors.append(
-                f"finding.score {score} out of range {min_score}-{max_score} for control_id '{cid}'"
+            self.errors.append(f"finding.score must be int for control_id '{cid}'")
+            return
+        if score < self.model.min_score or score > self.model.max_score:
+            self.errors.append(
+                f"finding.score {score} out of range {self.model.min_score}-{self.model.max_score} "
+                f"for control_id '{cid}'"
             )
-            continue
-        seen[cid] = entry
+            return
+        refs = entry.get("evidence_refs", [])
+        if not isinstance(refs, list) or not all(isinstance(r, str) for r in refs):
+            self.errors.append(f"finding.evidence_refs must be a list of strings for control_id '{cid}'")
+            return
+        if i is None:
+            self._unknown.add(cid)
+            return
+        self.scores[i] = score
+        self.findings[i] = (str(entry.get("finding", "")), list(refs))
 
-    unknown = sorted([cid for cid in seen.keys() if cid not in valid_control_ids])
-    if unknown:
-        errors.append(f"unknown control_id(s) in findings: {', '.join(unknown)}")
+    def finish(self) -> None:
+        errors = list(self.errors)
+        if self._unknown:
+            errors.append(f"unknown control_id(s) in findings: {', '.join(sorted(self._unknown))}")
+        if errors:
+            raise ValueError("Invalid findings:\n- " + "\n- ".join(errors))
 
-    if errors:
-        raise ValueError("Invalid findings:\n- " + "\n- ".join(errors))
 
-    return seen
+def model_for(registry: Registry) -> ScoringModel:
+    if isinstance(registry, RegistryIndex):
+        return compile_model(registry.scoring_view())
+    return compile_model(registry)
 
 
-def _weighted_score(items: List[Tuple[int, int]], max_score: int) -> Optional[float]:
-    if not items:
-        return None
-    weighted = sum(weight * score for weight, score in items)
-    total = sum(weight * max_score for weight, _ in items)
-    if total == 0:
-        return None
-    return round((weighted / total) * 100.0, 2)
+def _control_lookup(registry: Registry) -> Callable[[str], Dict[str, Any]]:
+    if isinstance(registry, RegistryIndex):
+        return lambda cid: registry.control(cid) or {}
+    return {c["id"]: c for c in registry.get("controls", [])}.__getitem__
 
 
-def generate_report(registry_path: Path, findings_path: Path, out_path: Path) -> Dict[str, Any]:
-    registry = load_registry(registry_path)
-    findings_doc = load_findings(findings_path)
+def _domains(registry: Registry) -> List[Dict[str, Any]]:
+    if isinstance(registry, RegistryIndex):
+        return registry.header.get("domains", [])
+    return registry.get("domains", [])
 
-    if findings_doc["registry_hash"] != registry_hash(registry):
+
+def _check_registry_hash(registry: Registry, header: Dict[str, Any]) -> None:
+    if "registry_hash" not in header:
+        raise ValueError("findings.json missing registry_hash")
+    if header["registry_hash"] != registry_hash(registry):
         raise ValueError(
             "registry_hash mismatch: findings.json has "
-            f"{findings_doc['registry_hash']}, registry has {registry_hash(registry)}"
+            f"{header['registry_hash']}, registry has {registry_hash(registry)}"
         )
 
-    scoring = registry.get("scoring", {})
-    scale = scoring.get("scale", {})
-    min_score = int(scale.get("min", 0))
-    max_score = int(scale.get("max", 2))
 
-    findings_list = findings_doc.get("findings", [])
-    controls = registry.get("controls", [])
-    control_ids = {c["id"] for c in controls}
-    findings_map = _validate_findings(findings_list, control_ids, min_score, max_score)
+def generate_report(
+    registry_path: Path,
+    findings_path: Path,
+    out_path: Path,
+    stream: bool = False,
+    compact: bool = False,
+    compress: bool = False,
+) -> Dict[str, Any]:
+    registry = open_registry(registry_path)
+    model = model_for(registry)
+    if stream or findings_path.suffix == ".jsonl":
+        report = stream_report(registry, model, findings_path, compact=compact)
+    else:
+        report = build_report(registry, model, load_findings(findings_path), compact=compact)
 
-    domain_meta = {d["id"]: d for d in registry.get("domains", [])}
-    domain_controls: Dict[str, List[Dict[str, Any]]] = {}
-    for c in controls:
-        domain_controls.setdefault(c["domain"], []).append(c)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    write_report(report, out_path, compact=compact, compress=compress)
+    return report
+
+
+def encode_compact(report: Dict[str, Any]) -> bytes:
+    """Minified, key-sorted UTF-8 JSON; orjson and the json fallback give the same bytes."""
+    if orjson is not None:
+        return orjson.dumps(report, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(report, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def write_report(report: Dict[str, Any], out_path: Path, compact: bool = False, compress: bool = False) -> None:
+    """Write ``report`` pretty-printed (the default) or minified, optionally gzipped."""
+    if compact:
+        body = encode_compact(report)
+        out_path.write_bytes(gzip.compress(body, compresslevel=6, mtime=0) if compress else body)
+        return
+    if compress:
+        with gzip.GzipFile(out_path, "wb", compresslevel=6, mtime=0) as raw:
+            with io.TextIOWrapper(raw, encoding="utf-8") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+        return
+    with out_path.open("w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+
+def check_findings_doc(data: Any) -> Dict[str, Any]:
+    if not isinstance(data, dict):
+        raise ValueError("findings document must be a JSON object")
+    if "registry_hash" not in data:
+        raise ValueError("findings.json missing registry_hash")
+    if "findings" in data and not isinstance(data["findings"], list):
+        raise ValueError("findings.json findings must be a list")
+    return data
+
+
+def build_report(
+    registry: Registry,
+    model: ScoringModel,
+    findings_doc: Dict[str, Any],
+    compact: bool = False,
+) -> Dict[str, Any]:
+    """Score ``findings_doc``.
+
+    With ``compact`` each entry of ``controls`` is ``{"id", "finding"}``
+    instead of a full copy of the registry control; readers resolve the rest
+    from the registry named by ``registry_hash``.
+    """
+    _check_registry_hash(registry, findings_doc)
+    acc = FindingsAccumulator(model)
+    for entry in findings_doc.get("findings", []):
+        acc.add(entry)
+    return _report(registry, model, findings_doc, acc, compact)
 
-    merged_controls: List[Dict[str, Any]] = []
-    assessed_controls: List[Tuple[int, int]] = []
-    assessed_count = 0
 
-    for control in sorted(controls, key=lambda x: x["id"]):
-        cid = control["id"]
-        finding = findings_map.get(cid)
+def stream_report(
+    registry: Registry,
+    model: ScoringModel,
+    findings_path: Path,
+    compact: bool = False,
+) -> Dict[str, Any]:
+    """Same report as ``build_report`` without loading the findings document.
+
+    ``.jsonl`` inputs hold a header object (``registry_hash``, ``assessed_at``,
+    ``scope``) on the first line and one finding per following line. ``.json``
+    inputs are parsed incrementally with ijson when it is installed.
+    """
+    acc = FindingsAccumulator(model)
+    with findings_path.open("rb") as f:
+        header = read_findings(f, acc, jsonl=findings_path.suffix == ".jsonl")
+    _check_registry_hash(registry, header)
+    return _report(registry, model, header, acc, compact)
+
+
+def read_findings(f: BinaryIO, acc: FindingsAccumulator, jsonl: bool = False) -> Dict[str, Any]:
+    """Feed every finding in ``f`` to ``acc`` and return the document header.
+
+    The header is every top-level field except ``findings``. Call
+    ``acc.finish()`` afterwards to raise the collected validation errors.
+    """
+    if jsonl:
+        return _read_jsonl(f, acc)
+    if ijson is not None:
+        try:
+            return _read_json_incremental(f, acc)
+        except ijson.JSONError as exc:
+            raise ValueError(f"invalid findings JSON: {exc}") from exc
+    doc = check_findings_doc(json.load(f))
+    for entry in doc.get("findings", []):
+        acc.add(entry)
+    return {k: v for k, v in doc.items() if k != "findings"}
+
+
+_loads: Callable[[bytes], Any] = orjson.loads if orjson is not None else json.loads
+
+
+def _read_jsonl(f: BinaryIO, acc: FindingsAccumulator) -> Dict[str, Any]:
+    header: Optional[Dict[str, Any]] = None
+    for line in f:
+        if not line.strip():
+            continue
+        if header is None:
+            header = check_findings_doc(_loads(line))
+            if "findings" in header:
+                raise ValueError("findings.jsonl header must not contain findings")
+            continue
+        acc.add(_loads(line))
+    if header is None:
+        raise ValueError("findings.jsonl is empty")
+    return header
+
+
+def _build_value(events: Iterator[Tuple[str, str, Any]], event: str, value: Any) -> Any:
+    builder = ijson.ObjectBuilder()
+    builder.event(event, value)
+    depth = 1 if event in ("start_map", "start_array") else 0
+    while depth:
+        _, event, value = next(events)
+        builder.event(event, value)
+        if event in ("start_map", "start_array"):
+            depth += 1
+        elif event in ("end_map", "end_array"):
+            depth -= 1
+    return builder.value
+
+
+def _read_json_incremental(f: BinaryIO, acc: FindingsAccumulator) -> Dict[str, Any]:
+    # Top-level fields other than ``findings`` are small and built whole;
+    # each ``findings`` entry is built, validated and dropped in turn. When
+    # ``f`` can seek, the entries are skipped here and built by a second
+    # ijson.items pass, which uses the backend's native builder and is
+    # several times faster than feeding ObjectBuilder event by event.
+    start = f.tell() if f.seekable() else None
+    deferred = False
+    events = iter(ijson.parse(f, use_float=True))
+    try:
+        _, event, _ = next(events)
+    except StopIteration:
+        raise ValueError("findings document must be a JSON object") from None
+    if event != "start_map":
+        raise ValueError("findings document must be a JSON object")
+    header: Dict[str, Any] = {}
+    for prefix, event, value in events:
+        if prefix != "" or event != "map_key":
+            continue
+        key = value
+        _, event, value = next(events)
+        if key != "findings":
+            header[key] = _build_value(events, event, value)
+            continue
+        if event != "start_array":
+            raise ValueError("findings.json findings must be a list")
+        if start is not None:
+            for prefix, event, _ in events:
+                if prefix == "findings" and event == "end_array":
+                    break
+            deferred = True
+            continue
+        for _, event, value in events:
+            if event == "end_array":
+                break
+            acc.add(_build_value(events, event, value))
+    if deferred:
+        f.seek(start)
+        for entry in ijson.items(f, "findings.item", use_float=True):
+            acc.add(entry)
+    return header
+
+
+def _report(
+    registry: Registry,
+    model: ScoringModel,
+    header: Dict[str, Any],
+    acc: FindingsAccumulator,
+    compact: bool = False,
+) -> Dict[str, Any]:
+    acc.finish()
+    control_for = _control_lookup(registry)
+    scores = acc.scores
+    merged_controls: List[Dict[str, Any]] = []
+    for i, cid in enumerate(model.control_ids):
+        merged = {"id": cid} if compact else dict(control_for(cid))
+        finding = acc.findings.get(i)
         if finding is None:
-            merged = dict(control)
             merged["finding"] = {
                 "status": "not_assessed",
                 "score": None,
@@ -106,90 +316,82 @@ def generate_report(registry_path: Path, findings_path: Path, out_path: Path) ->
                 "evidence_refs": [],
             }
         else:
-            score = finding["score"]
-            assessed_count += 1
-            assessed_controls.append((control["weight"], score))
-            merged = dict(control)
             merged["finding"] = {
                 "status": "assessed",
-                "score": score,
-                "text": str(finding.get("finding", "")),
-                "evidence_refs": list(finding.get("evidence_refs", [])),
+                "score": scores[i],
+                "text": finding[0],
+                "evidence_refs": finding[1],
             }
         merged_controls.append(merged)
 
-    domain_reports: List[Dict[str, Any]] = []
-    for domain_id in sorted(domain_controls.keys()):
-        d_controls = sorted(domain_controls[domain_id], key=lambda x: x["id"])
-        assessed_items = []
-        for c in d_controls:
-            f = findings_map.get(c["id"])
-            if f is not None:
-                assessed_items.append((c["weight"], f["score"]))
-        domain_score = _weighted_score(assessed_items, max_score)
-        domain_reports.append(
-            {
-                "id": domain_id,
-                "name": domain_meta.get(domain_id, {}).get("name", ""),
-                "description": domain_meta.get(domain_id, {}).get("description", ""),
-                "score": domain_score,
-                "controls_assessed": len(assessed_items),
-                "controls_total": len(d_controls),
-                "weight": sum(c["weight"] for c in d_controls),
-            }
-        )
-
-    overall_score = _weighted_score(assessed_controls, max_score)
+    summary = score(model, scores)
+    domain_meta = {d["id"]: d for d in _domains(registry)}
 
     risk_items: List[Dict[str, Any]] = []
-    for control in sorted(controls, key=lambda x: x["id"]):
-        finding = findings_map.get(control["id"])
-        if finding is None:
-            continue
-        score = finding["score"]
-        risk_score = (max_score - score) * control["weight"]
+    for i in summary.top_risks:
+        control = control_for(model.control_ids[i])
         risk_items.append(
             {
                 "control_id": control["id"],
                 "domain": control["domain"],
                 "weight": control["weight"],
-                "score": score,
-                "risk_score": risk_score,
+                "score": scores[i],
+                "risk_score": (model.max_score - scores[i]) * control["weight"],
                 "title": control["title"],
-                "finding": str(finding.get("finding", "")),
+                "finding": acc.findings[i][0],
             }
         )
-    risk_items = sorted(
-        risk_items,
-        key=lambda x: (-x["risk_score"], -x["weight"], x["control_id"]),
-    )
 
     report = {
         "registry_hash": registry_hash(registry),
-        "assessed_at": findings_doc.get("assessed_at"),
-        "scope": findings_doc.get("scope", {}),
+        "assessed_at": header.get("assessed_at"),
+        "scope": header.get("scope", {}),
         "summary": {
-            "overall_score": overall_score,
-            "controls_assessed": assessed_count,
-            "controls_total": len(controls),
-            "controls_not_assessed": len(controls) - assessed_count,
+            "overall_score": summary.overall_score,
+            "controls_assessed": summary.controls_assessed,
+            "controls_total": len(model.control_ids),
+            "controls_not_assessed": len(model.control_ids) - summary.controls_assessed,
         },
-        "domains": domain_reports,
+        "domains": domain_reports(model, summary, domain_meta),
         "controls": merged_controls,
-        "top_risks": risk_items[:5],
+        "top_risks": risk_items,
     }
-
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(json.dumps(report, indent=2, sort_keys=True), encoding="utf-8")
+    if compact:
+        report["format"] = "compact"
     return report
 
 
-def main() -> int:
+def main(argv: Optional[List[str]] = None) -> int:
     root = Path(__file__).resolve().parents[1]
-    registry_path = root / "dist" / "controls.json"
-    findings_path = root / "assessments" / "findings.json"
-    out_path = root / "dist" / "report.json"
-    generate_report(registry_path, findings_path, out_path)
+    parser = argparse.ArgumentParser(description="Score one findings document against the registry.")
+    parser.add_argument(
+        "--registry",
+        type=Path,
+        default=root / "dist" / "controls.json",
+        help="controls.json, or controls.idx to read controls lazily",
+    )
+    parser.add_argument("--findings", type=Path, default=root / "assessments" / "findings.json")
+    parser.add_argument("--out", type=Path, default=root / "dist" / "report.json")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="validate findings one at a time (.jsonl, or .json via ijson) instead of loading the document",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="minified output that references controls by id instead of inlining them",
+    )
+    parser.add_argument("--gzip", action="store_true", help="gzip the report")
+    args = parser.parse_args(argv)
+    generate_report(
+        args.registry,
+        args.findings,
+        args.out,
+        stream=args.stream,
+        compact=args.compact,
+        compress=args.gzip,
+    )
     return 0
 
 
@@ -0,0 +1,159 @@
+"""Score controls from collected evidence using the registry's scoring rules.
+
+Each input holds one tenant's evidence::
+
+    {"tenant": "contoso", "evidence": [{"source": "entra", "collected_at": "...",
+                                        "artifacts": {...}, "facts": {...}}, ...]}
+
+as a ``.json`` file, or one such document per line of a ``.jsonl`` file
+(inputs are expanded like ``engine.batch``: files, directories, globs, ``-``).
+Evidence entries are validated as ``engine.models.Evidence``; when a source
+appears more than once the most recently collected entry wins. Findings cite
+the entry as ``evidence:<source>@<collected_at>``, or, when the collector
+stored artifacts in the evidence store (``--store``), the ``sha256:`` refs of
+the artifacts each control lists.
+
+The rules of every control are compiled once (see engine/rules.py) and each
+tenant is scored in a single pass. The output is one findings document per
+tenant as JSONL, which ``engine.batch`` scores into reports::
+
+    python -m engine.autoscore evidence/ --out dist/auto-findings.jsonl
+    python -m engine.batch --multi dist/auto-findings.jsonl --out-dir dist/portfolio
+
+Controls without rules, without the facts their rules read, or where no
+rule holds are left out of the findings for an analyst to assess.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from pydantic import ValidationError
+
+from .assess import Registry
+from .batch import iter_jobs, verify_registry
+from .evidence_store import is_ref
+from .models import Evidence
+from .registry import RegistryIndex, registry_hash
+from .rules import NO_EVIDENCE, NO_MATCH, RuleSet, compile_ruleset
+
+
+def ruleset_for(registry: Registry) -> RuleSet:
+    if isinstance(registry, RegistryIndex):
+        return compile_ruleset(registry.iter_controls(), registry.registry_hash)
+    return compile_ruleset(registry.get("controls", []), registry_hash(registry))
+
+
+def tenant_facts(evidence: Iterable[Evidence]) -> Tuple[Dict[str, Any], Dict[str, str], Optional[str]]:
+    """Facts by source, evidence refs by source and stored artifact, and the latest collected_at."""
+    latest: Dict[str, Evidence] = {}
+    for e in evidence:
+        if e.source not in latest or e.collected_at > latest[e.source].collected_at:
+            latest[e.source] = e
+    facts = {source: e.facts for source, e in latest.items()}
+    refs = {source: f"evidence:{source}@{e.collected_at}" for source, e in latest.items()}
+    for e in latest.values():
+        for artifact, value in e.artifacts.items():
+            if isinstance(value, dict) and is_ref(value.get("ref")):
+                refs[artifact] = value["ref"]
+    assessed_at = max((e.collected_at for e in latest.values()), default=None)
+    return facts, refs, assessed_at
+
+
+def parse_evidence_doc(doc: Any, tenant: str) -> Tuple[str, List[Evidence]]:
+    if not isinstance(doc, dict):
+        raise ValueError("evidence document must be a JSON object")
+    entries = doc.get("evidence")
+    if not isinstance(entries, list):
+        raise ValueError("evidence document must have an 'evidence' list")
+    try:
+        evidence = [Evidence.model_validate(e) for e in entries]
+    except ValidationError as exc:
+        raise ValueError(f"invalid evidence: {exc}") from None
+    name = doc.get("tenant")
+    return (name if isinstance(name, str) and name else tenant), evidence
+
+
+def score_tenant(ruleset: RuleSet, tenant: str, evidence: List[Evidence]) -> Dict[str, Any]:
+    """Findings document for one tenant, with per-control rule outcomes under ``autoscore``."""
+    facts, refs, assessed_at = tenant_facts(evidence)
+    findings, outcomes = ruleset.findings(facts, refs)
+    return {
+        "tenant": tenant,
+        "registry_hash": ruleset.registry_hash,
+        "assessed_at": assessed_at,
+        "scope": {"tenant": tenant, "sources": sorted(facts)},
+        "findings": findings,
+        "autoscore": {
+            "scored": len(findings),
+            "no_evidence": [cid for cid, o in zip(ruleset.control_ids, outcomes) if o == NO_EVIDENCE],
+            "no_match": [cid for cid, o in zip(ruleset.control_ids, outcomes) if o == NO_MATCH],
+        },
+    }
+
+
+def score_inputs(ruleset: RuleSet, inputs: List[str]) -> Iterator[Dict[str, Any]]:
+    """Findings documents for every tenant in ``inputs``; failures yield ``{"tenant", "error"}``."""
+    for tenant, path, text in iter_jobs(inputs, multi=True):
+        try:
+            raw = Path(path).read_text(encoding="utf-8") if path is not None else text or ""
+            name, evidence = parse_evidence_doc(json.loads(raw), tenant)
+        except (OSError, ValueError) as exc:
+            yield {"tenant": tenant, "source": path, "error": str(exc)}
+            continue
+        yield score_tenant(ruleset, name, evidence)
+
+
+def _write(docs: Iterator[Dict[str, Any]], out: TextIO) -> Tuple[int, int, int]:
+    tenants = failed = scored = 0
+    for doc in docs:
+        tenants += 1
+        if "error" in doc:
+            failed += 1
+            print(f"FAILED {doc['tenant']}: {doc['error']}", file=sys.stderr)
+            continue
+        scored += doc["autoscore"]["scored"]
+        out.write(json.dumps(doc, sort_keys=True, ensure_ascii=False) + "\n")
+    return tenants, failed, scored
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    root = Path(__file__).resolve().parents[1]
+    parser = argparse.ArgumentParser(description="Score controls from evidence with the registry's scoring rules.")
+    parser.add_argument("inputs", nargs="+", help="evidence files, directories, globs, or - for JSONL on stdin")
+    parser.add_argument("--registry", type=Path, default=root / "dist" / "controls.json")
+    parser.add_argument("--out", default=str(root / "dist" / "auto-findings.jsonl"), help="findings JSONL, or - for stdout")
+    args = parser.parse_args(argv)
+
+    registry = verify_registry(args.registry)
+    started = time.perf_counter()
+    ruleset = ruleset_for(registry)
+    if not ruleset.control_ids:
+        print("No control in the registry has scoring rules.", file=sys.stderr)
+        return 2
+
+    docs = score_inputs(ruleset, args.inputs)
+    if args.out == "-":
+        tenants, failed, scored = _write(docs, sys.stdout)
+    else:
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        with out_path.open("w", encoding="utf-8") as f:
+            tenants, failed, scored = _write(docs, f)
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"Scored {scored} control(s) across {tenants - failed}/{tenants} tenant(s) "
+        f"with {len(ruleset.control_ids)} rule-scored control(s) in {elapsed:.2f}s.",
+        file=sys.stderr,
+    )
+    if args.out != "-":
+        print(f"Wrote {args.out}.", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
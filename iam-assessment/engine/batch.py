@@ -0,0 +1,238 @@
+"""Score many tenants' findings against one registry in parallel.
+
+Inputs are findings files, directories (every ``*.json`` / ``*.jsonl``
+inside), glob patterns, or ``-`` for a stream on stdin. A file is one
+tenant, named after the file: ``.json`` holds a findings document and
+``.jsonl`` the streamed form (header line, then one finding per line; see
+engine.assess). With ``--multi``, ``.jsonl`` files instead hold one complete
+findings document per line, as written by engine.autoscore; stdin is always
+read that way. The tenant name of such a document is taken from ``tenant``
+or ``scope.tenant``, falling back to the line number.
+
+Each worker process loads and compiles the registry once. Per-tenant
+reports are written to ``<out-dir>/<tenant>.report.json``, with ``-2``,
+``-3``... appended when a tenant name repeats within the run. A roll-up of
+every tenant's summary and domain scores goes to
+``<out-dir>/portfolio.json``. A failing tenant is recorded in the roll-up
+and does not stop the run.
+
+    python -m engine.batch findings/ --out-dir dist/portfolio --workers 8
+    python -m engine.batch --multi dist/auto-findings.jsonl
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .assess import Registry, build_report, check_findings_doc, model_for, stream_report, write_report
+from .registry import RegistryIndex, open_registry, registry_hash
+from .scoring import ScoringModel
+
+# Work item: (tenant name, findings file path or None, inline JSON text or None).
+Job = Tuple[str, Optional[str], Optional[str]]
+
+_registry: Optional[Registry] = None
+_model: Optional[ScoringModel] = None
+_out_dir: Optional[Path] = None
+_compact = False
+_compress = False
+
+
+def verify_registry(registry_path: Path) -> Registry:
+    """Load the registry and check it against controls.sha256 when present.
+
+    A controls.idx registry is also checked record by record, since its
+    header alone does not prove the content.
+    """
+    registry = open_registry(registry_path)
+    if isinstance(registry, RegistryIndex):
+        registry.verify()
+    sha_path = registry_path.with_name("controls.sha256")
+    if sha_path.exists():
+        recorded = sha_path.read_text(encoding="utf-8").split()[0]
+        if recorded != registry_hash(registry):
+            raise ValueError(
+                f"{sha_path} records {recorded}, but {registry_path.name} has {registry_hash(registry)}"
+            )
+    return registry
+
+
+def _init_worker(registry_path: str, out_dir: str, compact: bool, compress: bool) -> None:
+    global _registry, _model, _out_dir, _compact, _compress
+    _registry = open_registry(Path(registry_path))
+    _model = model_for(_registry)
+    _out_dir = Path(out_dir)
+    _compact = compact
+    _compress = compress
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name) or "tenant"
+
+
+def _score_job(work: Tuple[Job, str]) -> Dict[str, Any]:
+    (tenant, path, text), stem = work
+    assert _registry is not None and _model is not None and _out_dir is not None
+    try:
+        if path is not None:
+            report = stream_report(_registry, _model, Path(path), compact=_compact)
+        else:
+            report = build_report(_registry, _model, check_findings_doc(json.loads(text or "")), compact=_compact)
+        out_path = _out_dir / f"{stem}.report.json{'.gz' if _compress else ''}"
+        write_report(report, out_path, compact=_compact, compress=_compress)
+    except (OSError, ValueError) as exc:
+        return {"tenant": tenant, "source": path, "error": str(exc)}
+    except Exception as exc:
+        # Anything else is still one tenant's failure, not the run's.
+        return {"tenant": tenant, "source": path, "error": f"{exc.__class__.__name__}: {exc}"}
+    return {
+        "tenant": tenant,
+        "source": path,
+        "report": str(out_path),
+        "summary": report["summary"],
+        "domains": {d["id"]: d["score"] for d in report["domains"]},
+    }
+
+
+def with_report_stems(jobs: Iterable[Job]) -> Iterator[Tuple[Job, str]]:
+    """Pair each job with a report file stem unique within the run.
+
+    The stem is the tenant's safe name; a repeated name (the same tenant in
+    two directories or streams) gets ``-2``, ``-3``... so no report
+    overwrites another.
+    """
+    used: Set[str] = set()
+    for job in jobs:
+        stem = base = _safe_name(job[0])
+        n = 1
+        while stem in used:
+            n += 1
+            stem = f"{base}-{n}"
+        used.add(stem)
+        yield job, stem
+
+
+def _tenant_from_line(line: str, fallback: str) -> str:
+    try:
+        doc = json.loads(line)
+    except ValueError:
+        return fallback
+    if isinstance(doc, dict):
+        tenant = doc.get("tenant") or (doc.get("scope") or {}).get("tenant")
+        if isinstance(tenant, str) and tenant:
+            return tenant
+    return fallback
+
+
+def _jsonl_jobs(stream: Any, label: str) -> Iterator[Job]:
+    for n, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        yield (_tenant_from_line(line, f"{label}-{n}"), None, line)
+
+
+def iter_jobs(inputs: List[str], multi: bool = False) -> Iterator[Job]:
+    """Jobs for ``inputs``; ``multi`` reads ``.jsonl`` files as one document per line."""
+    for spec in inputs:
+        if spec == "-":
+            yield from _jsonl_jobs(sys.stdin, "stdin")
+            continue
+        p = Path(spec)
+        if p.is_dir():
+            paths = sorted(list(p.glob("*.json")) + list(p.glob("*.jsonl")))
+        elif p.exists():
+            paths = [p]
+        else:
+            paths = [Path(m) for m in sorted(glob.glob(spec, recursive=True))]
+        for path in paths:
+            if multi and path.suffix == ".jsonl":
+                with path.open("r", encoding="utf-8") as f:
+                    yield from _jsonl_jobs(f, path.stem)
+            else:
+                yield (path.stem, str(path), None)
+
+
+def portfolio_rollup(results: List[Dict[str, Any]], reg_hash: str) -> Dict[str, Any]:
+    scored = [r for r in results if "error" not in r]
+    overall = [r["summary"]["overall_score"] for r in scored if r["summary"]["overall_score"] is not None]
+    domain_scores: Dict[str, List[float]] = {}
+    for r in scored:
+        for domain_id, value in r["domains"].items():
+            if value is not None:
+                domain_scores.setdefault(domain_id, []).append(value)
+
+    return {
+        "registry_hash": reg_hash,
+        "tenants_total": len(results),
+        "tenants_scored": len(scored),
+        "tenants_failed": len(results) - len(scored),
+        "overall_score_mean": round(sum(overall) / len(overall), 2) if overall else None,
+        "overall_score_min": min(overall) if overall else None,
+        "overall_score_max": max(overall) if overall else None,
+        "domain_score_mean": {
+            d: round(sum(v) / len(v), 2) for d, v in sorted(domain_scores.items())
+        },
+        "tenants": sorted(results, key=lambda r: r["tenant"]),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    root = Path(__file__).resolve().parents[1]
+    parser = argparse.ArgumentParser(description="Score a portfolio of findings files in parallel.")
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="findings files (.json, or .jsonl with a header line then one finding per line), "
+        "directories, globs, or - for one findings document per line on stdin",
+    )
+    parser.add_argument(
+        "--multi",
+        action="store_true",
+        help="read .jsonl files as one complete findings document per line (engine.autoscore output)",
+    )
+    parser.add_argument("--registry", type=Path, default=root / "dist" / "controls.json")
+    parser.add_argument("--out-dir", type=Path, default=root / "dist" / "portfolio")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunksize", type=int, default=16)
+    parser.add_argument("--compact", action="store_true", help="write compact reports (controls by id, minified)")
+    parser.add_argument("--gzip", action="store_true", help="gzip each tenant report")
+    args = parser.parse_args(argv)
+
+    registry = verify_registry(args.registry)
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=max(1, args.workers),
+        initializer=_init_worker,
+        initargs=(str(args.registry), str(args.out_dir), args.compact, args.gzip),
+    ) as pool:
+        results = list(pool.map(_score_job, with_report_stems(iter_jobs(args.inputs, args.multi)), chunksize=max(1, args.chunksize)))
+    elapsed = time.perf_counter() - started
+
+    rollup = portfolio_rollup(results, registry_hash(registry))
+    rollup_path = args.out_dir / "portfolio.json"
+    rollup_path.write_text(json.dumps(rollup, indent=2, sort_keys=True), encoding="utf-8")
+
+    for r in results:
+        if "error" in r:
+            print(f"FAILED {r['tenant']}: {r['error']}", file=sys.stderr)
+    rate = len(results) / elapsed if elapsed > 0 else float("inf")
+    print(
+        f"Scored {rollup['tenants_scored']}/{len(results)} tenant(s) "
+        f"({rollup['tenants_failed']} failed) in {elapsed:.2f}s, {rate:.1f} tenants/s "
+        f"with {args.workers} worker(s)."
+    )
+    print(f"Wrote {rollup_path}.")
+    return 1 if rollup["tenants_failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
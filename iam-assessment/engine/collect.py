@@ -0,0 +1,434 @@
+"""Collect evidence for many tenants concurrently.
+
+The artifacts to fetch are the union of ``evidence.artifacts`` over every
+control in the registry, so each artifact is fetched once per tenant no
+matter how many controls read it. ``ARTIFACTS`` maps an artifact to its
+evidence source and endpoint; artifacts missing from it (HR or SIEM
+exports) are reported and skipped.
+
+Requests run on one ``httpx.AsyncClient`` with at most ``concurrency`` in
+flight across all tenants. Pages of an artifact are followed through
+``@odata.nextLink``. Transport errors, 429 and 5xx responses are retried
+with exponential backoff and jitter, honouring ``Retry-After``. Each tenant
+yields one ``Evidence`` per source, with the raw pages under ``artifacts``
+and the facts that scoring rules read (see ``derive_facts``) under
+``facts``. With ``--store`` each artifact's items are written to the
+content-addressed evidence store (see engine/evidence_store.py) instead and
+``artifacts`` holds ``{"ref": "sha256:...", "items": n}``; facts are still
+derived from the raw items. Failed artifacts, and sources whose items the
+fact derivers cannot read, are listed under the tenant's ``errors``. Output
+is one evidence document per tenant as JSONL, ready for ``engine.autoscore``::
+
+    python tools/evidence_standin.py --port 8765 &
+    python -m engine.collect contoso fabrikam --out dist/evidence.jsonl \\
+        --graph-url http://127.0.0.1:8765/graph --ad-url http://127.0.0.1:8765/ad
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import httpx
+
+from .evidence_store import EvidenceStore
+from .models import Evidence
+from .registry import RegistryIndex, open_registry
+
+# artifact -> (Evidence.source, endpoint path below the tenant)
+ARTIFACTS: Dict[str, Tuple[str, str]] = {
+    "access_reviews": ("entra", "identityGovernance/accessReviews/definitions"),
+    "app_registrations": ("entra", "applications"),
+    "app_role_assignments": ("entra", "servicePrincipals/appRoleAssignments"),
+    "audit_logs": ("entra", "auditLogs/directoryAudits"),
+    "authentication_strengths": ("entra", "policies/authenticationStrengthPolicies"),
+    "break_glass_accounts": ("entra", "users/breakGlass"),
+    "conditional_access_policies": ("entra", "identity/conditionalAccess/policies"),
+    "credential_expiry": ("entra", "applications/credentials"),
+    "device_filters": ("entra", "identity/conditionalAccess/deviceFilters"),
+    "directory_roles": ("entra", "directoryRoles"),
+    "guest_policies": ("entra", "policies/crossTenantAccessPolicy/partners"),
+    "identity_protection_policies": ("entra", "identityProtection/riskPolicies"),
+    "named_locations": ("entra", "identity/conditionalAccess/namedLocations"),
+    "pim_approvals": ("entra", "roleManagement/directory/roleAssignmentApprovals"),
+    "pim_assignments": ("entra", "roleManagement/directory/roleAssignmentScheduleInstances"),
+    "pim_settings": ("entra", "policies/roleManagementPolicies"),
+    "sign_in_logs": ("entra", "auditLogs/signIns"),
+    "account_disable_logs": ("ad", "accounts/disabled"),
+}
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# httpcore scans every pooled connection whenever a request is assigned, so
+# one large pool gets slower as concurrency grows; tenants are spread over
+# several clients of at most this many connections instead.
+CONNECTIONS_PER_CLIENT = 8
+# clientAppUsed values of modern authentication; anything else is legacy.
+MODERN_CLIENTS = frozenset({"Browser", "Mobile Apps and Desktop clients"})
+
+
+class CollectionError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class CollectorConfig:
+    base_urls: Mapping[str, str]
+    concurrency: int = 16
+    retries: int = 4
+    backoff: float = 0.2
+    max_backoff: float = 10.0
+    timeout: float = 30.0
+    token: Optional[str] = None
+    store: Optional[EvidenceStore] = None
+
+
+@dataclass
+class CollectStats:
+    requests: int = 0
+    retries: int = 0
+    failed_artifacts: int = 0
+
+
+def required_artifacts(controls: Iterable[Mapping[str, Any]]) -> Tuple[List[str], List[str]]:
+    """Artifacts the registry's controls need: (collectable, not collectable), each sorted."""
+    needed = {a for c in controls for a in c.get("evidence", {}).get("artifacts", [])}
+    return sorted(needed & ARTIFACTS.keys()), sorted(needed - ARTIFACTS.keys())
+
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    """Aware datetime for an ISO 8601 string (naive means UTC); None if it does not parse."""
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def _mfa_facts(a: Mapping[str, List[Any]], now: datetime) -> Dict[str, Any]:
+    sign_ins = a["sign_in_logs"]
+    mfa = sum(1 for s in sign_ins if s.get("authenticationRequirement") == "multiFactorAuthentication")
+    excluded = set()
+    for p in a["conditional_access_policies"]:
+        users = p.get("conditions", {}).get("users", {})
+        if (
+            p.get("state") == "enabled"
+            and "mfa" in p.get("grantControls", {}).get("builtInControls", [])
+            and "All" in users.get("includeUsers", [])
+        ):
+            excluded.update(users.get("excludeUsers", []))
+    return {
+        "mfa": {
+            "enforced_pct": round(100.0 * mfa / len(sign_ins), 1) if sign_ins else 0.0,
+            "excluded_users": len(excluded),
+        }
+    }
+
+
+def _legacy_auth_facts(a: Mapping[str, List[Any]], now: datetime) -> Dict[str, Any]:
+    legacy = [s for s in a["sign_in_logs"] if s.get("clientAppUsed") not in MODERN_CLIENTS]
+    blocked = sum(1 for s in legacy if s.get("status", {}).get("errorCode", 0) != 0)
+    return {"legacy_auth": {"blocked_pct": round(100.0 * blocked / len(legacy), 1) if legacy else 100.0}}
+
+
+def _pim_facts(a: Mapping[str, List[Any]], now: datetime) -> Dict[str, Any]:
+    items = a["pim_assignments"]
+    return {
+        "pim": {
+            "permanent_assignments": sum(
+                1 for i in items if i.get("assignmentType") == "Assigned" and i.get("endDateTime") is None
+            ),
+            "eligible_assignments": sum(1 for i in items if i.get("assignmentType") == "Eligible"),
+        }
+    }
+
+
+def _break_glass_facts(a: Mapping[str, List[Any]], now: datetime) -> Dict[str, Any]:
+    accounts = a["break_glass_accounts"]
+    facts: Dict[str, Any] = {
+        "accounts": len(accounts),
+        "monitored": bool(accounts) and all(x.get("monitored") for x in accounts),
+    }
+    # An account never tested counts from its creation.
+    tested = [_parse_time(x.get("lastTestedDateTime") or x.get("createdDateTime")) for x in accounts]
+    if tested and all(t is not None for t in tested):
+        facts["days_since_test"] = max((now - t).days for t in tested if t is not None)
+    return {"break_glass": facts}
+
+
+def _leaver_facts(a: Mapping[str, List[Any]], now: datetime) -> Dict[str, Any]:
+    logs = a["account_disable_logs"]
+    facts: Dict[str, Any] = {"disabled": len(logs)}
+    slas = [x["slaHours"] for x in logs if isinstance(x.get("slaHours"), (int, float))]
+    if slas:
+        breaches = 0
+        for x in logs:
+            start, end = _parse_time(x.get("terminatedAt")), _parse_time(x.get("disabledAt"))
+            if start is not None and end is not None and isinstance(x.get("slaHours"), (int, float)):
+                breaches += (end - start).total_seconds() > x["slaHours"] * 3600
+        facts["sla_hours"] = max(slas)
+        facts["sla_breaches"] = breaches
+    return {"leavers": facts}
+
+
+# (artifacts read, deriver) per source; a deriver runs only when all its artifacts were collected.
+FACT_DERIVERS: Dict[str, List[Tuple[Tuple[str, ...], Callable[[Mapping[str, List[Any]], datetime], Dict[str, Any]]]]] = {
+    "entra": [
+        (("sign_in_logs", "conditional_access_policies"), _mfa_facts),
+        (("sign_in_logs",), _legacy_auth_facts),
+        (("pim_assignments",), _pim_facts),
+        (("break_glass_accounts",), _break_glass_facts),
+    ],
+    "ad": [
+        (("account_disable_logs",), _leaver_facts),
+    ],
+}
+
+
+def derive_facts(source: str, artifacts: Mapping[str, List[Any]], now: datetime) -> Dict[str, Any]:
+    """Facts for one source: item counts per artifact plus whatever the derivers can compute."""
+    facts: Dict[str, Any] = {"counts": {name: len(items) for name, items in sorted(artifacts.items())}}
+    for needs, deriver in FACT_DERIVERS.get(source, []):
+        if all(n in artifacts for n in needs):
+            facts.update(deriver(artifacts, now))
+    return facts
+
+
+def _store_artifacts(store: EvidenceStore, artifacts: Mapping[str, List[Any]]) -> Dict[str, Any]:
+    stored = {}
+    for artifact, items in artifacts.items():
+        data = json.dumps(items, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        stored[artifact] = {"ref": store.put_bytes(data, "application/json").ref, "items": len(items)}
+    return stored
+
+
+def _page(url: str, resp: httpx.Response) -> Dict[str, Any]:
+    """A 200 response as an OData page: an object whose ``value`` is a list."""
+    try:
+        page = resp.json()
+    except ValueError:
+        raise CollectionError(f"{url}: response is not JSON") from None
+    if not isinstance(page, dict) or not isinstance(page.get("value", []), list):
+        raise CollectionError(f"{url}: response is not a page with a 'value' list")
+    next_link = page.get("@odata.nextLink")
+    if next_link is not None and not isinstance(next_link, str):
+        raise CollectionError(f"{url}: '@odata.nextLink' is not a string")
+    return page
+
+
+def _retry_delay(cfg: CollectorConfig, attempt: int, retry_after: Optional[str]) -> float:
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), cfg.max_backoff)
+        except ValueError:
+            pass
+    # Full jitter keeps many throttled requests from retrying in lockstep.
+    return random.uniform(0, min(cfg.backoff * (2 ** attempt), cfg.max_backoff))
+
+
+async def _get_page(
+    client: httpx.AsyncClient,
+    limit: asyncio.Semaphore,
+    cfg: CollectorConfig,
+    stats: CollectStats,
+    url: str,
+) -> Dict[str, Any]:
+    for attempt in range(cfg.retries + 1):
+        retry_after = None
+        async with limit:
+            stats.requests += 1
+            try:
+                resp = await client.get(url)
+            except httpx.TransportError as exc:
+                error = f"{url}: {exc.__class__.__name__}"
+            else:
+                if resp.status_code == 200:
+                    return _page(url, resp)
+                error = f"{url}: HTTP {resp.status_code}"
+                if resp.status_code not in RETRY_STATUSES:
+                    raise CollectionError(error)
+                retry_after = resp.headers.get("Retry-After")
+        if attempt == cfg.retries:
+            break
+        stats.retries += 1
+        await asyncio.sleep(_retry_delay(cfg, attempt, retry_after))
+    raise CollectionError(f"{error} after {cfg.retries + 1} attempt(s)")
+
+
+async def _fetch_artifact(
+    client: httpx.AsyncClient,
+    limit: asyncio.Semaphore,
+    cfg: CollectorConfig,
+    stats: CollectStats,
+    tenant: str,
+    artifact: str,
+) -> List[Any]:
+    source, path = ARTIFACTS[artifact]
+    url: Optional[str] = f"{cfg.base_urls[source].rstrip('/')}/{tenant}/{path}"
+    items: List[Any] = []
+    while url is not None:
+        page = await _get_page(client, limit, cfg, stats, url)
+        items.extend(page.get("value", []))
+        url = page.get("@odata.nextLink")
+    return items
+
+
+async def collect_tenant(
+    client: httpx.AsyncClient,
+    limit: asyncio.Semaphore,
+    cfg: CollectorConfig,
+    stats: CollectStats,
+    tenant: str,
+    artifacts: List[str],
+) -> Dict[str, Any]:
+    """Evidence document for one tenant: ``{"tenant", "evidence", "errors"}``."""
+    wanted = [a for a in artifacts if ARTIFACTS[a][0] in cfg.base_urls]
+    results = await asyncio.gather(
+        *(_fetch_artifact(client, limit, cfg, stats, tenant, a) for a in wanted),
+        return_exceptions=True,
+    )
+    collected_at = datetime.now(timezone.utc).replace(microsecond=0)
+    by_source: Dict[str, Dict[str, List[Any]]] = {}
+    errors: Dict[str, str] = {}
+    for artifact, result in zip(wanted, results):
+        if isinstance(result, BaseException):
+            if not isinstance(result, (CollectionError, ValueError)):
+                raise result
+            stats.failed_artifacts += 1
+            errors[artifact] = str(result)
+            continue
+        by_source.setdefault(ARTIFACTS[artifact][0], {})[artifact] = result
+
+    evidence = []
+    for source, found in sorted(by_source.items()):
+        try:
+            facts = derive_facts(source, found, collected_at)
+        except Exception as exc:
+            # Items the derivers cannot read fail this tenant's source, not the run.
+            errors[source] = f"deriving facts: {exc.__class__.__name__}: {exc}"
+            continue
+        kept: Mapping[str, Any] = found
+        if cfg.store is not None:
+            kept = await asyncio.to_thread(_store_artifacts, cfg.store, found)
+        evidence.append(
+            Evidence(
+                source=source,
+                collected_at=collected_at.isoformat().replace("+00:00", "Z"),
+                artifacts=dict(kept),
+                facts=facts,
+            )
+        )
+    return {"tenant": tenant, "evidence": [e.model_dump() for e in evidence], "errors": errors}
+
+
+async def collect(
+    tenants: List[str],
+    artifacts: List[str],
+    cfg: CollectorConfig,
+    on_tenant: Callable[[Dict[str, Any]], None],
+) -> CollectStats:
+    """Collect every tenant, calling ``on_tenant`` with each document as it completes."""
+    stats = CollectStats()
+    concurrency = max(1, cfg.concurrency)
+    limit = asyncio.Semaphore(concurrency)
+    headers = {"Authorization": f"Bearer {cfg.token}"} if cfg.token else {}
+    per_client = min(concurrency, CONNECTIONS_PER_CLIENT)
+    pool = httpx.Limits(max_connections=per_client, max_keepalive_connections=per_client)
+    async with AsyncExitStack() as stack:
+        clients = [
+            await stack.enter_async_context(httpx.AsyncClient(headers=headers, limits=pool, timeout=cfg.timeout))
+            for _ in range(-(-concurrency // per_client))
+        ]
+        tasks = [
+            collect_tenant(clients[n % len(clients)], limit, cfg, stats, t, artifacts) for n, t in enumerate(tenants)
+        ]
+        for done in asyncio.as_completed(tasks):
+            on_tenant(await done)
+    return stats
+
+
+def _controls(registry_path: Path) -> List[Dict[str, Any]]:
+    registry = open_registry(registry_path)
+    if isinstance(registry, RegistryIndex):
+        with registry:
+            return list(registry.iter_controls())
+    return registry.get("controls", [])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    root = Path(__file__).resolve().parents[1]
+    parser = argparse.ArgumentParser(description="Collect evidence for tenants from Graph and the AD bridge.")
+    parser.add_argument("tenants", nargs="*", help="tenant ids (or use --tenants-file)")
+    parser.add_argument("--tenants-file", type=Path, help="file with one tenant id per line")
+    parser.add_argument("--registry", type=Path, default=root / "dist" / "controls.json")
+    parser.add_argument("--graph-url", help="base URL for entra artifacts, e.g. https://graph.microsoft.com/v1.0/tenants")
+    parser.add_argument("--ad-url", help="base URL of the AD bridge for ad artifacts")
+    parser.add_argument("--token", help="bearer token sent with every request")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight across all tenants")
+    parser.add_argument("--retries", type=int, default=4)
+    parser.add_argument("--backoff", type=float, default=0.2, help="base backoff in seconds, doubled per retry")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--out", default=str(root / "dist" / "evidence.jsonl"), help="evidence JSONL, or - for stdout")
+    parser.add_argument("--store", type=Path, help="write artifact items to this evidence store and keep only their refs")
+    args = parser.parse_args(argv)
+
+    tenants = list(args.tenants)
+    if args.tenants_file is not None:
+        tenants += [t.strip() for t in args.tenants_file.read_text(encoding="utf-8").splitlines() if t.strip()]
+    if not tenants:
+        parser.error("no tenants given")
+    base_urls = {s: u for s, u in (("entra", args.graph_url), ("ad", args.ad_url)) if u}
+    if not base_urls:
+        parser.error("give --graph-url and/or --ad-url")
+
+    artifacts, uncollectable = required_artifacts(_controls(args.registry))
+    cfg = CollectorConfig(
+        base_urls=base_urls,
+        concurrency=args.concurrency,
+        retries=args.retries,
+        backoff=args.backoff,
+        timeout=args.timeout,
+        token=args.token,
+        store=EvidenceStore(args.store) if args.store is not None else None,
+    )
+
+    out = sys.stdout if args.out == "-" else None
+    if out is None:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        out = open(args.out, "w", encoding="utf-8")
+
+    def write(doc: Dict[str, Any]) -> None:
+        for artifact, error in doc["errors"].items():
+            print(f"FAILED {doc['tenant']} {artifact}: {error}", file=sys.stderr)
+        out.write(json.dumps(doc, sort_keys=True, ensure_ascii=False) + "\n")
+
+    started = time.perf_counter()
+    try:
+        stats = asyncio.run(collect(tenants, artifacts, cfg, write))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - started
+
+    if uncollectable:
+        print(f"No collector for: {', '.join(uncollectable)}.", file=sys.stderr)
+    print(
+        f"Collected {len(artifacts)} artifact(s) for {len(tenants)} tenant(s) in {elapsed:.2f}s: "
+        f"{stats.requests} request(s), {stats.retries} retried, {stats.failed_artifacts} artifact(s) failed.",
+        file=sys.stderr,
+    )
+    if args.out != "-":
+        print(f"Wrote {args.out}.", file=sys.stderr)
+    return 1 if stats.failed_artifacts else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,320 @@
+"""Content-addressed store for evidence artifacts.
+
+A blob is split into fixed-size chunks (``CHUNK_SIZE``). Each chunk is
+zlib-compressed when that makes it smaller and written once under
+``chunks/<aa>/<sha256 of the raw chunk>``; the blob's manifest, under
+``objects/<aa>/<sha256 of the whole blob>.json``, lists its chunks in
+order. A blob is referred to as ``sha256:<hex>``, the form used in
+``evidence_refs``, so the same export cited by many controls and
+assessments is stored once, and blobs that share chunks share their
+storage.
+
+Reads never load a whole blob: ``read_range`` memory-maps only the chunks
+a byte range touches and decompresses those that are compressed.
+
+    python -m engine.evidence_store put sign_ins.json
+    python -m engine.evidence_store get sha256:<hex> --range 0-1023 > head.json
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sys
+import tempfile
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+REF_PREFIX = "sha256:"
+CHUNK_SIZE = 1 << 20
+MANIFEST_VERSION = 1
+_HEX = frozenset("0123456789abcdef")
+
+
+def is_ref(value: Any) -> bool:
+    """True for a well-formed ``sha256:<hex>`` store reference."""
+    return (
+        isinstance(value, str)
+        and value.startswith(REF_PREFIX)
+        and len(value) == len(REF_PREFIX) + 64
+        and set(value[len(REF_PREFIX):]) <= _HEX
+    )
+
+
+def ref_digest(ref: str) -> str:
+    if not is_ref(ref):
+        raise ValueError(f"not an evidence ref: {ref!r}")
+    return ref[len(REF_PREFIX):]
+
+
+@dataclass(frozen=True)
+class ChunkEntry:
+    digest: str
+    size: int
+    stored: int
+    codec: str  # "zlib" or "raw"
+
+
+@dataclass(frozen=True)
+class BlobInfo:
+    ref: str
+    size: int
+    chunk_size: int
+    chunks: Tuple[ChunkEntry, ...]
+    media_type: str
+
+    @property
+    def stored(self) -> int:
+        return sum(c.stored for c in self.chunks)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "version": MANIFEST_VERSION,
+            "ref": self.ref,
+            "size": self.size,
+            "chunk_size": self.chunk_size,
+            "media_type": self.media_type,
+            "chunks": [[c.digest, c.size, c.stored, c.codec] for c in self.chunks],
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "BlobInfo":
+        return cls(
+            ref=data["ref"],
+            size=data["size"],
+            chunk_size=data["chunk_size"],
+            chunks=tuple(ChunkEntry(*c) for c in data["chunks"]),
+            media_type=data.get("media_type", "application/octet-stream"),
+        )
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class BlobWriter:
+    """Incremental ``EvidenceStore.put``: ``write`` pieces of any size, then ``finish``.
+
+    Full chunks are hashed, compressed and stored as soon as they fill, so
+    memory stays at one chunk however large the blob.
+    """
+
+    def __init__(self, store: "EvidenceStore", media_type: str) -> None:
+        self.store = store
+        self.media_type = media_type
+        self._hash = hashlib.sha256()
+        self._buf = bytearray()
+        self._chunks: List[ChunkEntry] = []
+        self._size = 0
+
+    def write(self, data: bytes) -> None:
+        self._hash.update(data)
+        self._size += len(data)
+        self._buf += data
+        cs = self.store.chunk_size
+        while len(self._buf) >= cs:
+            self._chunks.append(self.store._put_chunk(bytes(self._buf[:cs])))
+            del self._buf[:cs]
+
+    def finish(self) -> BlobInfo:
+        if self._buf:
+            self._chunks.append(self.store._put_chunk(bytes(self._buf)))
+            self._buf.clear()
+        info = BlobInfo(
+            ref=REF_PREFIX + self._hash.hexdigest(),
+            size=self._size,
+            chunk_size=self.store.chunk_size,
+            chunks=tuple(self._chunks),
+            media_type=self.media_type,
+        )
+        path = self.store._manifest_path(info.ref)
+        # Same digest, same content: an existing manifest is already correct.
+        if not path.exists():
+            _write_atomic(path, json.dumps(info.to_json(), sort_keys=True).encode("utf-8"))
+        return info
+
+
+class EvidenceStore:
+    def __init__(self, root: Path, chunk_size: int = CHUNK_SIZE, level: int = 6) -> None:
+        self.root = Path(root)
+        self.chunk_size = chunk_size
+        self.level = level
+
+    def _chunk_path(self, digest: str) -> Path:
+        return self.root / "chunks" / digest[:2] / digest
+
+    def _manifest_path(self, ref: str) -> Path:
+        digest = ref_digest(ref)
+        return self.root / "objects" / digest[:2] / f"{digest}.json"
+
+    def _put_chunk(self, raw: bytes) -> ChunkEntry:
+        digest = hashlib.sha256(raw).hexdigest()
+        path = self._chunk_path(digest)
+        try:
+            stored = path.stat().st_size
+        except FileNotFoundError:
+            packed = zlib.compress(raw, self.level)
+            data = packed if len(packed) < len(raw) else raw
+            _write_atomic(path, data)
+            stored = len(data)
+        return ChunkEntry(digest, len(raw), stored, "zlib" if stored < len(raw) else "raw")
+
+    def writer(self, media_type: str = "application/octet-stream") -> BlobWriter:
+        return BlobWriter(self, media_type)
+
+    def put_stream(self, stream: BinaryIO, media_type: str = "application/octet-stream") -> BlobInfo:
+        w = self.writer(media_type)
+        while True:
+            block = stream.read(self.chunk_size)
+            if not block:
+                return w.finish()
+            w.write(block)
+
+    def put_bytes(self, data: bytes, media_type: str = "application/octet-stream") -> BlobInfo:
+        w = self.writer(media_type)
+        w.write(data)
+        return w.finish()
+
+    def put_file(self, path: Path, media_type: str = "application/octet-stream") -> BlobInfo:
+        with Path(path).open("rb") as f:
+            return self.put_stream(f, media_type)
+
+    def has(self, ref: str) -> bool:
+        return is_ref(ref) and self._manifest_path(ref).exists()
+
+    def stat(self, ref: str) -> BlobInfo:
+        """Manifest of ``ref``; raises KeyError when it is not in the store."""
+        try:
+            data = json.loads(self._manifest_path(ref).read_bytes())
+        except FileNotFoundError:
+            raise KeyError(ref) from None
+        return BlobInfo.from_json(data)
+
+    def _chunk(self, entry: ChunkEntry) -> Any:
+        """The raw bytes of a chunk: an mmap for stored-raw chunks, decompressed bytes otherwise."""
+        if entry.size == 0:
+            return b""
+        with self._chunk_path(entry.digest).open("rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if entry.codec == "raw":
+            return mapped
+        with mapped:
+            return zlib.decompress(mapped)
+
+    def read_range(self, ref: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Bytes ``[start, end)`` of a blob, one piece per chunk touched."""
+        info = self.stat(ref)
+        end = info.size if end is None else min(end, info.size)
+        cs = info.chunk_size
+        pos = max(0, start)
+        while pos < end:
+            i = pos // cs
+            chunk = self._chunk(info.chunks[i])
+            try:
+                lo = pos - i * cs
+                hi = min(end - i * cs, info.chunks[i].size)
+                yield bytes(chunk[lo:hi])
+            finally:
+                if isinstance(chunk, mmap.mmap):
+                    chunk.close()
+            pos = i * cs + hi
+
+    def read_bytes(self, ref: str) -> bytes:
+        return b"".join(self.read_range(ref))
+
+    def verify(self, ref: str) -> None:
+        """Re-hash every chunk and the whole blob; raise ValueError on a mismatch."""
+        info = self.stat(ref)
+        whole = hashlib.sha256()
+        for entry in info.chunks:
+            chunk = self._chunk(entry)
+            try:
+                if hashlib.sha256(chunk).hexdigest() != entry.digest:
+                    raise ValueError(f"{ref}: chunk {entry.digest} is corrupt")
+                whole.update(chunk)
+            finally:
+                if isinstance(chunk, mmap.mmap):
+                    chunk.close()
+        if REF_PREFIX + whole.hexdigest() != ref:
+            raise ValueError(f"{ref}: content hashes to {REF_PREFIX}{whole.hexdigest()}")
+
+    def usage(self) -> Dict[str, int]:
+        """Blob count, logical bytes referenced by manifests, and chunk bytes on disk."""
+        blobs = logical = 0
+        for path in (self.root / "objects").glob("*/*.json"):
+            blobs += 1
+            logical += json.loads(path.read_bytes())["size"]
+        chunk_files = list((self.root / "chunks").glob("*/*"))
+        return {
+            "blobs": blobs,
+            "logical_bytes": logical,
+            "chunks": len(chunk_files),
+            "stored_bytes": sum(p.stat().st_size for p in chunk_files),
+        }
+
+
+def _parse_range(spec: str) -> Tuple[int, Optional[int]]:
+    start, _, end = spec.partition("-")
+    return int(start or 0), (int(end) + 1 if end else None)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    root = Path(__file__).resolve().parents[1]
+    parser = argparse.ArgumentParser(description="Content-addressed evidence store.")
+    parser.add_argument("--store", type=Path, default=Path(os.getenv("EVIDENCE_STORE_DIR", root / "evidence-store")))
+    sub = parser.add_subparsers(dest="command", required=True)
+    put = sub.add_parser("put", help="store files and print their refs")
+    put.add_argument("paths", nargs="+", type=Path)
+    put.add_argument("--media-type", default="application/octet-stream")
+    get = sub.add_parser("get", help="write a blob (or a byte range of it) to stdout")
+    get.add_argument("ref")
+    get.add_argument("--range", help="inclusive byte range, e.g. 0-1023 or 4096-")
+    stat = sub.add_parser("stat", help="print a blob's manifest")
+    stat.add_argument("ref")
+    verify = sub.add_parser("verify", help="re-hash blobs")
+    verify.add_argument("refs", nargs="+")
+    sub.add_parser("usage", help="print store size and dedup ratio")
+    args = parser.parse_args(argv)
+
+    store = EvidenceStore(args.store)
+    try:
+        if args.command == "put":
+            for path in args.paths:
+                info = store.put_file(path, args.media_type)
+                print(f"{info.ref}  {path}")
+        elif args.command == "get":
+            start, end = _parse_range(args.range) if args.range else (0, None)
+            for piece in store.read_range(args.ref, start, end):
+                sys.stdout.buffer.write(piece)
+        elif args.command == "stat":
+            print(json.dumps(store.stat(args.ref).to_json(), indent=2, sort_keys=True))
+        elif args.command == "verify":
+            for ref in args.refs:
+                store.verify(ref)
+                print(f"OK {ref}")
+        else:
+            usage = store.usage()
+            ratio = usage["logical_bytes"] / usage["stored_bytes"] if usage["stored_bytes"] else 0.0
+            print(json.dumps(dict(usage, ratio=round(ratio, 2)), indent=2, sort_keys=True))
+    except KeyError as exc:
+        print(f"unknown evidence ref {exc}", file=sys.stderr)
+        return 1
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
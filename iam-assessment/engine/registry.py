@@ -1,6 +1,24 @@
+import hashlib
 import json
+import mmap
+import struct
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple, Union
+
+# dist/controls.idx layout (all integers little-endian):
+#
+#   prefix   magic, header length, control count, keys/index/data offsets
+#   header   JSON: every top-level registry key except "controls", plus
+#            "domain_ids" (sorted) and "domain_ranges" {domain: [start, end]}
+#   keys     control ids, UTF-8, concatenated in id order
+#   index    one _ENTRY per control in id order: key offset/length, domain
+#            code (position in sorted domain list), weight, record offset/length
+#   data     one canonical-JSON control record per line, grouped by domain
+#            then id, so a domain's controls are one contiguous slice
+INDEX_MAGIC = b"IAMREG\x00\x01"
+_PREFIX = struct.Struct("<8sIIQQQ")
+_ENTRY = struct.Struct("<IHHHxxQI")
+
 
 def load_registry(path: Path) -> Dict[str, Any]:
     data = json.loads(path.read_text(encoding="utf-8"))
@@ -8,5 +26,244 @@ def load_registry(path: Path) -> Dict[str, Any]:
         raise ValueError("controls.json missing build.registry_hash")
     return data
 
-def registry_hash(registry: Dict[str, Any]) -> str:
+
+def registry_hash(registry: Union[Dict[str, Any], "RegistryIndex"]) -> str:
+    if isinstance(registry, RegistryIndex):
+        return registry.registry_hash
     return registry["build"]["registry_hash"]
+
+
+def canonical_registry_hash(registry: Dict[str, Any]) -> str:
+    """sha256 of the registry minus ``build``, as tools/compile_controls.py computes it."""
+    base = {k: v for k, v in registry.items() if k != "build"}
+    body = json.dumps(base, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+# Control fields that can move a score. A control that differs only in other
+# fields (wording, evidence, scoring rules) keeps its assessments.
+SCORING_FIELDS = ("domain", "weight", "scoring.levels")
+
+
+def _control_fields(control: Dict[str, Any]) -> Dict[str, Any]:
+    """Top-level fields of a control, with ``scoring`` split into ``scoring.<key>``."""
+    fields = {k: v for k, v in control.items() if k != "scoring"}
+    for k, v in (control.get("scoring") or {}).items():
+        fields[f"scoring.{k}"] = v
+    return fields
+
+
+def diff_controls(old: Mapping[str, Dict[str, Any]], new: Mapping[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Controls added, removed and changed between two registries (control dicts by id).
+
+    A control is ``changed`` when one of SCORING_FIELDS differs, so existing
+    scores need re-assessment, and ``text_changed`` when only other fields
+    do. ``fields`` names every field that differs (``scoring`` split by key).
+    """
+    changed = []
+    text_changed = []
+    for cid in sorted(old.keys() & new.keys()):
+        a, b = old[cid], new[cid]
+        if a == b:
+            continue
+        fa, fb = _control_fields(a), _control_fields(b)
+        fields = sorted(k for k in fa.keys() | fb.keys() if fa.get(k) != fb.get(k))
+        entry = {"control_id": cid, "fields": fields}
+        if any(f in SCORING_FIELDS for f in fields):
+            changed.append(entry)
+        else:
+            text_changed.append(entry)
+    return {
+        "added": sorted(new.keys() - old.keys()),
+        "removed": sorted(old.keys() - new.keys()),
+        "changed": changed,
+        "text_changed": text_changed,
+        "unchanged": len(old.keys() & new.keys()) - len(changed) - len(text_changed),
+    }
+
+
+def _canonical(obj: Any) -> bytes:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def index_path(json_path: Path) -> Path:
+    """dist/controls.idx next to dist/controls.json."""
+    return json_path.with_suffix(".idx")
+
+
+def encode_registry_index(registry: Dict[str, Any]) -> bytes:
+    """Serialise a compiled registry (controls.json contents) as a controls.idx artifact."""
+    if "build" not in registry or "registry_hash" not in registry["build"]:
+        raise ValueError("registry missing build.registry_hash")
+    controls = sorted(registry.get("controls", []), key=lambda c: c["id"])
+    domain_ids = sorted({c["domain"] for c in controls})
+    domain_code = {d: i for i, d in enumerate(domain_ids)}
+
+    data = bytearray()
+    record_at: Dict[str, Tuple[int, int]] = {}
+    domain_ranges: Dict[str, List[int]] = {}
+    for c in sorted(controls, key=lambda c: (c["domain"], c["id"])):
+        record = _canonical(c)
+        start = len(data)
+        record_at[c["id"]] = (start, len(record))
+        data += record + b"\n"
+        span = domain_ranges.setdefault(c["domain"], [start, start])
+        span[1] = len(data)
+
+    header = {k: v for k, v in registry.items() if k != "controls"}
+    header["domain_ids"] = domain_ids
+    header["domain_ranges"] = domain_ranges
+    header_bytes = _canonical(header)
+
+    keys = bytearray()
+    index = bytearray()
+    for c in controls:
+        key = c["id"].encode("utf-8")
+        rec_off, rec_len = record_at[c["id"]]
+        index += _ENTRY.pack(len(keys), len(key), domain_code[c["domain"]], c["weight"], rec_off, rec_len)
+        keys += key
+
+    keys_offset = _PREFIX.size + len(header_bytes)
+    index_offset = keys_offset + len(keys)
+    data_offset = index_offset + len(index)
+    prefix = _PREFIX.pack(INDEX_MAGIC, len(header_bytes), len(controls), keys_offset, index_offset, data_offset)
+    return prefix + header_bytes + bytes(keys) + bytes(index) + bytes(data)
+
+
+class RegistryIndex:
+    """Read-only, memory-mapped view of a controls.idx artifact.
+
+    Only the header is parsed on open. ``control`` binary-searches the id
+    index and decodes a single record; ``controls_in_domain`` decodes one
+    contiguous slice. Decoded controls are memoised and must be treated as
+    read-only.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with path.open("rb") as f:
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, header_len, count, keys_off, index_off, data_off = _PREFIX.unpack_from(self._buf, 0)
+        except struct.error:
+            self._buf.close()
+            raise ValueError(f"{path} is not a registry index") from None
+        if magic != INDEX_MAGIC:
+            self._buf.close()
+            raise ValueError(f"{path} is not a registry index")
+        self.header: Dict[str, Any] = json.loads(self._buf[_PREFIX.size:_PREFIX.size + header_len])
+        if "registry_hash" not in self.header.get("build", {}):
+            self._buf.close()
+            raise ValueError(f"{path} missing build.registry_hash")
+        self.registry_hash: str = self.header["build"]["registry_hash"]
+        self._count = count
+        self._keys_off = keys_off
+        self._index_off = index_off
+        self._data_off = data_off
+        self._ids: Optional[List[str]] = None
+        self._memo: Dict[str, Dict[str, Any]] = {}
+
+    def __enter__(self) -> "RegistryIndex":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._buf.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _entry(self, i: int) -> Tuple[int, int, int, int, int, int]:
+        return _ENTRY.unpack_from(self._buf, self._index_off + i * _ENTRY.size)
+
+    def _key(self, i: int) -> str:
+        key_off, key_len = self._entry(i)[:2]
+        start = self._keys_off + key_off
+        return self._buf[start:start + key_len].decode("utf-8")
+
+    def ids(self) -> List[str]:
+        """All control ids in sorted order."""
+        if self._ids is None:
+            self._ids = [self._key(i) for i in range(self._count)]
+        return self._ids
+
+    def _find(self, control_id: str) -> Optional[int]:
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < control_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and self._key(lo) == control_id:
+            return lo
+        return None
+
+    def _decode(self, offset: int, length: int) -> Dict[str, Any]:
+        start = self._data_off + offset
+        return json.loads(self._buf[start:start + length])
+
+    def control(self, control_id: str) -> Optional[Dict[str, Any]]:
+        cached = self._memo.get(control_id)
+        if cached is not None:
+            return cached
+        i = self._find(control_id)
+        if i is None:
+            return None
+        _, _, _, _, rec_off, rec_len = self._entry(i)
+        control = self._decode(rec_off, rec_len)
+        self._memo[control_id] = control
+        return control
+
+    def controls_in_domain(self, domain: str) -> List[Dict[str, Any]]:
+        span = self.header["domain_ranges"].get(domain)
+        if span is None:
+            return []
+        out: List[Dict[str, Any]] = []
+        start = self._data_off + span[0]
+        for line in self._buf[start:self._data_off + span[1]].splitlines():
+            control = json.loads(line)
+            out.append(self._memo.setdefault(control["id"], control))
+        return out
+
+    def iter_controls(self) -> Iterator[Dict[str, Any]]:
+        """Every control in id order."""
+        for control_id in self.ids():
+            control = self.control(control_id)
+            assert control is not None
+            yield control
+
+    def scoring_view(self) -> Dict[str, Any]:
+        """Just enough of the registry for ``engine.scoring.compile_model``,
+        built from the index without decoding any control record."""
+        domain_ids = self.header["domain_ids"]
+        controls = []
+        for i in range(self._count):
+            _, _, domain, weight, _, _ = self._entry(i)
+            controls.append({"id": self._key(i), "domain": domain_ids[domain], "weight": weight})
+        return {"build": self.header["build"], "scoring": self.header.get("scoring", {}), "controls": controls}
+
+    def to_registry(self) -> Dict[str, Any]:
+        """The full registry, equal to the controls.json it was built from."""
+        registry = {k: v for k, v in self.header.items() if k not in ("domain_ids", "domain_ranges")}
+        registry["controls"] = list(self.iter_controls())
+        return registry
+
+    def verify(self) -> None:
+        """Recompute the canonical hash over every record; raise on mismatch."""
+        actual = canonical_registry_hash(self.to_registry())
+        if actual != self.registry_hash:
+            raise ValueError(f"{self.path} records registry_hash {self.registry_hash}, content hashes to {actual}")
+
+
+def load_registry_index(path: Path) -> RegistryIndex:
+    return RegistryIndex(path)
+
+
+def open_registry(path: Path) -> Union[Dict[str, Any], RegistryIndex]:
+    """controls.idx opens lazily as a ``RegistryIndex``; anything else loads as JSON."""
+    if path.suffix == ".idx":
+        return load_registry_index(path)
+    return load_registry(path)
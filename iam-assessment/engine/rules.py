@@ -0,0 +1,291 @@
+"""Machine-evaluable scoring rules over evidence facts.
+
+A control may list ``scoring.rules`` in its YAML, each a ``score`` and a
+``when`` expression over the facts of one or more evidence sources::
+
+    rules:
+    - score: 2
+      when: entra.mfa.enforced_pct >= 99 and entra.mfa.excluded_users <= 2
+    - score: 1
+      when: entra.mfa.enforced_pct >= 80
+    - score: 0
+      when: entra.mfa.enforced_pct < 80
+
+Expressions use Python syntax restricted to comparisons (including ``in``
+and ``not in``), ``and``/``or``/``not``, literals, fact paths rooted at an
+evidence source (``entra.x.y`` or ``ad["odd-key"]``) and the functions
+``exists(path)`` and ``len(path)``. tools/compile_controls.py compiles each
+expression into a JSON tree stored next to it as ``expr``;
+``compile_ruleset`` turns the trees of a whole registry into one Python
+function per control, so scoring a tenant is a call per control.
+
+The first rule that holds gives the score. A control whose rules read a
+missing fact (or compare incompatible values) is left unscored, as is one
+where no rule holds.
+"""
+
+import ast
+import math
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+# engine.models.Evidence.source values; the first segment of every fact path.
+SOURCES = ("entra", "ad")
+FUNCTIONS = ("exists", "len")
+
+# Per-control outcomes other than a rule index.
+NO_MATCH = -1
+NO_EVIDENCE = -2
+
+_COMPARE = {
+    ast.Eq: "eq",
+    ast.NotEq: "ne",
+    ast.Lt: "lt",
+    ast.LtE: "le",
+    ast.Gt: "gt",
+    ast.GtE: "ge",
+    ast.In: "in",
+    ast.NotIn: "not_in",
+}
+_PY_COMPARE = {"eq": "==", "ne": "!=", "lt": "<", "le": "<=", "gt": ">", "ge": ">=", "in": "in", "not_in": "not in"}
+_LITERALS = (str, int, float, bool, type(None))
+# Raised by a missing fact or a comparison between incompatible values.
+_UNEVALUABLE = (KeyError, IndexError, TypeError)
+
+
+def _fact_path(node: ast.AST, text: str) -> List[str]:
+    keys: List[str] = []
+    while True:
+        if isinstance(node, ast.Attribute):
+            keys.append(node.attr)
+            node = node.value
+        elif isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Constant) and isinstance(node.slice.value, str):
+            keys.append(node.slice.value)
+            node = node.value
+        elif isinstance(node, ast.Name):
+            keys.append(node.id)
+            break
+        else:
+            raise ValueError(f"rule {text!r}: unsupported fact path")
+    keys.reverse()
+    if keys[0] not in SOURCES:
+        raise ValueError(f"rule {text!r}: unknown evidence source '{keys[0]}' (expected one of {', '.join(SOURCES)})")
+    if len(keys) < 2:
+        raise ValueError(f"rule {text!r}: '{keys[0]}' must be followed by a fact name")
+    return keys
+
+
+def _literal(node: ast.AST, text: str) -> Any:
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return [_literal(e, text) for e in node.elts]
+    if isinstance(node, ast.Constant) and isinstance(node.value, _LITERALS):
+        value = node.value
+    elif (
+        isinstance(node, ast.UnaryOp)
+        and isinstance(node.op, ast.USub)
+        and isinstance(node.operand, ast.Constant)
+        and type(node.operand.value) in (int, float)
+    ):
+        value = -node.operand.value
+    else:
+        raise ValueError(f"rule {text!r}: unsupported expression")
+    # 1e999 parses as inf, which neither JSON nor the generated code can hold.
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ValueError(f"rule {text!r}: numbers must be finite")
+    return value
+
+
+def _tree(node: ast.AST, text: str) -> List[Any]:
+    if isinstance(node, ast.BoolOp):
+        return ["and" if isinstance(node.op, ast.And) else "or", *(_tree(v, text) for v in node.values)]
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return ["not", _tree(node.operand, text)]
+    if isinstance(node, ast.Compare):
+        pairs = []
+        left = _tree(node.left, text)
+        for op, comparator in zip(node.ops, node.comparators):
+            if type(op) not in _COMPARE:
+                raise ValueError(f"rule {text!r}: unsupported comparison")
+            right = _tree(comparator, text)
+            pairs.append([_COMPARE[type(op)], left, right])
+            left = right
+        return pairs[0] if len(pairs) == 1 else ["and", *pairs]
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+            raise ValueError(f"rule {text!r}: only {', '.join(FUNCTIONS)} may be called")
+        if len(node.args) != 1 or node.keywords:
+            raise ValueError(f"rule {text!r}: {node.func.id}() takes one fact path")
+        return [node.func.id, ["fact", *_fact_path(node.args[0], text)]]
+    if isinstance(node, (ast.Attribute, ast.Subscript, ast.Name)):
+        return ["fact", *_fact_path(node, text)]
+    return ["const", _literal(node, text)]
+
+
+def compile_expression(text: str) -> List[Any]:
+    """Parse a ``when`` expression into its JSON tree; raises ValueError."""
+    try:
+        parsed = ast.parse(text.strip(), mode="eval")
+    except SyntaxError as exc:
+        raise ValueError(f"rule {text!r}: {exc.msg}") from None
+    return _tree(parsed.body, text)
+
+
+def expression_sources(tree: List[Any]) -> List[str]:
+    """Evidence sources a compiled expression reads, sorted."""
+    found = set()
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if node[0] == "fact":
+            found.add(node[1])
+        elif node[0] != "const":
+            stack.extend(node[1:])
+    return sorted(found)
+
+
+def _python(node: List[Any]) -> str:
+    op = node[0]
+    if op == "const":
+        value = node[1]
+        values = value if isinstance(value, list) else [value]
+        if any(isinstance(v, float) and not math.isfinite(v) for v in values):
+            raise ValueError(f"non-finite constant {value!r} in rule")
+        return repr(tuple(value) if isinstance(value, list) else value)
+    if op == "fact":
+        return "f" + "".join(f"[{key!r}]" for key in node[1:])
+    if op == "exists":
+        return f"_exists(f, {tuple(node[1][1:])!r})"
+    if op == "len":
+        return f"len({_python(node[1])})"
+    if op in ("and", "or"):
+        return "(" + f" {op} ".join(_python(n) for n in node[1:]) + ")"
+    if op == "not":
+        return f"(not {_python(node[1])})"
+    if op in _PY_COMPARE:
+        return f"({_python(node[1])} {_PY_COMPARE[op]} {_python(node[2])})"
+    raise ValueError(f"unknown rule node '{op}'")
+
+
+def _exists(facts: Mapping[str, Any], path: Tuple[str, ...]) -> bool:
+    value: Any = facts
+    for key in path:
+        if not isinstance(value, Mapping) or key not in value:
+            return False
+        value = value[key]
+    return True
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    """Scoring rules of one registry, compiled to Python.
+
+    ``evaluate`` returns, per entry of ``control_ids``, the index of the
+    first rule that holds, ``NO_MATCH`` or ``NO_EVIDENCE``.
+    """
+
+    registry_hash: str
+    control_ids: Tuple[str, ...]
+    rules: Tuple[Tuple[Dict[str, Any], ...], ...]
+    artifacts: Tuple[Tuple[str, ...], ...]
+    evaluate: Callable[[Mapping[str, Any]], Tuple[int, ...]]
+
+    def findings(self, facts: Mapping[str, Any], refs: Mapping[str, str]) -> Tuple[List[Dict[str, Any]], List[int]]:
+        """Findings for every control a rule scored, plus the raw outcomes.
+
+        ``refs`` maps an evidence source, and optionally an artifact name,
+        to the reference recorded on findings derived from it. A finding
+        cites the control's own ``evidence.artifacts`` when they have refs
+        and the sources its rule read otherwise.
+        """
+        outcomes = self.evaluate(facts)
+        findings = []
+        for cid, rules, artifacts, outcome in zip(self.control_ids, self.rules, self.artifacts, outcomes):
+            if outcome < 0:
+                continue
+            rule = rules[outcome]
+            cited = [refs[a] for a in artifacts if a in refs] or [refs[s] for s in rule["sources"] if s in refs]
+            findings.append(
+                {
+                    "control_id": cid,
+                    "score": rule["score"],
+                    "finding": f"{rule['label']} (rule: {rule['when']})",
+                    "evidence_refs": list(dict.fromkeys(cited)),
+                }
+            )
+        return findings, list(outcomes)
+
+
+def compile_ruleset(controls: Iterable[Mapping[str, Any]], registry_hash: str) -> RuleSet:
+    """Build a ``RuleSet`` from registry controls (only those with rules count).
+
+    Uses the ``expr`` trees written by the compiler and parses ``when`` only
+    for rules that lack one.
+    """
+    control_ids: List[str] = []
+    all_rules: List[Tuple[Dict[str, Any], ...]] = []
+    all_artifacts: List[Tuple[str, ...]] = []
+    lines: List[str] = []
+    for control in sorted(controls, key=lambda c: c["id"]):
+        rules = control.get("scoring", {}).get("rules") or []
+        if not rules:
+            continue
+        labels = {lvl["score"]: lvl.get("label", "") for lvl in control["scoring"].get("levels", [])}
+        n = len(control_ids)
+        compiled = []
+        lines.append(f"def _c{n}(f):")
+        lines.append("    try:")
+        for i, rule in enumerate(rules):
+            tree = rule.get("expr") or compile_expression(rule["when"])
+            compiled.append(
+                {
+                    "score": rule["score"],
+                    "when": rule["when"],
+                    "label": labels.get(rule["score"], ""),
+                    "sources": expression_sources(tree),
+                }
+            )
+            lines.append(f"        if {_python(tree)}:")
+            lines.append(f"            return {i}")
+        lines.append("    except _UNEVALUABLE:")
+        lines.append(f"        return {NO_EVIDENCE}")
+        lines.append(f"    return {NO_MATCH}")
+        control_ids.append(control["id"])
+        all_rules.append(tuple(compiled))
+        all_artifacts.append(tuple(control.get("evidence", {}).get("artifacts", [])))
+
+    calls = "".join(f"_c{n}(f), " for n in range(len(control_ids)))
+    lines.append(f"def _evaluate(f):\n    return ({calls})")
+    namespace: Dict[str, Any] = {"__builtins__": {}, "len": len, "_exists": _exists, "_UNEVALUABLE": _UNEVALUABLE}
+    exec(compile("\n".join(lines), f"<rules {registry_hash[:12]}>", "exec"), namespace)
+    return RuleSet(
+        registry_hash=registry_hash,
+        control_ids=tuple(control_ids),
+        rules=tuple(all_rules),
+        artifacts=tuple(all_artifacts),
+        evaluate=namespace["_evaluate"],
+    )
+
+
+def rule_errors(control: Mapping[str, Any]) -> List[str]:
+    """Problems with a control's ``scoring.rules``: bad expressions or scores without a level."""
+    scoring = control.get("scoring", {})
+    level_scores = {lvl.get("score") for lvl in scoring.get("levels", [])}
+    errors: List[str] = []
+    for n, rule in enumerate(scoring.get("rules") or []):
+        try:
+            compile_expression(rule["when"])
+        except ValueError as exc:
+            errors.append(f"scoring.rules[{n}]: {exc}")
+        if rule.get("score") not in level_scores:
+            errors.append(f"scoring.rules[{n}]: score {rule.get('score')} has no matching scoring level")
+    return errors
+
+
+def with_compiled_rules(control: Dict[str, Any]) -> Dict[str, Any]:
+    """``control`` with an ``expr`` tree added to each scoring rule."""
+    rules: Optional[List[Dict[str, Any]]] = control.get("scoring", {}).get("rules")
+    if not rules:
+        return control
+    scoring = dict(control["scoring"])
+    scoring["rules"] = [dict(rule, expr=compile_expression(rule["when"])) for rule in rules]
+    return dict(control, scoring=scoring)
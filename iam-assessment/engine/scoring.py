@@ -0,0 +1,141 @@
+"""Scoring core shared by engine/assess.py and the backend.
+
+A registry is compiled once into column arrays (weight and domain code per
+control, controls sorted by id) so scoring an assessment is a single pass
+over a flat array of scores instead of dict grouping and repeated sorts.
+Scores use ``NOT_ASSESSED`` (-1) for controls without a score.
+"""
+
+import heapq
+from array import array
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+NOT_ASSESSED = -1
+TOP_RISKS = 5
+
+
+@dataclass(frozen=True)
+class ScoringModel:
+    registry_hash: str
+    min_score: int
+    max_score: int
+    control_ids: Tuple[str, ...]
+    index: Mapping[str, int]
+    weights: array
+    domain_codes: array
+    domain_ids: Tuple[str, ...]
+    domain_controls_total: Tuple[int, ...]
+    domain_weight: Tuple[int, ...]
+
+    def new_scores(self) -> array:
+        return array("i", [NOT_ASSESSED]) * len(self.control_ids)
+
+
+@dataclass
+class ScoreSummary:
+    overall_score: Optional[float]
+    controls_assessed: int
+    domain_scores: List[Optional[float]]
+    domain_assessed: List[int]
+    # Sum of weight * score and sum of weight over assessed controls, per domain.
+    domain_weighted: List[int]
+    domain_assessed_weight: List[int]
+    # Control indices of the highest-risk assessed controls, worst first.
+    top_risks: List[int]
+
+
+def compile_model(registry: Mapping[str, Any]) -> ScoringModel:
+    scale = registry.get("scoring", {}).get("scale", {})
+    controls = sorted(registry.get("controls", []), key=lambda x: x["id"])
+    domain_ids = tuple(sorted({c["domain"] for c in controls}))
+    domain_code = {d: i for i, d in enumerate(domain_ids)}
+
+    controls_total = [0] * len(domain_ids)
+    weight_total = [0] * len(domain_ids)
+    for c in controls:
+        code = domain_code[c["domain"]]
+        controls_total[code] += 1
+        weight_total[code] += c["weight"]
+
+    return ScoringModel(
+        registry_hash=registry["build"]["registry_hash"],
+        min_score=int(scale.get("min", 0)),
+        max_score=int(scale.get("max", 2)),
+        control_ids=tuple(c["id"] for c in controls),
+        index={c["id"]: i for i, c in enumerate(controls)},
+        weights=array("i", (c["weight"] for c in controls)),
+        domain_codes=array("i", (domain_code[c["domain"]] for c in controls)),
+        domain_ids=domain_ids,
+        domain_controls_total=tuple(controls_total),
+        domain_weight=tuple(weight_total),
+    )
+
+
+def weighted_score(weighted: int, total: int) -> Optional[float]:
+    """``weighted`` (sum of weight * score) as a percentage of ``total``
+    (sum of weight * max_score)."""
+    if total == 0:
+        return None
+    return round((weighted / total) * 100.0, 2)
+
+
+def score(model: ScoringModel, scores: Sequence[int], top_k: int = TOP_RISKS) -> ScoreSummary:
+    n_domains = len(model.domain_ids)
+    d_weighted = [0] * n_domains
+    d_weight = [0] * n_domains
+    d_assessed = [0] * n_domains
+    weights = model.weights
+    codes = model.domain_codes
+    max_score = model.max_score
+
+    assessed: List[int] = []
+    for i, s in enumerate(scores):
+        if s < 0:
+            continue
+        w = weights[i]
+        d = codes[i]
+        d_weighted[d] += w * s
+        d_weight[d] += w
+        d_assessed[d] += 1
+        assessed.append(i)
+
+    top = heapq.nsmallest(
+        top_k,
+        assessed,
+        key=lambda i: (-(max_score - scores[i]) * weights[i], -weights[i], i),
+    )
+
+    return ScoreSummary(
+        overall_score=(
+            weighted_score(sum(d_weighted), sum(d_weight) * max_score) if assessed else None
+        ),
+        controls_assessed=len(assessed),
+        domain_scores=[
+            weighted_score(d_weighted[d], d_weight[d] * max_score) if d_assessed[d] else None
+            for d in range(n_domains)
+        ],
+        domain_assessed=d_assessed,
+        domain_weighted=d_weighted,
+        domain_assessed_weight=d_weight,
+        top_risks=top,
+    )
+
+
+def domain_reports(
+    model: ScoringModel,
+    summary: ScoreSummary,
+    domain_meta: Mapping[str, Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": domain_id,
+            "name": domain_meta.get(domain_id, {}).get("name", ""),
+            "description": domain_meta.get(domain_id, {}).get("description", ""),
+            "score": summary.domain_scores[d],
+            "controls_assessed": summary.domain_assessed[d],
+            "controls_total": model.domain_controls_total[d],
+            "weight": model.domain_weight[d],
+        }
+        for d, domain_id in enumerate(model.domain_ids)
+    ]
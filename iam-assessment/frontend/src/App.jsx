@@ -349,6 +349,7 @@ export default function App() {
                   >
                     <option value="not_assessed">Not assessed</option>
                     <option value="assessed">Assessed</option>
+                    <option value="needs_reassessment">Needs re-assessment</option>
                   </select>
                 </label>
                 <label>
@@ -1,9 +1,19 @@
 const API_BASE = import.meta.env.VITE_API_BASE || "http://localhost:8000";
 
+// GET /assessments is keyset-paginated; follow X-Next-Cursor until the
+// last page so the list is complete.
 export async function getAssessments() {
-  const res = await fetch(`${API_BASE}/assessments`);
-  if (!res.ok) throw new Error("Failed to load assessments");
-  return res.json();
+  const all = [];
+  let cursor = null;
+  do {
+    const params = new URLSearchParams({ limit: "500" });
+    if (cursor) params.set("cursor", cursor);
+    const res = await fetch(`${API_BASE}/assessments?${params}`);
+    if (!res.ok) throw new Error("Failed to load assessments");
+    all.push(...(await res.json()));
+    cursor = res.headers.get("X-Next-Cursor");
+  } while (cursor);
+  return all;
 }
 
 export async function createAssessment(payload) {
@@ -35,8 +45,45 @@ export async function updateItem(assessmentId, controlId, payload) {
   return res.json();
 }
 
+export async function updateItems(assessmentId, updates) {
+  const res = await fetch(`${API_BASE}/assessments/${assessmentId}/items`, {
+    method: "PATCH",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(updates),
+  });
+  if (!res.ok) throw new Error("Failed to update items");
+  return res.json();
+}
+
 export async function getReport(assessmentId) {
   const res = await fetch(`${API_BASE}/assessments/${assessmentId}/report`);
   if (!res.ok) throw new Error("Failed to generate report");
   return res.json();
 }
+
+export async function diffRegistry(fromHash, toHash) {
+  const params = new URLSearchParams({ from: fromHash });
+  if (toHash) params.set("to", toHash);
+  const res = await fetch(`${API_BASE}/registry/diff?${params}`);
+  if (!res.ok) throw new Error("Failed to diff registry versions");
+  return res.json();
+}
+
+export async function migrateAssessment(assessmentId) {
+  const res = await fetch(`${API_BASE}/assessments/${assessmentId}/migrate`, {
+    method: "POST",
+  });
+  if (!res.ok) throw new Error("Failed to migrate assessment");
+  return res.json();
+}
+
+export async function importFindings(assessmentId, file) {
+  const jsonl = file.name?.endsWith(".jsonl");
+  const res = await fetch(`${API_BASE}/assessments/${assessmentId}/findings:import`, {
+    method: "POST",
+    headers: { "Content-Type": jsonl ? "application/x-ndjson" : "application/json" },
+    body: file,
+  });
+  if (!res.ok) throw new Error("Failed to import findings");
+  return res.json();
+}
@@ -0,0 +1,57 @@
+"""The streaming canonical encoder must hash exactly like json.dumps(sort_keys=True)."""
+
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from tools.compile_controls import (  # noqa: E402
+    canonical_json_bytes,
+    canonical_sha256,
+    iter_canonical_json,
+)
+
+DIST = ROOT / "dist"
+
+
+def _reference(obj):
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def _registry_base():
+    registry = json.loads((DIST / "controls.json").read_text(encoding="utf-8"))
+    return registry, {k: v for k, v in registry.items() if k != "build"}
+
+
+def test_committed_registry_hash_unchanged():
+    registry, base = _registry_base()
+    recorded = (DIST / "controls.sha256").read_text(encoding="utf-8").split()[0]
+    expected = hashlib.sha256(_reference(base).encode("utf-8")).hexdigest()
+
+    assert expected == registry["build"]["registry_hash"] == recorded
+    assert canonical_sha256(base) == expected
+    assert "".join(iter_canonical_json(base)) == _reference(base)
+    assert canonical_json_bytes(base) == _reference(base).encode("utf-8")
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        {"title": "Zugriffsprüfung", "owner": "José", "note": "認証 🔐", "sep": "a b", "ctl": "\x00\t\"\\"},
+        {"floats": [0.1, 1.0, -0.0, 1e-7, 1e16, 2.5e300, 123456789.123456789], "ints": [0, -1, 2**63, 10**30]},
+        {"b": {"z": [True, False, None], "a": {}}, "a": [], "é": "", "E": [[[]]], "": {"nested": [{"x": 1.5}]}},
+        [],
+        "plain string",
+        3.14,
+    ],
+)
+def test_streaming_matches_json_dumps(obj):
+    reference = _reference(obj)
+    assert "".join(iter_canonical_json(obj)) == reference
+    assert canonical_json_bytes(obj) == reference.encode("utf-8")
+    assert canonical_sha256(obj) == hashlib.sha256(reference.encode("utf-8")).hexdigest()
@@ -0,0 +1,149 @@
+"""Incremental report updates must agree with a full recomputation."""
+
+import random
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "backend"))
+
+from app.report_cache import (  # noqa: E402
+    RISK_BUFFER,
+    TOP_RISKS,
+    apply_item_change,
+    apply_item_changes,
+    render,
+    row_from_items,
+)
+from engine.scoring import compile_model, domain_reports, score  # noqa: E402
+
+MAX_SCORE = 3
+DOMAINS = ("AC", "IA", "PR")
+
+
+def _controls(n):
+    rng = random.Random(n)
+    return {
+        f"C-{i:03d}": {
+            "id": f"C-{i:03d}",
+            "domain": DOMAINS[i % len(DOMAINS)],
+            "weight": rng.randint(1, 5),
+            "title": f"Control {i}",
+        }
+        for i in range(n)
+    }
+
+
+def _model(controls, max_score=MAX_SCORE):
+    return compile_model(
+        {
+            "scoring": {"scale": {"min": 0, "max": max_score}},
+            "build": {"registry_hash": "h1"},
+            "controls": list(controls.values()),
+        }
+    )
+
+
+def _random_item(rng, control):
+    item = {
+        "control_id": control["id"],
+        "domain": control["domain"],
+        "weight": control["weight"],
+        "status": "not_assessed",
+        "score": None,
+        "finding_text": None,
+    }
+    roll = rng.random()
+    if roll < 0.7:
+        item.update(status="assessed", score=rng.randint(0, MAX_SCORE), finding_text=f"f{rng.randint(0, 9)}")
+    elif roll < 0.8:
+        # Assessed without a score does not count as scored.
+        item["status"] = "assessed"
+    return item
+
+
+def _expected(controls, items):
+    return row_from_items("a1", _model(controls), (items[k] for k in sorted(items)), controls)
+
+
+def _check(report, controls, items):
+    expected = _expected(controls, items)
+    assert report.controls_assessed == expected["controls_assessed"]
+    assert report.domains == expected["domains"]
+    if report.risks_stale:
+        # What refresh_risks does on the next report read.
+        report.risks = expected["risks"]
+        report.risks_stale = False
+        return True
+    assert report.risks == expected["risks"]
+    return False
+
+
+def _engine_report(controls, items):
+    model = _model(controls)
+    scores = model.new_scores()
+    for cid, item in items.items():
+        if item["status"] == "assessed" and item["score"] is not None:
+            scores[model.index[cid]] = item["score"]
+    summary = score(model, scores)
+    return summary, domain_reports(model, summary, {}), [model.control_ids[i] for i in summary.top_risks]
+
+
+@pytest.mark.parametrize("n_controls", [8, 60])
+@pytest.mark.parametrize("batch", [False, True])
+def test_random_changes_match_row_from_items(n_controls, batch):
+    rng = random.Random(n_controls * 2 + batch)
+    controls = _controls(n_controls)
+    items = {cid: _random_item(rng, c) for cid, c in controls.items()}
+    report = SimpleNamespace(**_expected(controls, items))
+
+    stale_seen = full_seen = 0
+    for _ in range(400):
+        full_seen += len(report.risks) >= RISK_BUFFER
+        if batch:
+            changes = []
+            for cid in rng.sample(sorted(controls), rng.randint(1, 6)):
+                new = _random_item(rng, controls[cid])
+                changes.append((items[cid], new, controls[cid]["title"]))
+                items[cid] = new
+            apply_item_changes(report, changes)
+        else:
+            cid = rng.choice(sorted(controls))
+            new = _random_item(rng, controls[cid])
+            apply_item_change(report, items[cid], new, controls[cid]["title"])
+            items[cid] = new
+        stale_seen += _check(report, controls, items)
+
+    # The incrementally maintained row renders what the engine scores.
+    summary, domains, top = _engine_report(controls, items)
+    rendered = render(report, {}, None)
+    assert rendered["summary"]["overall_score"] == summary.overall_score
+    assert rendered["summary"]["controls_assessed"] == summary.controls_assessed
+    assert rendered["domains"] == domains
+    assert [r["control_id"] for r in rendered["top_risks"]] == top[:TOP_RISKS]
+
+    if n_controls > RISK_BUFFER:
+        assert full_seen and stale_seen
+    else:
+        assert not stale_seen
+
+
+def test_row_from_items_uses_the_model_scale():
+    controls = _controls(4)
+    items = {
+        cid: dict(control_id=cid, domain=c["domain"], weight=c["weight"], status="assessed", score=1, finding_text="")
+        for cid, c in controls.items()
+    }
+    for max_score in (2, 5):
+        row = row_from_items("a1", _model(controls, max_score), items.values(), controls)
+        assert row["max_score"] == max_score
+        assert sum(d["total"] for d in row["domains"].values()) == max_score * sum(
+            c["weight"] for c in controls.values()
+        )
+        assert {r["risk_score"] for r in row["risks"]} == {
+            (max_score - 1) * c["weight"] for c in controls.values()
+        }
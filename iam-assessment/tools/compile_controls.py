@@ -1,26 +1,43 @@
+import argparse
 import hashlib
 import datetime as dt
 import json
 import os
 import sys
+import time
 from pathlib import Path
 from datetime import date, datetime
-from typing import Any, Dict, List, Tuple
+from json.encoder import encode_basestring
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import yaml
+from concurrent.futures import ProcessPoolExecutor
 from jsonschema import Draft202012Validator
 
 
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from engine.registry import diff_controls, encode_registry_index, index_path  # noqa: E402
+from engine.rules import rule_errors, with_compiled_rules  # noqa: E402
+
 CONTROLS_DIR = ROOT / "controls"
 SCHEMA_PATH = ROOT / "schemas" / "control.schema.json"
 DIST_DIR = ROOT / "dist"
 DIST_PATH = DIST_DIR / "controls.json"
+# Every registry ever written, as <registry_hash>.json, for diffs and migrations.
+ARCHIVE_DIR = DIST_DIR / "archive"
+CACHE_PATH = DIST_DIR / ".compile-cache"
+# Bump when the shape of a cache entry or the per-file checks change.
+CACHE_VERSION = 1
+
+# libyaml's loader is several times faster; both build the same objects.
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 
 def load_yaml(path: Path) -> Any:
     with path.open("r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=SafeLoader)
 
 
 def load_json(path: Path) -> Any:
@@ -50,6 +67,124 @@ def validate_schema(control: Dict[str, Any], validator: Draft202012Validator, so
     return errors
 
 
+def compile_control_file(
+    path: Path,
+    raw: bytes,
+    validator: Draft202012Validator,
+) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """Parse and schema-check one control file; returns (control or None, errors)."""
+    data = yaml.load(raw.decode("utf-8"), Loader=SafeLoader)
+    if not isinstance(data, dict):
+        return None, [f"{path}: control file must be a YAML object at top level"]
+    return data, validate_schema(data, validator, path)
+
+
+class CompileCache:
+    """Per-file parse and validation results keyed by file content.
+
+    Stored as JSON in ``dist/.compile-cache``. An entry is reused only while
+    the file's sha256 is unchanged; the whole cache is dropped when the
+    schema or ``CACHE_VERSION`` changes.
+    """
+
+    def __init__(self, path: Path, schema_hash: str) -> None:
+        self.path = path
+        self.key = f"{CACHE_VERSION}:{schema_hash}"
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        try:
+            data = load_json(path)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("key") == self.key and isinstance(data.get("files"), dict):
+            self.entries = data["files"]
+
+    def get(self, path: Path, digest: str) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(str(path))
+        if entry is None or entry.get("sha256") != digest:
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, path: Path, digest: str, control: Optional[Dict[str, Any]], errors: List[str]) -> None:
+        self.entries[str(path)] = {"sha256": digest, "control": to_json_safe(control), "errors": errors}
+
+    def save(self, keep: List[Path]) -> None:
+        live = {str(p) for p in keep}
+        files = {k: v for k, v in self.entries.items() if k in live}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(self.path, json.dumps({"key": self.key, "files": files}, ensure_ascii=False).encode("utf-8"))
+
+
+_worker_validator: Optional[Draft202012Validator] = None
+
+
+def _init_worker(schema: Dict[str, Any]) -> None:
+    global _worker_validator
+    _worker_validator = Draft202012Validator(schema)
+
+
+def _compile_in_worker(job: Tuple[str, bytes]) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    assert _worker_validator is not None
+    return compile_control_file(Path(job[0]), job[1], _worker_validator)
+
+
+def load_controls(
+    control_files: List[Path],
+    validator: Draft202012Validator,
+    cache: Optional[CompileCache] = None,
+    jobs: int = 1,
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Parse and validate ``control_files``; results keep ``control_files`` order.
+
+    Files missing from ``cache`` are compiled in a pool of ``jobs`` processes
+    when there is more than one of each, otherwise inline.
+    """
+    results: List[Optional[Tuple[Optional[Dict[str, Any]], List[str]]]] = []
+    misses: List[Tuple[int, Path, bytes, str]] = []
+    for path in control_files:
+        raw = path.read_bytes()
+        digest = sha256_hex(raw)
+        entry = cache.get(path, digest) if cache is not None else None
+        if entry is not None:
+            results.append((entry["control"], entry["errors"]))
+        else:
+            results.append(None)
+            misses.append((len(results) - 1, path, raw, digest))
+
+    if jobs > 1 and len(misses) > 1:
+        workers = min(jobs, len(misses))
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(validator.schema,),
+        ) as pool:
+            compiled = list(
+                pool.map(
+                    _compile_in_worker,
+                    [(str(path), raw) for _, path, raw, _ in misses],
+                    chunksize=max(1, len(misses) // (workers * 4)),
+                )
+            )
+    else:
+        compiled = [compile_control_file(path, raw, validator) for _, path, raw, _ in misses]
+
+    for (i, path, _, digest), (control, file_errors) in zip(misses, compiled):
+        results[i] = (control, file_errors)
+        if cache is not None:
+            cache.put(path, digest, control, file_errors)
+
+    controls: List[Dict[str, Any]] = []
+    errors: List[str] = []
+    for result in results:
+        assert result is not None
+        control, file_errors = result
+        errors.extend(file_errors)
+        if control is not None:
+            controls.append(control)
+    return controls, errors
+
+
 def enforce_registry_rules(
     controls: List[Dict[str, Any]],
     control_paths: List[Path],
@@ -100,6 +235,9 @@ def enforce_registry_rules(
         if len(scores) != len(set(scores)):
             errors.append(f"{p}: scoring.levels contains duplicate score values {scores}")
 
+        # Automated scoring rules parse and map onto a level
+        errors.extend(f"{p}: {e}" for e in rule_errors(c))
+
     # Weight bounds (again, schema covers, but allow config driven bounds too)
     wcfg = scoring_cfg.get("weight", {"min": 1, "max": 5})
     wmin = int(wcfg.get("min", 1))
@@ -158,8 +296,9 @@ def normalize_domains(domains: Any) -> Tuple[List[Dict[str, Any]], Dict[str, Dic
 
 def normalize_control(control: Dict[str, Any]) -> Dict[str, Any]:
     # Keep as-is but ensure predictable key ordering in JSON output
-    # (JSON dump will handle ordering via sort_keys=True)
-    return control
+    # (JSON dump will handle ordering via sort_keys=True). Scoring rules get
+    # their precompiled expression tree (engine/rules.py) alongside the text.
+    return with_compiled_rules(control)
 
 
 def to_json_safe(value: Any) -> Any:
@@ -190,35 +329,130 @@ def sha256_hex(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
 
 
-def main() -> int:
-    # Load config
-    meta = load_yaml(CONTROLS_DIR / "_meta.yml")
-    domains_raw = load_yaml(CONTROLS_DIR / "domains.yml")
-    scoring_cfg = load_yaml(CONTROLS_DIR / "scoring.yml")
-    schema = load_json(SCHEMA_PATH)
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# Same output as canonical_json_bytes, but dates are converted by the
+# encoder's default hook instead of a to_json_safe copy of the tree.
+_canonical_encoder = json.JSONEncoder(
+    sort_keys=True,
+    separators=(",", ":"),
+    ensure_ascii=False,
+    default=_json_default,
+)
+
+
+def iter_canonical_json(obj: Any, depth: int = 2) -> Iterator[str]:
+    """Yield canonical_json_bytes(obj), decoded, in pieces.
 
-    validator = Draft202012Validator(schema)
+    Dicts and lists down to ``depth`` levels are walked here so no piece is
+    larger than one of their members (one control at the default depth);
+    deeper values go through the C encoder whole. Dicts with non-string keys
+    are encoded whole, since json converts such keys before sorting.
+    """
+    if depth > 0 and isinstance(obj, dict) and all(isinstance(k, str) for k in obj):
+        yield "{"
+        for n, key in enumerate(sorted(obj)):
+            yield f'{"," if n else ""}{encode_basestring(key)}:'
+            yield from iter_canonical_json(obj[key], depth - 1)
+        yield "}"
+    elif depth > 0 and isinstance(obj, list):
+        yield "["
+        for n, item in enumerate(obj):
+            if n:
+                yield ","
+            yield from iter_canonical_json(item, depth - 1)
+        yield "]"
+    else:
+        yield _canonical_encoder.encode(obj)
+
+
+def canonical_sha256(obj: Any) -> str:
+    """sha256_hex(canonical_json_bytes(obj)) without building the full byte string."""
+    h = hashlib.sha256()
+    for piece in iter_canonical_json(obj):
+        h.update(piece.encode("utf-8"))
+    return h.hexdigest()
+
+
+def verify_hash(dist_dir: Path) -> int:
+    """Check both hash paths against dist/controls.json and controls.sha256."""
+    registry = load_json(dist_dir / DIST_PATH.name)
+    recorded = (dist_dir / "controls.sha256").read_text(encoding="utf-8").split()[0]
+    base = {k: v for k, v in registry.items() if k != "build"}
+    reference = sha256_hex(canonical_json_bytes(base))
+    streamed = canonical_sha256(base)
+    print(f"build.registry_hash  {registry['build']['registry_hash']}")
+    print(f"controls.sha256      {recorded}")
+    print(f"canonical_json_bytes {reference}")
+    print(f"canonical_sha256     {streamed}")
+    if len({registry["build"]["registry_hash"], recorded, reference, streamed}) != 1:
+        print("registry_hash mismatch", file=sys.stderr)
+        return 1
+    print("OK: streaming hash matches the recorded registry_hash.")
+    return 0
 
-    control_files = find_control_files(CONTROLS_DIR)
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Replace ``path`` with ``data`` so readers see the old or new file, never a partial one."""
+    tmp = path.with_name(f".{path.name}.tmp")
+    with tmp.open("wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _previous_controls(dist_path: Path) -> Optional[Tuple[str, Dict[str, Dict[str, Any]]]]:
+    try:
+        previous = load_json(dist_path)
+        return previous["build"]["registry_hash"], {c["id"]: c for c in previous["controls"]}
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def compile_once(
+    controls_dir: Path,
+    dist_dir: Path,
+    validator: Draft202012Validator,
+    cache: Optional[CompileCache],
+    jobs: int = 1,
+    skip_unchanged: bool = False,
+) -> int:
+    """Compile ``controls_dir`` into ``dist_dir``; returns the process exit code.
+
+    With ``skip_unchanged`` the outputs are left alone when the registry hash
+    already matches dist/controls.sha256, so watchers only see real changes.
+    """
+    dist_path = dist_dir / DIST_PATH.name
+    sha_path = dist_dir / "controls.sha256"
+    idx_path = index_path(dist_path)
+    if cache is not None:
+        cache.hits = 0
+
+    # Load config
+    meta = load_yaml(controls_dir / "_meta.yml")
+    domains_raw = load_yaml(controls_dir / "domains.yml")
+    scoring_cfg = load_yaml(controls_dir / "scoring.yml")
+
+    control_files = find_control_files(controls_dir)
     if not control_files:
         print("No control files found under controls/**.yml", file=sys.stderr)
         return 2
 
-    controls: List[Dict[str, Any]] = []
     errors: List[str] = []
 
     domains, domain_map, domain_errors = normalize_domains(domains_raw)
     errors.extend(domain_errors)
 
-    for path in control_files:
-        data = load_yaml(path)
-        if not isinstance(data, dict):
-            errors.append(f"{path}: control file must be a YAML object at top level")
-            continue
-
-        # Schema validation per control
-        errors.extend(validate_schema(data, validator, path))
-        controls.append(data)
+    # Parse + schema validation per control, reusing cached results for unchanged files
+    controls, control_errors = load_controls(control_files, validator, cache, jobs)
+    errors.extend(control_errors)
+    if cache is not None:
+        cache.save(control_files)
 
     # Cross-control rules
     if not errors:
@@ -243,8 +477,13 @@ def main() -> int:
     }
 
     # Hash canonical representation of the base registry
-    registry_bytes = canonical_json_bytes(registry_base)
-    registry_hash = sha256_hex(registry_bytes)
+    registry_hash = canonical_sha256(registry_base)
+    sha_line = f"{registry_hash}  {dist_path.name}\n"
+
+    if skip_unchanged and dist_path.exists() and idx_path.exists() and sha_path.exists():
+        if sha_path.read_text(encoding="utf-8") == sha_line:
+            print(f"Registry unchanged (sha256 registry_hash={registry_hash}).")
+            return 0
 
     # Add build metadata AFTER hashing (so timestamp doesn't change hash)
     registry = dict(registry_base)
@@ -254,22 +493,123 @@ def main() -> int:
         "compiler": "tools/compile_controls.py"
     }
 
-    DIST_DIR.mkdir(parents=True, exist_ok=True)
+    dist_dir.mkdir(parents=True, exist_ok=True)
+    previous = _previous_controls(dist_path)
 
-    # Write controls.json (pretty for humans)
-    with DIST_PATH.open("w", encoding="utf-8") as f:
-        json.dump(to_json_safe(registry), f, indent=2, sort_keys=True, ensure_ascii=False)
+    # Write controls.json (pretty for humans). Both files are swapped in
+    # atomically so a running backend never reads a half-written registry.
+    registry = to_json_safe(registry)
+    body = json.dumps(registry, indent=2, sort_keys=True, ensure_ascii=False)
+    write_atomic(dist_path, body.encode("utf-8"))
 
-    # Write controls.sha256 (common format: "<hash>  <filename>")
-    sha_path = DIST_DIR / "controls.sha256"
-    with sha_path.open("w", encoding="utf-8") as f:
-        f.write(f"{registry_hash}  {DIST_PATH.name}\n")
+    # Write controls.idx (memory-mappable, indexed by control id and domain)
+    write_atomic(idx_path, encode_registry_index(registry))
+
+    # Archive by hash; an existing entry already holds the same content
+    archive_path = dist_dir / ARCHIVE_DIR.name / f"{registry_hash}.json"
+    if not archive_path.exists():
+        archive_path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(archive_path, body.encode("utf-8"))
 
-    print(f"Wrote {DIST_PATH} with {len(controls)} controls.")
+    # Write controls.sha256 (common format: "<hash>  <filename>")
+    write_atomic(sha_path, sha_line.encode("utf-8"))
+
+    if cache is not None:
+        print(f"Reused {cache.hits} of {len(control_files)} control file(s) from {CACHE_PATH.name}.")
+    print(f"Wrote {dist_path} with {len(controls)} controls.")
+    print(f"Wrote {idx_path}.")
+    if previous is not None and previous[0] != registry_hash:
+        diff = diff_controls(previous[1], {c["id"]: c for c in registry["controls"]})
+        print(
+            f"Changes since {previous[0][:12]}: {len(diff['added'])} added, "
+            f"{len(diff['removed'])} removed, {len(diff['changed'])} changed, "
+            f"{len(diff['text_changed'])} changed outside scoring."
+        )
     print(f"Wrote {sha_path} (sha256 registry_hash={registry_hash}).")
     return 0
 
 
+def _snapshot(controls_dir: Path) -> Dict[str, Tuple[int, int]]:
+    stamps: Dict[str, Tuple[int, int]] = {}
+    for p in [SCHEMA_PATH, *controls_dir.rglob("*.yml"), *controls_dir.rglob("*.yaml")]:
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        stamps[str(p)] = (st.st_mtime_ns, st.st_size)
+    return stamps
+
+
+def watch(controls_dir: Path, dist_dir: Path, use_cache: bool, jobs: int, interval: float) -> int:
+    """Recompile whenever a control, config or schema file changes (polling).
+
+    The per-file cache stays in memory between rounds, so only edited files
+    are re-parsed and re-validated.
+    """
+    schema_bytes = b""
+    validator: Optional[Draft202012Validator] = None
+    cache: Optional[CompileCache] = None
+    seen: Optional[Dict[str, Tuple[int, int]]] = None
+    print(f"Watching {controls_dir} (every {interval}s, Ctrl-C to stop).")
+    try:
+        while True:
+            current = _snapshot(controls_dir)
+            if current != seen:
+                # Let a burst of saves settle before compiling.
+                time.sleep(min(interval, 0.2))
+                current = _snapshot(controls_dir)
+                try:
+                    new_schema = SCHEMA_PATH.read_bytes()
+                    if new_schema != schema_bytes or validator is None:
+                        schema = json.loads(new_schema)
+                        Draft202012Validator.check_schema(schema)
+                        validator = Draft202012Validator(schema)
+                        schema_bytes = new_schema
+                        cache = CompileCache(dist_dir / CACHE_PATH.name, sha256_hex(schema_bytes)) if use_cache else None
+                    compile_once(controls_dir, dist_dir, validator, cache, jobs, skip_unchanged=True)
+                except Exception as exc:
+                    # A half-written schema or a control file of the wrong
+                    # shape must not end the watch; dist/ keeps the last
+                    # good build and the next change retries.
+                    print(f"Compile failed: {exc.__class__.__name__}: {exc}", file=sys.stderr)
+                seen = current
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compile controls/**.yml into dist/controls.json.")
+    parser.add_argument("--no-cache", action="store_true", help=f"ignore and do not update {CACHE_PATH.name}")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="parse and validate control files in N processes (0 = one per CPU)",
+    )
+    parser.add_argument("--controls-dir", type=Path, default=CONTROLS_DIR)
+    parser.add_argument("--out-dir", type=Path, default=DIST_DIR)
+    parser.add_argument("--watch", action="store_true", help="keep running and recompile when files change")
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between --watch polls")
+    parser.add_argument(
+        "--verify-hash",
+        action="store_true",
+        help="recompute registry_hash of the existing controls.json both ways and compare",
+    )
+    args = parser.parse_args(argv)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+
+    if args.verify_hash:
+        return verify_hash(args.out_dir)
+
+    if args.watch:
+        return watch(args.controls_dir, args.out_dir, not args.no_cache, jobs, args.interval)
+
+    schema_bytes = SCHEMA_PATH.read_bytes()
+    validator = Draft202012Validator(json.loads(schema_bytes))
+    cache = None if args.no_cache else CompileCache(args.out_dir / CACHE_PATH.name, sha256_hex(schema_bytes))
+    return compile_once(args.controls_dir, args.out_dir, validator, cache, jobs)
+
 
 if __name__ == "__main__":
     raise SystemExit(main())
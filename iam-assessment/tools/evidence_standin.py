@@ -0,0 +1,294 @@
+"""Local stand-in for Microsoft Graph and the AD bridge, for offline collection runs.
+
+Serves every artifact in ``engine.collect.ARTIFACTS`` at
+``/graph/<tenant>/<path>`` (entra) and ``/ad/<tenant>/<path>`` (ad). Data is
+generated deterministically from the tenant and artifact name, so repeated
+runs return the same evidence. Responses are paged Graph-style
+(``value`` plus ``@odata.nextLink``). ``--latency-ms`` delays every
+response and ``--fail-rate`` answers that share of requests with a 429 or
+503 so retry behaviour can be exercised.
+
+    python tools/evidence_standin.py --port 8765 --latency-ms 20 --fail-rate 0.05
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from engine.collect import ARTIFACTS  # noqa: E402
+
+PREFIXES = {"graph": "entra", "ad": "ad"}
+# (source, endpoint path) -> artifact
+ROUTES = {spec: artifact for artifact, spec in ARTIFACTS.items()}
+# Fixed "now" so generated timestamps do not depend on when the server runs.
+EPOCH = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+
+def _ts(when: datetime) -> str:
+    return when.isoformat().replace("+00:00", "Z")
+
+
+def _sign_ins(rng: random.Random, tenant: str) -> List[Dict[str, Any]]:
+    mfa_share = rng.choice([0.5, 0.85, 0.99, 1.0])
+    block_legacy = rng.choice([0.0, 0.6, 1.0])
+    items = []
+    for n in range(rng.randint(150, 400)):
+        legacy = rng.random() < 0.1
+        items.append(
+            {
+                "id": f"{tenant}-signin-{n}",
+                "createdDateTime": _ts(EPOCH - timedelta(minutes=n * 7)),
+                "userPrincipalName": f"user{rng.randint(1, 500)}@{tenant}.example",
+                "clientAppUsed": rng.choice(["Exchange ActiveSync", "IMAP4", "SMTP"]) if legacy else "Browser",
+                "authenticationRequirement": (
+                    "multiFactorAuthentication" if rng.random() < mfa_share else "singleFactorAuthentication"
+                ),
+                "status": {"errorCode": 53003 if legacy and rng.random() < block_legacy else 0},
+            }
+        )
+    return items
+
+
+def _ca_policies(rng: random.Random, tenant: str) -> List[Dict[str, Any]]:
+    items = [
+        {
+            "id": f"{tenant}-ca-mfa",
+            "displayName": "Require MFA for all users",
+            "state": rng.choice(["enabled", "enabled", "enabledForReportingButNotEnforced"]),
+            "conditions": {
+                "users": {
+                    "includeUsers": ["All"],
+                    "excludeUsers": [f"bg{n}@{tenant}.example" for n in range(rng.randint(0, 4))],
+                }
+            },
+            "grantControls": {"builtInControls": ["mfa"]},
+        }
+    ]
+    for n in range(rng.randint(2, 12)):
+        items.append(
+            {
+                "id": f"{tenant}-ca-{n}",
+                "displayName": f"Policy {n}",
+                "state": "enabled",
+                "conditions": {"users": {"includeUsers": [f"group-{n}"], "excludeUsers": []}},
+                "grantControls": {"builtInControls": [rng.choice(["compliantDevice", "mfa", "block"])]},
+            }
+        )
+    return items
+
+
+def _pim_assignments(rng: random.Random, tenant: str) -> List[Dict[str, Any]]:
+    permanent_share = rng.choice([0.0, 0.2, 1.0])
+    items = []
+    for n in range(rng.randint(5, 40)):
+        permanent = rng.random() < permanent_share
+        items.append(
+            {
+                "id": f"{tenant}-pim-{n}",
+                "roleDefinitionId": rng.choice(["Global Administrator", "Privileged Role Administrator", "User Administrator"]),
+                "assignmentType": "Assigned" if permanent else "Eligible",
+                "endDateTime": None if permanent else _ts(EPOCH + timedelta(days=rng.randint(1, 90))),
+            }
+        )
+    return items
+
+
+def _break_glass(rng: random.Random, tenant: str) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": f"{tenant}-bg-{n}",
+            "userPrincipalName": f"bg{n}@{tenant}.example",
+            "monitored": rng.random() < 0.8,
+            "createdDateTime": _ts(EPOCH - timedelta(days=rng.randint(200, 900))),
+            "lastTestedDateTime": (
+                _ts(EPOCH - timedelta(days=rng.randint(1, 400))) if rng.random() < 0.7 else None
+            ),
+        }
+        for n in range(rng.choice([0, 1, 2, 2]))
+    ]
+
+
+def _disable_logs(rng: random.Random, tenant: str) -> List[Dict[str, Any]]:
+    sla = rng.choice([None, 24, 48])
+    items = []
+    for n in range(rng.randint(0, 60)):
+        terminated = EPOCH - timedelta(days=rng.randint(1, 180))
+        items.append(
+            {
+                "account": f"{tenant}\\leaver{n}",
+                "terminatedAt": _ts(terminated),
+                "disabledAt": _ts(terminated + timedelta(hours=rng.choice([1, 4, 20, 30, 72]))),
+                "slaHours": sla,
+            }
+        )
+    return items
+
+
+def _generic(rng: random.Random, tenant: str, artifact: str) -> List[Dict[str, Any]]:
+    return [{"id": f"{tenant}-{artifact}-{n}", "displayName": f"{artifact} {n}"} for n in range(rng.randint(0, 30))]
+
+
+GENERATORS: Dict[str, Callable[[random.Random, str], List[Dict[str, Any]]]] = {
+    "sign_in_logs": _sign_ins,
+    "conditional_access_policies": _ca_policies,
+    "pim_assignments": _pim_assignments,
+    "break_glass_accounts": _break_glass,
+    "account_disable_logs": _disable_logs,
+}
+
+
+@lru_cache(maxsize=4096)
+def _encoded_items(tenant: str, artifact: str) -> Tuple[bytes, ...]:
+    # Each item pre-encoded once; pages are joined from these slices.
+    return tuple(json.dumps(item).encode("utf-8") for item in artifact_items(tenant, artifact))
+
+
+def artifact_items(tenant: str, artifact: str) -> List[Dict[str, Any]]:
+    """Every item the stand-in serves for ``artifact`` of ``tenant``."""
+    rng = random.Random(f"{tenant}/{artifact}")
+    generator = GENERATORS.get(artifact)
+    return generator(rng, tenant) if generator is not None else _generic(rng, tenant, artifact)
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The socketserver default of 5 drops connections once many clients open at once.
+    request_queue_size = 256
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        page_size: int = 100,
+        latency: float = 0.0,
+        fail_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        super().__init__(address, StandinHandler)
+        self.page_size = page_size
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.requests = 0
+        self.failures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def injected_failure(self) -> Optional[int]:
+        """429 or 503 for a ``fail_rate`` share of requests, else None."""
+        with self._lock:
+            self.requests += 1
+            if self._rng.random() >= self.fail_rate:
+                return None
+            self.failures += 1
+            return self._rng.choice((429, 503))
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    server: StandinServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        status = self.server.injected_failure()
+        if status == 429:
+            self._send(429, {"error": {"code": "TooManyRequests"}}, {"Retry-After": "0"})
+            return
+        if status == 503:
+            self._send(503, {"error": {"code": "ServiceUnavailable"}})
+            return
+
+        url = urlsplit(self.path)
+        parts = url.path.strip("/").split("/", 2)
+        if len(parts) != 3 or parts[0] not in PREFIXES:
+            self._send(404, {"error": {"code": "NotFound"}})
+            return
+        prefix, tenant, path = parts
+        artifact = ROUTES.get((PREFIXES[prefix], path))
+        if artifact is None:
+            self._send(404, {"error": {"code": "NotFound"}})
+            return
+
+        query = parse_qs(url.query)
+        skip = int(query.get("$skip", ["0"])[0])
+        items = _encoded_items(tenant, artifact)
+        end = skip + self.server.page_size
+        body = b'{"value":[' + b",".join(items[skip:end]) + b"]"
+        if end < len(items):
+            host = self.headers.get("Host") or "{}:{}".format(*self.server.server_address[:2])
+            body += b',"@odata.nextLink":' + json.dumps(f"http://{host}{url.path}?$skip={end}").encode("utf-8")
+        self._send(200, body + b"}")
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    page_size: int = 100,
+    latency: float = 0.0,
+    fail_rate: float = 0.0,
+    seed: int = 0,
+) -> StandinServer:
+    """Start a stand-in on a background thread; ``port=0`` picks a free port. Call ``shutdown()`` when done."""
+    server = StandinServer((host, port), page_size=page_size, latency=latency, fail_rate=fail_rate, seed=seed)
+    threading.Thread(target=server.serve_forever, name="evidence-standin", daemon=True).start()
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve fake Graph/AD evidence endpoints for engine.collect.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of requests answered with 429/503")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = StandinServer(
+        (args.host, args.port),
+        page_size=args.page_size,
+        latency=args.latency_ms / 1000.0,
+        fail_rate=args.fail_rate,
+        seed=args.seed,
+    )
+    print(f"Serving {server.url}/graph and {server.url}/ad (Ctrl+C to stop).", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())